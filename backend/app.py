@@ -1,13 +1,22 @@
-from fastapi import FastAPI, WebSocket
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from typing import Dict, Any
 import asyncio
 import json
-from websocket.data_stream import connect_websocket
-from models.market_impact import calculate_market_impact
-from models.regression import estimate_slippage, maker_taker_ratio
-from models.latency import measure_latency
-from config.settings import TRADE_AMOUNT, FEE_TIERS
+import os
+from websocket.hub import MarketDataHub
+from websocket.broadcast import AnalysisBroadcaster
+from websocket.sharded import ShardedPipeline
+from websocket.pubsub import PUBSUB_ENV, MarketDataPublisher, MarketDataSubscriber, publish_analysis
+from websocket.delta import DELTA_PROTOCOL, JSON_PROTOCOL, DeltaStream, negotiate
+from models.market_impact import market_impact_model
+from models.cost_engine import estimate_costs, serialize_cost_curve, restore_cost_curve
+from models.features import prepare_features
+from models.regression import SlippageModel, MakerTakerModel, OnlineTrainer
+from models.latency import measure_latency, stamp
+from models.persistence import save_models, load_models, instrument_state_dir
+from config.settings import TRADE_AMOUNT, DEFAULT_INSTRUMENT, ONLINE_LEARNING, MODEL_STATE_DIR
+from config.settings import WS_DELTA_ENABLED, WS_PER_MESSAGE_DEFLATE, ANALYSIS_WORKERS, INSTRUMENTS
 from utils.logger import logger
 
 app = FastAPI()
@@ -24,90 +33,202 @@ app.add_middleware(
 # Store active WebSocket connections
 active_connections: Dict[int, WebSocket] = {}
 
+# Models are shared by every client; analysis runs once per tick per instrument.
+# Each instrument has its own models: prices differ by orders of magnitude
+# across instruments, so one scaler and fit would suit none of them.
+instrument_models = {}  # instId -> (SlippageModel, MakerTakerModel, OnlineTrainer or None)
+
+def models_for(inst_id):
+    """
+    Models of one instrument, warm started from its saved state on first use
+    :return: (slippage model, maker/taker model, OnlineTrainer or None)
+    """
+    models = instrument_models.get(inst_id)
+    if models is None:
+        slippage_model, maker_taker_model = SlippageModel(), MakerTakerModel()
+        load_models(instrument_state_dir(MODEL_STATE_DIR, inst_id), slippage_model, maker_taker_model, None)
+        trainer = OnlineTrainer(slippage_model, maker_taker_model, TRADE_AMOUNT) if ONLINE_LEARNING else None
+        models = instrument_models[inst_id] = (slippage_model, maker_taker_model, trainer)
+    return models
+
+def save_instrument_models():
+    for inst_id, (slippage_model, maker_taker_model, _) in instrument_models.items():
+        save_models(instrument_state_dir(MODEL_STATE_DIR, inst_id), slippage_model, maker_taker_model, None)
+
+def analyze_market_data(data, orderbook=None):
+    """
+    Compute the cost analysis for one processed order book update
+    :param orderbook: OrderBookManager the update came from; defaults to the hub's book
+    """
+    # Prepare features for models
+    features, volume, current_price = prepare_features(data)
+    if features is None:
+        return None
+    spread = data.spread
+
+    inst_id = data.inst_id or DEFAULT_INSTRUMENT
+    if orderbook is None:
+        orderbook = market_data_hub.orderbooks.get(inst_id)
+    slippage_model, maker_taker_model, trainer = models_for(inst_id)
+    if trainer is not None and orderbook is not None:
+        trainer.update(features, orderbook)
+
+    trace = data.trace
+    stamp(trace, 'features')
+
+    # Slippage, fees, impact and the cost curve across sizes, fee tiers and sides
+    costs = estimate_costs(features, current_price, data.bid_depth + data.ask_depth,
+                           data.volatility, slippage_model, maker_taker_model,
+                           orderbook, data.latency)
+    stamp(trace, 'inference')
+
+    # Prepare response data
+    return {
+        "market_data": {
+            "instrument": inst_id,
+            "timestamp": data.timestamp,
+            "best_bid": data.best_bid,
+            "best_ask": data.best_ask,
+            "spread": spread,
+            "volume": volume,
+            "imbalance": data.imbalance,
+            "microprice": data.microprice
+        },
+        "analysis": costs.to_dict(),
+        "cost_curve": serialize_cost_curve(costs.cost_curve, arrays=True) if costs.cost_curve is not None else None
+    }
+
+def create_worker_analyzer(orderbooks):
+    """
+    Analysis run inside ShardedPipeline worker processes, against the worker's
+    own books. Each worker loads and trains the models of its own instruments
+    and saves them when it stops; the main process has none to save.
+    """
+    load_models(MODEL_STATE_DIR, None, None, market_impact_model)
+
+    def analyze(data):
+        return analyze_market_data(data, orderbooks.get(data.inst_id))
+    analyze.close = save_instrument_models
+    return analyze
+
+def published_message(tick):
+    """
+    Message received from the serve.py producer: JSON turned the cost curve
+    arrays into lists, restore them for the delta encoder
+    """
+    if tick.message.get('cost_curve') is not None:
+        restore_cost_curve(tick.message['cost_curve'])
+    return tick.message
+
+# Shared upstream market data and per-instrument analysis for all clients.
+# With ANALYSIS_WORKERS the books and analysis run in worker processes and the
+# hub carries their finished messages. Under serve.py a single producer process
+# runs the feed and analysis, and each serving worker subscribes to it.
+pubsub_path = os.environ.get(PUBSUB_ENV)
+if pubsub_path:
+    pipeline = None
+    market_data_hub = MarketDataHub(source=MarketDataSubscriber(pubsub_path).source)
+    broadcaster = AnalysisBroadcaster(market_data_hub, published_message)
+elif ANALYSIS_WORKERS:
+    pipeline = ShardedPipeline(INSTRUMENTS, ANALYSIS_WORKERS)
+    market_data_hub = MarketDataHub(source=pipeline.source)
+    broadcaster = AnalysisBroadcaster(market_data_hub, lambda tick: tick.message)
+else:
+    pipeline = None
+    market_data_hub = MarketDataHub()
+    broadcaster = AnalysisBroadcaster(market_data_hub, analyze_market_data)
+
+@app.on_event("startup")
+async def start_market_data():
+    if not pubsub_path:  # Otherwise the producer owns the models
+        load_models(MODEL_STATE_DIR, None, None, market_impact_model)
+    market_data_hub.start()
+
+@app.on_event("shutdown")
+async def stop_market_data():
+    await broadcaster.stop()
+    await market_data_hub.stop()
+    if pipeline is not None:
+        pipeline.stop()
+    save_instrument_models()  # Empty unless this process ran the analysis
+
+async def produce_market_data(path):
+    """
+    Producer process for serve.py: run the feed and the analysis once and
+    publish every message to the serving workers
+    :param path: Unix socket the workers subscribe on
+    """
+    publisher = MarketDataPublisher(path)
+    await publisher.start()
+    await start_market_data()
+    try:
+        await publish_analysis(market_data_hub, broadcaster.analyze, publisher)
+    finally:
+        await stop_market_data()
+        await publisher.stop()
+
 @app.get("/")
 async def root():
     return {"message": "Trade Simulator API"}
 
+@app.get("/latency")
+async def latency():
+    """
+    Per-stage latency percentiles (seconds) from exchange timestamp to WebSocket emit
+    """
+    return broadcaster.tracer.summary()
+
+@app.get("/pipeline")
+async def pipeline_metrics():
+    """
+    Worker ring fill levels, drops and resyncs (empty when analysis runs on the event loop)
+    """
+    return pipeline.metrics() if pipeline is not None else {}
+
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    await websocket.accept()
+async def websocket_endpoint(websocket: WebSocket, instId: str = DEFAULT_INSTRUMENT):
+    # Clients offering the delta subprotocol get a JSON schema frame followed by
+    # binary keyframes/deltas (see websocket.delta); everyone else gets JSON text
+    protocol, subprotocol = JSON_PROTOCOL, None
+    if WS_DELTA_ENABLED:
+        protocol, subprotocol = negotiate(websocket.scope.get('subprotocols', []))
+    await websocket.accept(subprotocol=subprotocol)
+    if instId not in market_data_hub.subscribers:
+        logger.warning(f"Rejected WebSocket client for unknown instrument: {instId}")
+        await websocket.close(code=1008)
+        return
+
     connection_id = id(websocket)
     active_connections[connection_id] = websocket
-    
+    queue = broadcaster.register(instId, connection_id, protocol)
+    stream = DeltaStream() if protocol == DELTA_PROTOCOL else None
+
     try:
-        # Initialize models
-        slippage_model = estimate_slippage([], [])
-        maker_taker_model = maker_taker_ratio([], [])
-        historical_data = []
-        
-        async for data in connect_websocket():
-            if connection_id not in active_connections:
-                break
-                
-            try:
-                # Process market data
-                current_price = (float(data['asks'][0][0]) + float(data['bids'][0][0])) / 2
-                volume = float(data['bids'][0][1])
-                market_depth = data['market_depth']
-                
-                # Prepare features for models
-                spread = float(data['asks'][0][0]) - float(data['bids'][0][0])
-                features = [
-                    volume,
-                    spread,
-                    market_depth['bids'] / (market_depth['bids'] + market_depth['asks']),
-                    spread / current_price,
-                    market_depth['bids'],
-                    market_depth['asks']
-                ]
-                
-                # Calculate metrics
-                liquidity = market_depth['bids'] + market_depth['asks']
-                volatility = 0.02  # Default value, can be calculated from historical data
-                impact = calculate_market_impact(TRADE_AMOUNT, volatility, liquidity, current_price)
-                slippage = slippage_model.predict([features])[0]
-                maker_taker_proba = maker_taker_model.predict_proba([features])[0]
-                proportion = maker_taker_proba[1]
-                
-                # Calculate fees
-                maker_fee = FEE_TIERS['Tier1'] * 0.8
-                taker_fee = FEE_TIERS['Tier1']
-                fees = (proportion * maker_fee + (1 - proportion) * taker_fee) * TRADE_AMOUNT
-                
-                # Calculate net cost
-                net_cost = slippage + fees + impact
-                
-                # Prepare response data
-                response_data = {
-                    "market_data": {
-                        "best_bid": data['bids'][0][0],
-                        "best_ask": data['asks'][0][0],
-                        "spread": spread,
-                        "volume": volume
-                    },
-                    "analysis": {
-                        "slippage": float(slippage),
-                        "fees": float(fees),
-                        "market_impact": float(impact),
-                        "net_cost": float(net_cost),
-                        "maker_taker_ratio": float(proportion),
-                        "latency": float(data.get('latency', 0.005))
-                    }
-                }
-                
-                # Send data to client
-                await websocket.send_json(response_data)
-                
-            except Exception as e:
-                logger.error(f"Error processing data: {e}")
+        while connection_id in active_connections:
+            message = await queue.get()
+            if stream is None:
+                await websocket.send_text(message)
                 continue
-                
+            for frame in stream.frames(message):
+                if isinstance(frame, bytes):
+                    await websocket.send_bytes(frame)
+                else:
+                    await websocket.send_text(frame)
+
+    except WebSocketDisconnect:
+        logger.info(f"WebSocket client {connection_id} disconnected")
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
     finally:
+        broadcaster.unregister(instId, connection_id)
         if connection_id in active_connections:
             del active_connections[connection_id]
 
 if __name__ == "__main__":
+    import inspect
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=5000)
\ No newline at end of file
+    options = {}
+    # permessage-deflate is configurable from uvicorn 0.19 onwards
+    if 'ws_per_message_deflate' in inspect.signature(uvicorn.Config).parameters:
+        options['ws_per_message_deflate'] = WS_PER_MESSAGE_DEFLATE
+    uvicorn.run(app, host="0.0.0.0", port=5000, **options)
\ No newline at end of file
@@ -0,0 +1,5 @@
+# backtest package initialization
+
+from .engine import run_backtest, print_report
+
+__all__ = ['run_backtest', 'print_report']
\ No newline at end of file
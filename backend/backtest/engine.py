@@ -0,0 +1,285 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage.tick_store import TickStore, NANOSECONDS
+from models.features import feature_matrix
+from models.market_impact import AlmgrenChrissModel
+from models.cost_engine import fee_rates, expected_fees
+from models.regression import SlippageModel, MakerTakerModel
+from models.persistence import load_models, instrument_state_dir
+from config.settings import (TRADE_AMOUNT, MODEL_STATE_DIR, TICK_STORE_DIR, VOLATILITY_WINDOW,
+                             DEFAULT_VOLATILITY, BACKTEST_SLICES, BACKTEST_SLICE_TICKS, BACKTEST_CHUNK_ROWS)
+from utils.logger import logger
+
+COMPONENTS = ('slippage', 'fees', 'market_impact', 'net_cost')
+
+# Models used by the current worker process: set up by init_worker, with the
+# slippage and maker/taker models loaded once per instrument by instrument_models
+_models = {}
+
+def init_worker(model_dir):
+    """
+    Process pool initializer: load the shared impact model once per worker
+    """
+    impact_model = AlmgrenChrissModel()
+    if model_dir:
+        load_models(model_dir, None, None, impact_model)
+    _models.clear()
+    _models.update(model_dir=model_dir, impact=impact_model)
+
+def instrument_models(inst_id):
+    """
+    Slippage and maker/taker models of one instrument, as saved by the FastAPI
+    app, falling back to the shared models (e.g. from the desktop simulator)
+    :return: (slippage model, maker/taker model)
+    """
+    key = ('instrument', inst_id)
+    if key not in _models:
+        slippage_model, maker_taker_model = SlippageModel(), MakerTakerModel()
+        model_dir = _models['model_dir']
+        if model_dir:
+            if load_models(instrument_state_dir(model_dir, inst_id), slippage_model, maker_taker_model, None) is None:
+                load_models(model_dir, slippage_model, maker_taker_model, None)
+        _models[key] = (slippage_model, maker_taker_model)
+    return _models[key]
+
+def book_features(columns):
+    """
+    models.features.prepare_features over stored book rows; market depth is the
+    stored levels, as live with a store depth of MARKET_DEPTH_LEVELS
+    :return: (features (rows, 6), mid prices)
+    """
+    return feature_matrix(columns['bid_px'][:, 0], columns['bid_sz'][:, 0], columns['ask_px'][:, 0],
+                          columns['bid_sz'].sum(axis=1), columns['ask_sz'].sum(axis=1))
+
+def rolling_volatility(mid_prices, window, rows):
+    """
+    Population std of the last `window` returns at each of the final `rows`
+    prices, matching VolatilityEstimator; DEFAULT_VOLATILITY until the window is full
+    """
+    returns = np.diff(mid_prices) / mid_prices[:-1]
+    volatility = np.full(rows, DEFAULT_VOLATILITY)
+    if len(returns) >= window:
+        stds = sliding_window_view(returns, window).std(axis=1)
+        volatility[rows - len(stds):] = stds[-rows:]
+    return volatility
+
+def walk_levels(prices, sizes, amounts):
+    """
+    Fill notional `amounts` against fixed-width level rows, one order per row
+    :return: (filled quantity, filled notional, complete mask)
+    """
+    missing = np.isnan(prices)
+    prices = np.where(missing, 0.0, prices)
+    sizes = np.where(missing, 0.0, sizes)
+    cum_notional = np.cumsum(prices * sizes, axis=1)
+    cum_quantity = np.cumsum(sizes, axis=1)
+
+    rows = np.arange(len(amounts))
+    full_levels = (cum_notional < amounts[:, None]).sum(axis=1)
+    complete = full_levels < prices.shape[1]
+    last_full = np.maximum(full_levels - 1, 0)
+    prev_notional = np.where(full_levels > 0, cum_notional[rows, last_full], 0.0)
+    prev_quantity = np.where(full_levels > 0, cum_quantity[rows, last_full], 0.0)
+
+    next_level = np.minimum(full_levels, prices.shape[1] - 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        partial = np.where(complete, (amounts - prev_notional) / prices[rows, next_level], 0.0)
+    quantity = prev_quantity + partial
+    notional = np.where(complete, amounts, prev_notional)
+    return quantity, notional, complete
+
+def schedule_fractions(impact_model, volatility, slices):
+    """
+    Almgren-Chriss trading trajectory of the impact model, as fractions of the parent order per child slice.
+    The model returns the holdings x_k at slices + 1 points; slice k trades x_k - x_{k+1}.
+    """
+    model = AlmgrenChrissModel(max(volatility, 1e-8), impact_model.eta, impact_model.gamma, impact_model.T, slices + 1)
+    holdings, _ = model.calculate_optimal_trade_schedule(1.0, 1.0)
+    trades = -np.diff(np.asarray(holdings, dtype=float))
+    total = trades.sum()
+    return trades / total if total > 0 else np.full(slices, 1.0 / slices)
+
+def empty_metrics():
+    return {name: np.zeros(5) for name in COMPONENTS}  # count, sum error, sum |error|, sum error^2, sum realized
+
+def accumulate(metrics, name, predicted, realized):
+    error = predicted - realized
+    metrics[name] += [len(error), error.sum(), np.abs(error).sum(), (error ** 2).sum(), realized.sum()]
+
+def backtest_chunk(inst_id, columns, first, last, trade_amount, fee_tier, slices, slice_ticks, metrics):
+    """
+    Predict and simulate one parent buy order at each arrival row in [first, last)
+    :param columns: zero-copy partition columns from TickStore.read_partition
+    :return: number of arrival rows evaluated
+    """
+    slippage_model, maker_taker_model = instrument_models(inst_id)
+    impact_model = _models['impact']
+    horizon = (slices - 1) * slice_ticks
+    history = max(first - VOLATILITY_WINDOW, 0)
+    rows = last - first
+    window = {name: np.asarray(column[history:last + horizon]) for name, column in columns.items()}
+    arrival = first - history
+
+    features, mid_price = book_features(window)
+    volatility = rolling_volatility(mid_price[:arrival + rows], VOLATILITY_WINDOW, rows)
+    features, mid_price = features[arrival:arrival + rows], mid_price[arrival:arrival + rows]
+
+    # Predicted costs, as computed live
+    predicted_slippage = np.broadcast_to(slippage_model.predict(features), rows)
+    proportion = np.broadcast_to(maker_taker_model.predict_proba(features)[:, 1], rows)
+    predicted_fees = expected_fees(trade_amount, proportion, fee_tier)
+    predicted_impact = impact_model.calculate_market_impact_batch(trade_amount, volatility)
+    predicted_net = predicted_slippage + predicted_fees + predicted_impact
+
+    # Realized: immediate walk-the-book slippage, and implementation shortfall of the
+    # parent order sliced along the Almgren-Chriss schedule over the following ticks
+    amounts = np.full(rows, float(trade_amount))
+    quantity, notional, complete = walk_levels(window['ask_px'][arrival:arrival + rows],
+                                               window['ask_sz'][arrival:arrival + rows], amounts)
+    realized_slippage = notional - quantity * mid_price
+
+    fractions = schedule_fractions(impact_model, float(np.median(volatility)), slices)
+    parent_quantity = np.zeros(rows)
+    parent_notional = np.zeros(rows)
+    for j, fraction in enumerate(fractions):
+        offset = arrival + j * slice_ticks
+        child_quantity, child_notional, child_complete = walk_levels(
+            window['ask_px'][offset:offset + rows], window['ask_sz'][offset:offset + rows], amounts * fraction)
+        parent_quantity += child_quantity
+        parent_notional += child_notional
+        complete &= child_complete
+    realized_fees = parent_notional * fee_rates(fee_tier)[1]  # Walking the book always takes liquidity
+    realized_impact = parent_notional - parent_quantity * mid_price - realized_slippage
+    realized_net = parent_notional - parent_quantity * mid_price + realized_fees
+
+    mask = complete & np.isfinite(predicted_net) & np.isfinite(realized_net)
+    accumulate(metrics, 'slippage', predicted_slippage[mask], realized_slippage[mask])
+    accumulate(metrics, 'fees', predicted_fees[mask], realized_fees[mask])
+    accumulate(metrics, 'market_impact', predicted_impact[mask], realized_impact[mask])
+    accumulate(metrics, 'net_cost', predicted_net[mask], realized_net[mask])
+    return rows
+
+def backtest_partition(task):
+    """
+    Backtest one instrument/day partition; runs inside a pool worker
+    :param task: (store_root, inst_id, day, start, end, trade_amount, fee_tier, slices, slice_ticks, chunk_rows)
+    """
+    store_root, inst_id, day, start, end, trade_amount, fee_tier, slices, slice_ticks, chunk_rows = task
+    start_time = time.perf_counter()
+    metrics = empty_metrics()
+    rows = 0
+    try:
+        columns = TickStore(store_root).read_partition(inst_id, day)
+        timestamps = columns['timestamp']
+        first = 0 if start is None else int(np.searchsorted(timestamps, int(start * NANOSECONDS), 'left'))
+        last = len(timestamps) if end is None else int(np.searchsorted(timestamps, int(end * NANOSECONDS), 'right'))
+        # Arrivals need the full execution horizon inside the partition
+        last = min(last, len(timestamps) - (slices - 1) * slice_ticks)
+        for chunk_start in range(first, last, chunk_rows):
+            rows += backtest_chunk(inst_id, columns, chunk_start, min(chunk_start + chunk_rows, last),
+                                   trade_amount, fee_tier, slices, slice_ticks, metrics)
+    except Exception as e:
+        logger.error(f"Error backtesting {inst_id} {day}: {e}")
+    return {'instId': inst_id, 'day': day, 'rows': rows, 'seconds': time.perf_counter() - start_time, 'metrics': metrics}
+
+def summarize(metrics):
+    summary = {}
+    for name, (count, total_error, total_abs_error, total_sq_error, total_realized) in metrics.items():
+        if count == 0:
+            summary[name] = {'count': 0}
+            continue
+        summary[name] = {
+            'count': int(count),
+            'bias': total_error / count,
+            'mae': total_abs_error / count,
+            'rmse': (total_sq_error / count) ** 0.5,
+            'mean_realized': total_realized / count,
+            'mean_predicted': (total_error + total_realized) / count
+        }
+    return summary
+
+def run_backtest(store_root=TICK_STORE_DIR, instruments=None, start=None, end=None, workers=None,
+                 model_dir=MODEL_STATE_DIR, trade_amount=TRADE_AMOUNT, fee_tier='Tier1',
+                 slices=BACKTEST_SLICES, slice_ticks=BACKTEST_SLICE_TICKS, chunk_rows=BACKTEST_CHUNK_ROWS):
+    """
+    Backtest the cost models over every stored instrument/day partition in a time range
+    :param start: optional epoch seconds of the first arrival
+    :param end: optional epoch seconds of the last arrival
+    :param workers: pool size (None = CPU count); 0 runs in this process
+    :param slices: child orders the parent is split into along the Almgren-Chriss schedule
+    :param slice_ticks: stored ticks between consecutive child orders
+    :return: report dict with per-partition and aggregate error and throughput statistics
+    """
+    store = TickStore(store_root)
+    tasks = []
+    for inst_id in instruments or store.instruments():
+        for day, _ in store.read(inst_id, start, end):
+            tasks.append((store_root, inst_id, day, start, end, trade_amount, fee_tier, slices, slice_ticks, chunk_rows))
+
+    start_time = time.perf_counter()
+    if workers == 0:
+        init_worker(model_dir)
+        results = [backtest_partition(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(model_dir,)) as pool:
+            results = list(pool.map(backtest_partition, tasks))
+    elapsed = time.perf_counter() - start_time
+
+    total = empty_metrics()
+    for result in results:
+        for name in COMPONENTS:
+            total[name] += result['metrics'][name]
+        result['summary'] = summarize(result.pop('metrics'))
+    rows = sum(result['rows'] for result in results)
+    return {
+        'partitions': results,
+        'summary': summarize(total),
+        'rows': rows,
+        'seconds': elapsed,
+        'rows_per_second': rows / elapsed if elapsed > 0 else 0.0
+    }
+
+def print_report(report):
+    print("Execution Cost Backtest")
+    print("=" * 78)
+    print(f"{'Instrument':<16} | {'Day':<10} | {'Rows':>10} | {'Rows/s':>10} | {'Net cost MAE':>12} | {'Bias':>8}")
+    print("-" * 78)
+    for result in report['partitions']:
+        net = result['summary']['net_cost']
+        rate = result['rows'] / result['seconds'] if result['seconds'] > 0 else 0.0
+        print(f"{result['instId']:<16} | {result['day']:<10} | {result['rows']:>10,} | {rate:>10,.0f} | "
+              f"{net.get('mae', float('nan')):>12.6g} | {net.get('bias', float('nan')):>8.4g}")
+
+    print("\nPredicted vs realized (USD per parent order)")
+    print(f"{'Component':<14} | {'Predicted':>10} | {'Realized':>10} | {'Bias':>10} | {'MAE':>10} | {'RMSE':>10}")
+    print("-" * 78)
+    for name, stats in report['summary'].items():
+        if stats['count']:
+            print(f"{name:<14} | {stats['mean_predicted']:>10.6g} | {stats['mean_realized']:>10.6g} | "
+                  f"{stats['bias']:>10.6g} | {stats['mae']:>10.6g} | {stats['rmse']:>10.6g}")
+    print(f"\nEvaluated {report['rows']:,} arrivals in {report['seconds']:.2f}s "
+          f"({report['rows_per_second']:,.0f} rows/s)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest execution cost models over a tick store")
+    parser.add_argument('store', nargs='?', default=TICK_STORE_DIR)
+    parser.add_argument('--instruments', nargs='*')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--models', default=MODEL_STATE_DIR)
+    parser.add_argument('--amount', type=float, default=TRADE_AMOUNT)
+    args = parser.parse_args()
+    if not args.store:
+        parser.error("no tick store given and TICK_STORE_DIR is not set")
+
+    print_report(run_backtest(args.store, args.instruments, workers=args.workers,
+                              model_dir=args.models, trade_amount=args.amount))
+
+if __name__ == "__main__":
+    main()
@@ -5,4 +5,93 @@ FEE_TIERS = {
     "Tier2": 0.0008,
     "Tier3": 0.0005
 }
+COST_CURVE_SIZES = [10, 50, 100, 250, 500, 1000, 5000, 10000]  # Order sizes (USD) for the cost curve
 LOG_FILE = "trade_simulator.log"
+
+# Market data hub
+DEFAULT_INSTRUMENT = "BTC-USDT-SWAP"
+INSTRUMENTS = [
+    "BTC-USDT-SWAP",
+    "ETH-USDT-SWAP",
+    "SOL-USDT-SWAP",
+    "BTC-USDT",
+    "ETH-USDT",
+    "SOL-USDT"
+]
+MARKET_DATA_CONNECTIONS = 4  # Upstream sockets shared by all instruments
+SUBSCRIBER_QUEUE_SIZE = 100
+CLIENT_QUEUE_SIZE = 10  # Per FastAPI client; oldest messages are dropped when full
+
+# Online model training
+ONLINE_LEARNING = True
+ONLINE_BATCH_SIZE = 20  # Ticks per partial_fit call
+TRAINING_BUFFER_SIZE = 5000  # Recent samples kept for quantile model retraining
+QUANTILE_RETRAIN_INTERVAL = 1000  # New samples between background quantile retrains
+
+# Model persistence
+MODEL_STATE_DIR = "model_state"
+MODEL_SAVE_INTERVAL = 300  # Seconds between periodic snapshots
+
+# Volatility estimation
+HISTORY_CAPACITY = 1000  # Ticks of (timestamp, mid, volume) history kept
+VOLATILITY_WINDOW = 100  # Returns in the rolling volatility window
+EWMA_LAMBDA = 0.94  # Decay factor of the EWMA variance
+DEFAULT_VOLATILITY = 0.02  # Used until the rolling window is full
+
+# Feed recording and replay
+FEED_RECORD_PATH = None  # e.g. "feed.okx" to capture the raw feed while running
+FEED_REPLAY_PATH = None  # Replay this recording instead of connecting to OKX
+FEED_REPLAY_SPEED = 1.0  # None/0 = as fast as possible, 1.0 = real time, N = N x speed
+FEED_CHUNK_MESSAGES = 1000  # Messages per compressed chunk
+FEED_CHUNK_SECONDS = 5.0  # Longest span of feed time in one chunk
+
+# Tick store
+TICK_STORE_DIR = None  # e.g. "tick_store" to persist top-N book levels while running
+TICK_STORE_DEPTH = 10  # Book levels kept per side
+TICK_STORE_FLUSH_ROWS = 1000  # Rows buffered per partition before they are written
+
+# Backtesting
+BACKTEST_SLICES = 10  # Child orders per simulated parent order
+BACKTEST_SLICE_TICKS = 10  # Stored ticks between child orders
+BACKTEST_CHUNK_ROWS = 100000  # Arrival rows evaluated per vectorized chunk
+
+# User interface and console output
+UI_MAX_FPS = 30  # Qt renders per second; ticks in between are coalesced
+QUIET_MODE = False  # Disable per-tick console status lines
+
+# Tick conflation
+CONFLATION_MAX_STALENESS = 1.0  # Seconds before an unprocessed tick is discarded (None = never)
+CONFLATION_MIN_INTERVAL = 0.0  # Minimum seconds between analytics runs
+
+# Latency histograms
+HISTOGRAM_RESOLUTION = 1e-6  # Seconds; smallest distinguishable latency
+HISTOGRAM_SUB_BUCKETS = 128  # Linear buckets per power of two (<1% relative error)
+HISTOGRAM_MAX_VALUE = 3600.0  # Seconds; larger values are clamped
+LATENCY_REPORT_INTERVAL = 1.0  # Seconds between latency summaries pushed to the UI
+LATENCY_WINDOW = 60.0  # Seconds covered by windowed latency views
+LATENCY_WINDOW_SLICES = 6  # Sub-histograms the window rotates through
+LATENCY_HALF_LIFE = 30.0  # Seconds for decaying latency views to halve
+
+# Order book aggregates
+BOOK_AGGREGATE_DEPTHS = (5, 10, 25)  # Top-N levels whose size and notional are kept up to date per update
+MARKET_DEPTH_LEVELS = 10  # Levels per side used for market depth, imbalance and weighted mid
+AGGREGATE_RESYNC_INTERVAL = 10000  # Updates between exact recomputations of the running sums
+
+# FastAPI client protocol
+WS_DELTA_ENABLED = True  # Offer binary delta frames to clients that request the subprotocol
+WS_PER_MESSAGE_DEFLATE = True  # Allow permessage-deflate for clients that negotiate it
+
+# Worker processes
+ANALYSIS_WORKERS = 0  # Processes running book maintenance and analytics for the FastAPI app (0 = on the event loop)
+WORKER_ANALYZER = "app:create_worker_analyzer"  # Factory(orderbooks) -> analyze(tick) run in each worker
+WORKER_RING_SIZE = 4 * 1024 * 1024  # Bytes per shared-memory ring, per direction and worker
+WORKER_POLL_INTERVAL = 0.0005  # Seconds an idle side sleeps before polling its ring again
+WORKER_BATCH_SIZE = 64  # Book pushes a worker applies before analysing the newest tick of each instrument
+
+# Multi-worker serving (serve.py)
+SERVE_WORKERS = 4  # uvicorn worker processes sharing one market data producer
+SERVE_LOOP = "auto"  # "auto" uses uvloop when installed; "uvloop" or "asyncio" to force
+PUBSUB_PATH = None  # Unix socket between the producer and the serving workers (None = new private directory per run)
+PUBSUB_PORT = 5601  # Loopback port used instead of the socket on Windows
+PUBSUB_BUFFER_LIMIT = 1024 * 1024  # Bytes queued per subscriber before it misses messages
+PUBSUB_RECONNECT_DELAY = 1.0  # Seconds between attempts to reach the producer
@@ -1,15 +1,24 @@
 # main.py
 
 import asyncio
-import numpy as np
+import time
 from datetime import datetime
 from PyQt5.QtWidgets import QApplication
-from websocket.data_stream import connect_websocket
+from websocket.data_stream import connect_websocket, OrderBookManager
+from websocket.recorder import FeedRecorder, replay_websocket
+from storage.tick_store import TickStore
 from ui.main_window import TradeSimulatorUI
-from models.market_impact import calculate_market_impact
-from models.regression import estimate_slippage, maker_taker_ratio
-from models.latency import measure_latency
-from config.settings import TRADE_AMOUNT, FEE_TIERS
+from models.market_impact import market_impact_model
+from models.cost_engine import estimate_costs
+from models.features import prepare_features
+from models.regression import estimate_slippage, maker_taker_ratio, OnlineTrainer
+from models.latency import measure_latency, stamp, LatencyTracer
+from models.persistence import save_models, load_models
+from models.volatility import VolatilityEstimator
+from config.settings import TRADE_AMOUNT, ONLINE_LEARNING, MODEL_STATE_DIR, MODEL_SAVE_INTERVAL
+from config.settings import FEED_RECORD_PATH, FEED_REPLAY_PATH, FEED_REPLAY_SPEED, TICK_STORE_DIR, QUIET_MODE
+from config.settings import LATENCY_REPORT_INTERVAL
+from utils.conflation import ConflatingSlot
 from utils.logger import logger
 import sys
 
@@ -17,108 +26,134 @@ class TradingSimulator:
     def __init__(self):
         self.slippage_model = estimate_slippage([], [])
         self.maker_taker_model = maker_taker_ratio([], [])
-        self.historical_data = []
+        self.orderbook = OrderBookManager()
+        self.trainer = OnlineTrainer(self.slippage_model, self.maker_taker_model, TRADE_AMOUNT) if ONLINE_LEARNING else None
+        self.volatility = VolatilityEstimator()
+        self.tick_store = TickStore(TICK_STORE_DIR) if TICK_STORE_DIR else None
         self.start_time = None
         self.running = True
-        self.batch_size = 10  # Process data in batches for better performance
+        self.ticks = None  # ConflatingSlot of the running simulation
+        self.tracer = LatencyTracer()
+        self.last_latency_report = 0.0
+        self.last_save_time = time.monotonic()
+        self.load_state()
+
+    def load_state(self):
+        """
+        Warm start from the last saved models and market history window
+        """
+        history = load_models(MODEL_STATE_DIR, self.slippage_model, self.maker_taker_model, market_impact_model)
+        if history and 'timestamps' in history:
+            self.volatility.restore(history)
+            logger.info(f"Restored {len(self.volatility.history)} historical data points")
+
+    def save_state(self):
+        history = self.volatility.snapshot() if len(self.volatility.history) else None
+        save_models(MODEL_STATE_DIR, self.slippage_model, self.maker_taker_model, market_impact_model, history)
+        self.last_save_time = time.monotonic()
 
     def prepare_features(self, data):
-        try:
-            volume = float(data['bids'][0][1])
-            spread = float(data['asks'][0][0]) - float(data['bids'][0][0])
-            mid_price = (float(data['asks'][0][0]) + float(data['bids'][0][0])) / 2
-            market_depth = data['market_depth']
-            
-            features = np.array([
-                volume,
-                spread,
-                market_depth['bids'] / (market_depth['bids'] + market_depth['asks']),
-                spread / mid_price,
-                market_depth['bids'],
-                market_depth['asks']
-            ]).reshape(1, -1)
-            
-            return features, volume, mid_price
-            
-        except Exception as e:
-            logger.error(f"Error preparing features: {e}")
-            return None, None, None
+        return prepare_features(data)
 
     async def run_simulation(self, ui):
         print("\nStarting simulation...")
         logger.info("Starting simulation")
         self.start_time = datetime.now()
         self.running = True
-        data_buffer = []
-        
+        self.ticks = ConflatingSlot()
+        recorder = None
+        producer = None
+
         try:
-            async for data in connect_websocket():
-                if not self.running:
-                    logger.info("Simulation stopped")
-                    break
+            if FEED_REPLAY_PATH:
+                logger.info(f"Replaying feed from {FEED_REPLAY_PATH}")
+                source = replay_websocket(FEED_REPLAY_PATH, orderbook=self.orderbook, speed=FEED_REPLAY_SPEED)
+            else:
+                recorder = FeedRecorder(FEED_RECORD_PATH) if FEED_RECORD_PATH else None
+                source = connect_websocket(orderbook=self.orderbook, recorder=recorder)
 
+            # The feed overwrites the latest tick; analytics run whenever the consumer is free
+            producer = asyncio.create_task(self.receive_ticks(source, self.ticks))
+            while self.running:
+                data = await self.ticks.get()
+                if data is None:
+                    break
                 try:
-                    data_buffer.append(data)
-                    
-                    if len(data_buffer) >= self.batch_size:
-                        latest_data = data_buffer[-1]
-                        features, volume, current_price = self.prepare_features(latest_data)
-                        
-                        if features is not None:
-                            # Update historical data
-                            for d in data_buffer:
-                                if 'bids' in d and 'asks' in d:
-                                    price = (float(d['asks'][0][0]) + float(d['bids'][0][0])) / 2
-                                    vol = float(d['bids'][0][1])
-                                    self.historical_data.append((datetime.now(), price, vol))
-                            
-                            # Maintain historical data size
-                            while len(self.historical_data) > 1000:
-                                self.historical_data = self.historical_data[-1000:]
-
-                            # Calculate metrics
-                            prices = np.array([d[1] for d in self.historical_data[-100:]]) if len(self.historical_data) > 100 else None
-                            volatility = np.std(np.diff(prices) / prices[:-1]) if prices is not None else 0.02
-                            
-                            liquidity = latest_data['market_depth']['bids'] + latest_data['market_depth']['asks']
-                            impact = calculate_market_impact(TRADE_AMOUNT, volatility, liquidity, current_price)
-                            slippage = self.slippage_model.predict(features)[0]
-                            maker_taker_proba = self.maker_taker_model.predict_proba(features)[0]
-                            proportion = maker_taker_proba[1]
-
-                            # Calculate fees
-                            maker_fee = FEE_TIERS['Tier1'] * 0.8
-                            taker_fee = FEE_TIERS['Tier1']
-                            fees = (proportion * maker_fee + (1 - proportion) * taker_fee) * TRADE_AMOUNT
-
-                            # Final metrics
-                            net_cost = slippage + fees + impact
-                            latency = latest_data.get('latency', 0.005)
-
-                            # Update UI
-                            print(f"\rSlippage: {slippage:.5f} | Fees: {fees:.5f} | Impact: {impact:.5f} | Net Cost: {net_cost:.5f} | M/T Ratio: {proportion:.2f} | Latency: {latency:.5f}s", end='')
-                            sys.stdout.flush()
-                            
-                            ui.update_output(
-                                f"{slippage:.5f}",
-                                f"{fees:.5f}",
-                                f"{impact:.5f}",
-                                f"{net_cost:.5f}",
-                                f"{proportion:.2f}",
-                                f"{latency:.5f}"
-                            )
-
-                            data_buffer = []
-                            await asyncio.sleep(0.01)
-
+                    self.process_tick(data, ui)
+                    if time.monotonic() - self.last_save_time > MODEL_SAVE_INTERVAL:
+                        self.save_state()
                 except Exception as e:
                     logger.error(f"Error processing data: {e}")
-                    data_buffer = []
                     continue
 
+            logger.info(f"Simulation stopped, ticks: {self.ticks.stats()}")
+
         except Exception as e:
             logger.error(f"Simulation error: {e}")
             self.running = False
+        finally:
+            if producer is not None:
+                producer.cancel()
+                await asyncio.gather(producer, return_exceptions=True)
+            if recorder is not None:
+                recorder.close()
+            if self.tick_store is not None:
+                self.tick_store.flush()
+            self.save_state()
+
+    async def receive_ticks(self, source, slot):
+        """
+        Producer: per-tick bookkeeping that must see every message, then hand
+        the tick to the conflating slot
+        """
+        try:
+            async for data in source:
+                if not self.running:
+                    break
+                try:
+                    # Volatility is updated per tick in constant time
+                    if data.bid_px and data.ask_px:
+                        self.volatility.update(time.time(), data.mid_price, data.bid_sz[0])
+                    if self.tick_store is not None:
+                        self.tick_store.append(data.inst_id, self.orderbook, data.received_at)
+                    slot.put(data)
+                except Exception as e:
+                    logger.error(f"Error receiving data: {e}")
+        finally:
+            slot.close()
+
+    def process_tick(self, data, ui):
+        """
+        Consumer: compute and publish the cost analysis for the latest tick
+        """
+        trace = data.trace
+        stamp(trace, 'dequeued')
+        features, volume, current_price = self.prepare_features(data)
+        if features is None:
+            return
+
+        if self.trainer is not None:
+            self.trainer.update(features, self.orderbook)
+        stamp(trace, 'features')
+
+        # Calculate metrics
+        costs = estimate_costs(features, current_price, data.bid_depth + data.ask_depth, self.volatility.volatility,
+                               self.slippage_model, self.maker_taker_model, self.orderbook, data.latency)
+        stamp(trace, 'inference')
+
+        # Update UI; values are only formatted when the bridge renders
+        if not QUIET_MODE:
+            print(f"\rSlippage: {costs.slippage:.5f} | Fees: {costs.fees:.5f} | Impact: {costs.market_impact:.5f} | Net Cost: {costs.net_cost:.5f} | M/T Ratio: {costs.maker_taker_ratio:.2f} | Latency: {costs.latency:.5f}s | Ticks: {self.ticks.processed}/{self.ticks.received}", end='')
+            sys.stdout.flush()
+
+        ui.bridge.update_costs(costs)
+
+        if trace is not None:
+            stamp(trace, 'emit')
+            self.tracer.record(trace)
+            if time.monotonic() - self.last_latency_report > LATENCY_REPORT_INTERVAL:
+                ui.bridge.update_latency(self.tracer.summary())
+                self.last_latency_report = time.monotonic()
 
 async def run_async_app(ui, simulator):
     try:
@@ -128,13 +163,11 @@ async def run_async_app(ui, simulator):
                     await simulator.run_simulation(ui)
                 except Exception as e:
                     logger.error(f"Simulation error: {e}")
-                    ui.simulation_running = False
-                    ui.start_button.setText("Start Simulation")
+                    ui.bridge.stop()
             await asyncio.sleep(0.1)
     except Exception as e:
         logger.error(f"Async app error: {e}")
-        ui.simulation_running = False
-        ui.start_button.setText("Start Simulation")
+        ui.bridge.stop()
 
 def start_ui():
     app = QApplication(sys.argv)
@@ -0,0 +1,152 @@
+import numpy as np
+from config.settings import FEE_TIERS, COST_CURVE_SIZES, TRADE_AMOUNT
+from models.market_impact import market_impact_model, calculate_market_impact
+from utils.logger import logger
+
+SIDES = ('buy', 'sell')
+MAKER_FEE_RATIO = 0.8  # Maker fee as a fraction of the taker fee
+
+class CostResult:
+    """
+    Expected cost of one order for one tick, as plain floats
+    """
+    __slots__ = ('slippage', 'fees', 'market_impact', 'net_cost', 'maker_taker_ratio', 'volatility',
+                 'latency', 'cost_curve')
+
+    def __init__(self, slippage, fees, market_impact, maker_taker_ratio, volatility, latency=0.0, cost_curve=None):
+        self.slippage = slippage
+        self.fees = fees
+        self.market_impact = market_impact
+        self.net_cost = slippage + fees + market_impact
+        self.maker_taker_ratio = maker_taker_ratio
+        self.volatility = volatility
+        self.latency = latency
+        self.cost_curve = cost_curve  # CostEngine.evaluate() matrix, or None
+
+    def to_dict(self):
+        return {
+            'slippage': self.slippage,
+            'fees': self.fees,
+            'market_impact': self.market_impact,
+            'net_cost': self.net_cost,
+            'maker_taker_ratio': self.maker_taker_ratio,
+            'latency': self.latency
+        }
+
+class CostEngine:
+    def __init__(self, order_sizes=None, fee_tiers=None, impact_model=None, maker_fee_ratio=MAKER_FEE_RATIO):
+        """
+        Vectorized transaction cost evaluation over a ladder of order sizes,
+        every fee tier and both sides of the book
+        :param order_sizes: order sizes to evaluate (defaults to COST_CURVE_SIZES)
+        :param fee_tiers: dict of tier name -> taker fee rate (defaults to FEE_TIERS)
+        :param impact_model: AlmgrenChrissModel used for the impact component
+        :param maker_fee_ratio: maker fee as a fraction of the taker fee
+        """
+        self.order_sizes = np.asarray(order_sizes if order_sizes is not None else COST_CURVE_SIZES, dtype=float)
+        fee_tiers = fee_tiers or FEE_TIERS
+        self.tiers = list(fee_tiers)
+        self.taker_fees = np.array([fee_tiers[tier] for tier in self.tiers], dtype=float)
+        self.maker_fees = self.taker_fees * maker_fee_ratio
+        self.impact_model = impact_model or market_impact_model
+
+    def evaluate(self, volatility, maker_proportion=0.5, slippage=0.0, orderbook=None):
+        """
+        Compute the full cost matrix in one NumPy pass
+        :param volatility: current volatility used for market impact
+        :param maker_proportion: maker fill probability, scalar or one value per side
+        :param slippage: slippage cost, scalar or array broadcastable to (sizes, sides)
+        :param orderbook: optional OrderBookManager; when given, slippage is taken from
+                          walking its live levels for every size and side instead
+        :return: dict of arrays shaped (sizes, tiers, sides) plus the axis labels
+        """
+        sizes = self.order_sizes
+        shape = (len(sizes), len(self.tiers), len(SIDES))
+        if orderbook is not None:
+            slippage = orderbook.slippage_curve(sizes)
+
+        impact = self.impact_model.calculate_market_impact_batch(sizes, volatility)
+        proportion = np.broadcast_to(np.asarray(maker_proportion, dtype=float), (len(SIDES),))
+        fee_rates = proportion * self.maker_fees[:, None] + (1 - proportion) * self.taker_fees[:, None]
+        fees = sizes[:, None, None] * fee_rates[None, :, :]
+        slippage = np.broadcast_to(np.asarray(slippage, dtype=float), (len(sizes), len(SIDES)))[:, None, :]
+
+        return {
+            'sizes': sizes,
+            'tiers': self.tiers,
+            'sides': SIDES,
+            'slippage': np.broadcast_to(slippage, shape),
+            'fees': fees,
+            'market_impact': np.broadcast_to(impact[:, None, None], shape),
+            'net_cost': slippage + fees + impact[:, None, None]
+        }
+
+def serialize_cost_curve(curve, arrays=False):
+    """
+    Convert a cost matrix into plain lists for JSON output
+    :param arrays: keep the NumPy arrays for encoders that write them natively
+                   (websocket.codec.dumps), avoiding nested per-tick lists
+    """
+    return {
+        'sizes': curve['sizes'] if arrays else curve['sizes'].tolist(),
+        'tiers': list(curve['tiers']),
+        'sides': list(curve['sides']),
+        'net_cost': curve['net_cost'] if arrays else curve['net_cost'].tolist()
+    }
+
+def restore_cost_curve(data):
+    """
+    Inverse of serialize_cost_curve for a curve that went through JSON: the
+    numeric lists become arrays again
+    """
+    data['sizes'] = np.asarray(data['sizes'], dtype=float)
+    data['net_cost'] = np.asarray(data['net_cost'], dtype=float)
+    return data
+
+# Create a global instance for use throughout the application
+cost_engine = CostEngine()
+
+def calculate_cost_curve(volatility, maker_proportion=0.5, slippage=0.0, orderbook=None):
+    """
+    Wrapper function for cost matrix evaluation
+    """
+    try:
+        return cost_engine.evaluate(volatility, maker_proportion, slippage, orderbook)
+    except Exception as e:
+        logger.error(f"Error calculating cost curve: {e}")
+        return None
+
+def fee_rates(fee_tier='Tier1'):
+    """
+    Maker and taker fee rates of a fee tier
+    :return: (maker fee, taker fee)
+    """
+    taker_fee = FEE_TIERS[fee_tier]
+    return taker_fee * MAKER_FEE_RATIO, taker_fee
+
+def expected_fees(amount, maker_proportion, fee_tier='Tier1'):
+    """
+    Fees of an order filled as maker with probability `maker_proportion`;
+    scalars or NumPy arrays
+    """
+    maker_fee, taker_fee = fee_rates(fee_tier)
+    return (maker_proportion * maker_fee + (1 - maker_proportion) * taker_fee) * amount
+
+def estimate_costs(features, price, liquidity, volatility, slippage_model, maker_taker_model,
+                   orderbook=None, latency=0.0, amount=TRADE_AMOUNT, fee_tier='Tier1'):
+    """
+    Slippage, fees, impact and cost curve for one tick's feature row
+    :param features: model feature row of shape (1, 6)
+    :param price: current mid price
+    :param liquidity: resting size used by the impact model
+    :param orderbook: optional OrderBookManager for the walk-the-book cost curve
+    :return: CostResult
+    """
+    impact = float(calculate_market_impact(amount, volatility, liquidity, price))
+    slippage = float(slippage_model.predict(features)[0])
+    proportion = float(maker_taker_model.predict_proba(features)[0][1])
+
+    fees = expected_fees(amount, proportion, fee_tier)
+
+    cost_curve = calculate_cost_curve(volatility, proportion, slippage, orderbook)
+    return CostResult(slippage, fees, impact, proportion, volatility, latency, cost_curve)
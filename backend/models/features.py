@@ -0,0 +1,35 @@
+import numpy as np
+from utils.logger import logger
+
+def feature_matrix(best_bid, best_bid_size, best_ask, bid_depth, ask_depth):
+    """
+    Model features from top-of-book values, elementwise over scalars or per-row
+    arrays, shared by the live path and the backtest
+    :return: (features of shape (rows, 6), mid prices)
+    """
+    spread = best_ask - best_bid
+    mid_price = (best_ask + best_bid) / 2
+    features = np.column_stack([
+        best_bid_size,
+        spread,
+        bid_depth / (bid_depth + ask_depth),
+        spread / mid_price,
+        bid_depth,
+        ask_depth
+    ])
+    return features, mid_price
+
+def prepare_features(data):
+    """
+    Model feature row for one processed order book update
+    :param data: BookTick with top-of-book levels and market depth
+    :return: (features of shape (1, 6), best bid size, mid price), or (None, None, None) on bad input
+    """
+    try:
+        volume = data.bid_sz[0]
+        features, mid_price = feature_matrix(data.bid_px[0], volume, data.ask_px[0], data.bid_depth, data.ask_depth)
+        return features, volume, mid_price
+
+    except Exception as e:
+        logger.error(f"Error preparing features: {e}")
+        return None, None, None
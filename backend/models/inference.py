@@ -0,0 +1,112 @@
+import numpy as np
+
+def _scaler_arrays(scaler, n_features):
+    mean = scaler.mean_ if getattr(scaler, 'mean_', None) is not None and scaler.with_mean else np.zeros(n_features)
+    scale = scaler.scale_ if getattr(scaler, 'scale_', None) is not None and scaler.with_std else np.ones(n_features)
+    return np.asarray(mean, dtype=float), np.asarray(scale, dtype=float)
+
+class LinearKernel:
+    """
+    StandardScaler + linear model folded into a single dot product:
+    ((x - mean) / scale) @ coef + b  ==  x @ (coef / scale) + (b - (mean / scale) @ coef)
+    """
+
+    def __init__(self, scaler, model):
+        coef = np.asarray(model.coef_, dtype=float).ravel()
+        mean, scale = _scaler_arrays(scaler, len(coef))
+        self.weights = coef / scale
+        self.intercept = float(np.ravel(model.intercept_)[0]) - float(np.dot(mean / scale, coef))
+
+    def predict(self, features):
+        return np.asarray(features, dtype=float) @ self.weights + self.intercept
+
+    def get_state(self):
+        return {'weights': self.weights, 'intercept': np.array([self.intercept])}
+
+    @classmethod
+    def from_state(cls, state):
+        kernel = cls.__new__(cls)
+        kernel.weights = state['weights']
+        kernel.intercept = float(state['intercept'][0])
+        return kernel
+
+class LogisticKernel(LinearKernel):
+    """
+    Binary logistic model (LogisticRegression or log-loss SGDClassifier) with its scaler folded in
+    """
+
+    def __init__(self, scaler, model):
+        if np.asarray(model.coef_).shape[0] != 1:
+            raise ValueError("LogisticKernel only supports binary classifiers")
+        super().__init__(scaler, model)
+
+    def predict_proba(self, features):
+        positive = 1.0 / (1.0 + np.exp(-self.predict(features)))
+        return np.column_stack((1.0 - positive, positive))
+
+class TreeEnsembleKernel:
+    """
+    GradientBoostingRegressor flattened into contiguous node arrays.
+
+    All trees are walked together one depth level per step, so a prediction
+    costs max_depth vectorized gathers instead of a Python call per tree.
+    Features are scaled and cast to float32 exactly as sklearn does before
+    the threshold comparisons, which keeps the outputs identical.
+    """
+
+    def __init__(self, scaler, model):
+        trees = [estimator.tree_ for estimator in np.ravel(model.estimators_)]
+        n_features = model.n_features_in_
+        self.mean, self.scale = _scaler_arrays(scaler, n_features)
+
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees[:-1]])
+        self.roots = np.asarray(offsets, dtype=np.intp)
+        left = np.concatenate([np.where(tree.children_left >= 0, tree.children_left + offset, -1)
+                               for tree, offset in zip(trees, offsets)])
+        right = np.concatenate([np.where(tree.children_right >= 0, tree.children_right + offset, -1)
+                                for tree, offset in zip(trees, offsets)])
+        # Leaves point to themselves so every tree can keep stepping until the deepest one finishes
+        node_ids = np.arange(len(left))
+        self.left = np.where(left < 0, node_ids, left)
+        self.right = np.where(right < 0, node_ids, right)
+        self.feature = np.concatenate([np.maximum(tree.feature, 0) for tree in trees]).astype(np.intp)
+        self.threshold = np.concatenate([tree.threshold for tree in trees])
+        self.value = np.concatenate([tree.value.ravel() for tree in trees]) * model.learning_rate
+        self.max_depth = max(tree.max_depth for tree in trees)
+
+        if model.init_ == 'zero':
+            self.baseline = 0.0
+        else:
+            self.baseline = float(np.ravel(model.init_.constant_)[0])
+
+    def predict(self, features):
+        features = np.atleast_2d(np.asarray(features, dtype=float))
+        scaled = ((features - self.mean) / self.scale).astype(np.float32)
+        rows = np.arange(len(scaled))[:, None]
+        nodes = np.broadcast_to(self.roots, (len(scaled), len(self.roots)))
+        for _ in range(self.max_depth):
+            go_left = scaled[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return self.baseline + self.value[nodes].sum(axis=1)
+
+    def get_state(self):
+        return {
+            'mean': self.mean,
+            'scale': self.scale,
+            'roots': self.roots,
+            'left': self.left,
+            'right': self.right,
+            'feature': self.feature,
+            'threshold': self.threshold,
+            'value': self.value,
+            'params': np.array([self.baseline, self.max_depth])
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        kernel = cls.__new__(cls)
+        for name in ('mean', 'scale', 'roots', 'left', 'right', 'feature', 'threshold', 'value'):
+            setattr(kernel, name, state[name])
+        kernel.baseline = float(state['params'][0])
+        kernel.max_depth = int(state['params'][1])
+        return kernel
@@ -1,40 +1,465 @@
+import math
+import threading
 import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
 from typing import Dict, List, Optional
+import numpy as np
+from config.settings import HISTOGRAM_RESOLUTION, HISTOGRAM_SUB_BUCKETS, HISTOGRAM_MAX_VALUE
+from config.settings import LATENCY_WINDOW, LATENCY_WINDOW_SLICES, LATENCY_HALF_LIFE
+
+# Per-tick pipeline stages, in order. Each tick carries a `trace` dict of
+# stage -> wall-clock time (time.time()); 'exchange' is the OKX `ts` field.
+TRACE_STAGES = ('exchange', 'received', 'decoded', 'book', 'dequeued', 'features', 'inference', 'emit')
+REPORT_PERCENTILES = (50, 99, 99.9)
+
+def stamp(trace: Optional[Dict[str, float]], stage: str) -> None:
+    """
+    Record the current time for a stage on a tick's trace, if it has one
+    """
+    if trace is not None:
+        trace[stage] = time.time()
+
+class LatencyHistogram:
+    """
+    HDR-style log-linear histogram: each power of two above `resolution` is
+    split into `sub_buckets` linear buckets, so percentiles carry a relative
+    error below 1/sub_buckets with fixed memory and O(1) recording.
+    Counts are floats so that they can be decayed.
+    """
+
+    def __init__(self, resolution: float = HISTOGRAM_RESOLUTION, sub_buckets: int = HISTOGRAM_SUB_BUCKETS,
+                 max_value: float = HISTOGRAM_MAX_VALUE):
+        """
+        :param resolution: smallest distinguishable value (seconds); smaller values share bucket 0
+        :param sub_buckets: linear buckets per power of two
+        :param max_value: values above this are clamped into the last bucket
+        """
+        self.resolution = resolution
+        self.sub_buckets = sub_buckets
+        self.max_value = max_value
+        magnitudes = max(1, math.ceil(math.log2(max_value / resolution)) + 1)
+        self.counts = np.zeros(magnitudes * sub_buckets + 1)
+        self.count = 0.0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def bucket(self, value: float) -> int:
+        scaled = value / self.resolution
+        if scaled < 1:
+            return 0
+        mantissa, exponent = math.frexp(scaled)  # scaled = mantissa * 2**exponent, mantissa in [0.5, 1)
+        index = (exponent - 1) * self.sub_buckets + int((2 * mantissa - 1) * self.sub_buckets) + 1
+        return min(index, len(self.counts) - 1)
+
+    def bucket_values(self) -> np.ndarray:
+        """
+        Representative (midpoint) value of every bucket
+        """
+        index = np.arange(len(self.counts)) - 1
+        exponent, sub = np.divmod(np.maximum(index, 0), self.sub_buckets)
+        values = (1 + (sub + 0.5) / self.sub_buckets) * np.exp2(exponent) * self.resolution
+        values[0] = self.resolution / 2
+        return values
+
+    def record(self, value: float) -> None:
+        value = max(float(value), 0.0)  # Negative when e.g. the exchange clock is ahead of ours
+        self.counts[self.bucket(value)] += 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> float:
+        return self.percentiles([q])[0]
+
+    def percentiles(self, qs) -> List[float]:
+        """
+        Values at the given percentiles (0-100), clamped to the observed min/max
+        """
+        if self.count == 0:
+            return [0.0 for _ in qs]
+        cumulative = np.cumsum(self.counts)
+        values = self.bucket_values()
+        ranks = np.maximum(np.asarray(qs, dtype=float) / 100 * self.count, 1e-12)
+        indices = np.minimum(np.searchsorted(cumulative, ranks * (1 - 1e-12)), len(values) - 1)
+        return [float(min(max(values[i], self.min), self.max)) for i in indices]
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def merge(self, other: 'LatencyHistogram') -> 'LatencyHistogram':
+        """
+        Add another histogram with the same bucket layout into this one
+        """
+        if len(other.counts) != len(self.counts) or other.sub_buckets != self.sub_buckets:
+            raise ValueError("Cannot merge histograms with different bucket layouts")
+        self.counts += other.counts
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def subtract(self, other: 'LatencyHistogram') -> 'LatencyHistogram':
+        """
+        Remove an earlier copy of this histogram, leaving what was recorded since;
+        min and max keep their all-time values
+        """
+        self.counts -= other.counts
+        self.count -= other.count
+        self.total -= other.total
+        return self
+
+    def decay(self, factor: float) -> None:
+        """
+        Scale all counts by `factor`; min and max keep their all-time values
+        """
+        self.counts *= factor
+        self.count *= factor
+        self.total *= factor
+
+    def reset(self) -> None:
+        self.counts[:] = 0
+        self.count = 0.0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def copy(self) -> 'LatencyHistogram':
+        histogram = LatencyHistogram(self.resolution, self.sub_buckets, self.max_value)
+        return histogram.merge(self)
+
+    def summary(self, percentiles=REPORT_PERCENTILES) -> Dict[str, float]:
+        result = {'count': self.count, 'mean': self.mean,
+                  'min': self.min if self.count else 0.0, 'max': self.max if self.count else 0.0}
+        for q, value in zip(percentiles, self.percentiles(percentiles)):
+            result[f"p{q:g}"] = value
+        return result
+
+class LatencyTracer:
+    """
+    Aggregates per-tick stage traces into one histogram per pipeline stage.
+    Each stage records the time since the previous stamped stage; 'total' is
+    receive-to-emit and 'exchange_to_emit' includes network and clock offset.
+    """
+
+    def __init__(self, stages=TRACE_STAGES):
+        self.stages = stages
+        self.histograms = {stage: LatencyHistogram() for stage in stages[1:]}
+        self.histograms['total'] = LatencyHistogram()
+        self.histograms['exchange_to_emit'] = LatencyHistogram()
+
+    def record(self, trace: Dict[str, float]) -> None:
+        previous = None
+        for stage in self.stages:
+            if stage not in trace:
+                continue
+            if previous is not None:
+                self.histograms[stage].record(trace[stage] - trace[previous])
+            previous = stage
+        if 'emit' in trace:
+            if 'received' in trace:
+                self.histograms['total'].record(trace['emit'] - trace['received'])
+            if 'exchange' in trace:
+                self.histograms['exchange_to_emit'].record(trace['emit'] - trace['exchange'])
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Percentile summary (seconds) of every stage that has seen samples
+        """
+        return {stage: histogram.summary() for stage, histogram in self.histograms.items() if histogram.count}
+
+    def reset(self) -> None:
+        for histogram in self.histograms.values():
+            histogram.reset()
+
+class WindowedHistogram:
+    """
+    Histogram of roughly the last `window` seconds, kept as a ring of
+    `slices` sub-histograms; the oldest slice is cleared as time moves on.
+    """
+
+    def __init__(self, window: float = LATENCY_WINDOW, slices: int = LATENCY_WINDOW_SLICES):
+        self.slice_length = window / slices
+        self.slices = [LatencyHistogram() for _ in range(slices)]
+        self.current = 0
+        self.slice_start = time.monotonic()
+
+    def _rotate(self, now: float) -> None:
+        elapsed = int((now - self.slice_start) // self.slice_length)
+        if elapsed <= 0:
+            return
+        for _ in range(min(elapsed, len(self.slices))):
+            self.current = (self.current + 1) % len(self.slices)
+            self.slices[self.current].reset()
+        self.slice_start += elapsed * self.slice_length
+
+    def record(self, value: float) -> None:
+        self._rotate(time.monotonic())
+        self.slices[self.current].record(value)
+
+    def histogram(self) -> LatencyHistogram:
+        self._rotate(time.monotonic())
+        merged = self.slices[0].copy()
+        for histogram in self.slices[1:]:
+            merged.merge(histogram)
+        return merged
+
+    def merge(self, other: 'WindowedHistogram') -> 'WindowedHistogram':
+        self._rotate(time.monotonic())
+        self.slices[self.current].merge(other.histogram())
+        return self
+
+    def reset(self) -> None:
+        for histogram in self.slices:
+            histogram.reset()
+
+class DecayingHistogram(LatencyHistogram):
+    """
+    Histogram whose weights halve every `half_life` seconds, so percentiles
+    follow recent behaviour without a hard window edge
+    """
+
+    def __init__(self, half_life: float = LATENCY_HALF_LIFE, **layout):
+        super().__init__(**layout)
+        self.half_life = half_life
+        self.decay_interval = half_life / 10
+        self.last_decay = time.monotonic()
+
+    def _apply_decay(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self.last_decay
+        if elapsed >= self.decay_interval:
+            self.decay(0.5 ** (elapsed / self.half_life))
+            self.last_decay = now
+
+    def record(self, value: float) -> None:
+        self._apply_decay()
+        super().record(value)
+
+    def percentiles(self, qs) -> List[float]:
+        self._apply_decay()
+        return super().percentiles(qs)
+
+    def copy(self) -> LatencyHistogram:
+        self._apply_decay()
+        return super().copy()
+
+class DerivedViews:
+    """
+    Sliding-window and exponentially decaying views of one cumulative
+    histogram, brought up to date from its growth since the previous read
+    instead of on every record. The window view is exact to one slice once it
+    is read at least once a slice. The decayed mean is exact; the decayed
+    bucket weights are only kept from their first read, before which the
+    all-time distribution stands in. Samples recorded between two reads of
+    the decay view are weighted as of the later read.
+    """
+
+    def __init__(self, window: float = LATENCY_WINDOW, slices: int = LATENCY_WINDOW_SLICES,
+                 half_life: float = LATENCY_HALF_LIFE):
+        now = time.monotonic()
+        self.window = window
+        self.slice_length = window / slices
+        self.snapshots = deque()  # (time, cumulative copy), taken on reads at least a slice apart
+        self.half_life = half_life
+        self.decay_interval = half_life / 10
+        self.last_decay = now
+        self.decay_count = 0.0
+        self.decay_total = 0.0
+        self.decay_counts = None  # Bucket weights, only kept once a decayed histogram is read
+        self.seen_count = 0.0
+        self.seen_total = 0.0
+        self.seen_counts = None
+
+    def _decay(self, cumulative: LatencyHistogram) -> None:
+        now = time.monotonic()
+        elapsed = now - self.last_decay
+        factor = 1.0
+        if elapsed >= self.decay_interval:
+            factor = 0.5 ** (elapsed / self.half_life)
+            self.last_decay = now
+        self.decay_count = self.decay_count * factor + cumulative.count - self.seen_count
+        self.decay_total = self.decay_total * factor + cumulative.total - self.seen_total
+        self.seen_count, self.seen_total = cumulative.count, cumulative.total
+        if self.decay_counts is not None:
+            self.decay_counts *= factor
+            self.decay_counts += cumulative.counts - self.seen_counts
+            self.seen_counts[:] = cumulative.counts
+
+    def decay_mean(self, cumulative: LatencyHistogram) -> float:
+        self._decay(cumulative)
+        return self.decay_total / self.decay_count if self.decay_count > 0 else 0.0
+
+    def decayed(self, cumulative: LatencyHistogram) -> LatencyHistogram:
+        self._decay(cumulative)
+        if self.decay_counts is None:
+            # First read: spread the decayed weight over the all-time distribution
+            scale = self.decay_count / cumulative.count if cumulative.count else 0.0
+            self.decay_counts = cumulative.counts * scale
+            self.seen_counts = cumulative.counts.copy()
+        histogram = cumulative.copy()
+        histogram.counts[:] = self.decay_counts
+        histogram.count = self.decay_count
+        histogram.total = self.decay_total
+        return histogram
+
+    def windowed(self, cumulative: LatencyHistogram) -> LatencyHistogram:
+        now = time.monotonic()
+        if not self.snapshots or now - self.snapshots[-1][0] >= self.slice_length:
+            self.snapshots.append((now, cumulative.copy()))
+        cutoff = now - self.window
+        while len(self.snapshots) > 1 and self.snapshots[1][0] <= cutoff:
+            self.snapshots.popleft()
+        # Until a snapshot is a window old the view covers everything recorded so far
+        histogram = cumulative.copy()
+        taken, baseline = self.snapshots[0]
+        return histogram.subtract(baseline) if taken <= cutoff else histogram
 
 class LatencyAnalyzer:
-    def __init__(self):
-        self.measurements: List[float] = []
-        self.stats: Dict[str, float] = {}
+    """
+    Per-operation latency statistics in fixed memory. Recording is O(1) and
+    lock-free: it only touches one all-time histogram per operation. The
+    sliding-window and exponentially decaying views are derived from that
+    histogram when read, and analyzers from other threads or processes (they
+    pickle) are merged in rather than shared.
+    """
+    VIEWS = ('all', 'window', 'decay')
+
+    def __init__(self, window: float = LATENCY_WINDOW, slices: int = LATENCY_WINDOW_SLICES,
+                 half_life: float = LATENCY_HALF_LIFE):
+        """
+        :param window: seconds covered by the 'window' view
+        :param slices: slices the window advances in
+        :param half_life: seconds for the 'decay' view's weights to halve
+        """
+        self.window = window
+        self.slices = slices
+        self.half_life = half_life
+        self.operations: Dict[str, LatencyHistogram] = {}
+        self.views: Dict[str, DerivedViews] = {}
+        self._lock = threading.Lock()
+
+    def _histogram(self, operation: str) -> LatencyHistogram:
+        histogram = self.operations.get(operation)
+        if histogram is None:
+            self.views[operation] = DerivedViews(self.window, self.slices, self.half_life)
+            histogram = self.operations[operation] = LatencyHistogram()
+        return histogram
 
     def measure(self, operation: str) -> float:
-        start = time.monotonic()
-        return start
+        return time.perf_counter()
 
     def complete_measurement(self, start_time: float, operation: str) -> float:
-        end = time.monotonic()
-        latency = end - start_time
-        self.measurements.append(latency)
+        latency = time.perf_counter() - start_time
+        self.record(operation, latency)
         return latency
 
-    def get_statistics(self) -> Dict[str, float]:
-        if not self.measurements:
+    @contextmanager
+    def timer(self, operation: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(operation, time.perf_counter() - start)
+
+    def record(self, operation: str, latency: float) -> None:
+        histogram = self.operations.get(operation)
+        if histogram is None:
+            histogram = self._histogram(operation)
+        histogram.record(latency)
+
+    def _view(self, operation: str, view: str) -> LatencyHistogram:
+        histogram = self.operations[operation]
+        if view == 'window':
+            return self.views[operation].windowed(histogram)
+        if view == 'decay':
+            return self.views[operation].decayed(histogram)
+        return histogram
+
+    def histogram(self, operation: Optional[str] = None, view: str = 'all') -> Optional[LatencyHistogram]:
+        """
+        Histogram of one operation, or of all operations merged, for a view
+        :param view: 'all', 'window' or 'decay'
+        """
+        if view not in self.VIEWS:
+            raise ValueError(f"Unknown latency view: {view}")
+        with self._lock:
+            operations = [operation] if operation is not None else list(self.operations)
+            merged = None
+            for name in operations:
+                if name not in self.operations:
+                    continue
+                histogram = self._view(name, view)
+                merged = histogram.copy() if merged is None else merged.merge(histogram)
+            return merged
+
+    def percentile(self, q: float, operation: Optional[str] = None, view: str = 'all') -> float:
+        histogram = self.histogram(operation, view)
+        return histogram.percentile(q) if histogram is not None else 0.0
+
+    def mean(self, operation: Optional[str] = None, view: str = 'all') -> float:
+        if operation is not None and view != 'window':
+            # The all-time and decayed means are running totals, no bucket arrays needed
+            histogram = self.operations.get(operation)
+            if histogram is None:
+                return 0.0
+            if view == 'all':
+                return histogram.mean
+            with self._lock:
+                return self.views[operation].decay_mean(histogram)
+        histogram = self.histogram(operation, view)
+        return histogram.mean if histogram is not None else 0.0
+
+    def get_statistics(self, operation: Optional[str] = None, view: str = 'all') -> Dict[str, float]:
+        histogram = self.histogram(operation, view)
+        if histogram is None or histogram.count == 0:
             return {}
-        self.stats = {
-            'min': min(self.measurements),
-            'max': max(self.measurements),
-            'avg': sum(self.measurements) / len(self.measurements)
-        }
-        return self.stats
+        summary = histogram.summary()
+        summary['avg'] = summary['mean']
+        return summary
+
+    def merge(self, other: 'LatencyAnalyzer') -> 'LatencyAnalyzer':
+        """
+        Add another analyzer's measurements (e.g. from a worker thread or process)
+        """
+        with self._lock:
+            for operation, histogram in other.operations.items():
+                self._histogram(operation).merge(histogram)
+        return self
 
     def reset(self) -> None:
-        self.measurements.clear()
-        self.stats.clear()
+        with self._lock:
+            self.operations.clear()
+            self.views.clear()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+# Shared analyzer for functions decorated with measure_latency
+latency_analyzer = LatencyAnalyzer()
 
 def measure_latency(func):
+    """
+    Record each call's duration in `latency_analyzer` under the function's name
+    """
+    @wraps(func)
     def wrapper(*args, **kwargs):
-        start = time.monotonic()
-        result = func(*args, **kwargs)
-        end = time.monotonic()
-        print(f"Latency: {end - start:.6f} seconds")
-        return result
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            latency_analyzer.record(func.__qualname__, time.perf_counter() - start)
     return wrapper
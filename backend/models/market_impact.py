@@ -1,9 +1,10 @@
 import numpy as np
+from collections import OrderedDict
 from datetime import datetime
 from utils.logger import logger
 
 class AlmgrenChrissModel:
-    def __init__(self, sigma=0.3, eta=2.0, gamma=0.15, T=1.0, N=100):
+    def __init__(self, sigma=0.3, eta=2.0, gamma=0.15, T=1.0, N=100, cache_size=128):
         """
         Initialize Almgren-Chriss model parameters
         :param sigma: volatility of the asset
@@ -11,6 +12,7 @@ class AlmgrenChrissModel:
         :param gamma: permanent impact parameter
         :param T: total time horizon for execution
         :param N: number of trading intervals
+        :param cache_size: maximum number of trade schedules kept in the LRU cache
         """
         self.sigma = sigma  # market volatility
         self.eta = eta      # temporary impact parameter
@@ -18,6 +20,50 @@ class AlmgrenChrissModel:
         self.T = T          # time horizon
         self.N = N          # number of intervals
         self.dt = T/N       # time step size
+        self.cache_size = cache_size
+        self._schedule_cache = OrderedDict()
+
+    def get_state(self):
+        return {'sigma': self.sigma, 'eta': self.eta, 'gamma': self.gamma, 'T': self.T, 'N': self.N,
+                'cache_size': self.cache_size}
+
+    def set_state(self, state):
+        self.sigma = float(state['sigma'])
+        self.eta = float(state['eta'])
+        self.gamma = float(state['gamma'])
+        self.T = float(state['T'])
+        self.N = int(state['N'])
+        self.dt = self.T / self.N
+        self.cache_size = int(state.get('cache_size', self.cache_size))
+        self._schedule_cache.clear()
+
+    def schedule_energy(self, kappa_T):
+        """
+        Closed-form sum over the N schedule points of sinh^2(kappa (T - t_i)) / sinh^2(kappa T),
+        so that sum(v**2) == X**2 * schedule_energy(kappa * T). Vectorized over kappa_T.
+
+        With h = kappa T / (N - 1) and m = 2N - 1 the numerator sums to
+        (sinh(m h) / sinh(h) - m) / 4; a Taylor series is used for small m h to
+        avoid cancellation and a geometric-sum limit for large kappa T to avoid overflow.
+        """
+        kappa_T = np.abs(np.asarray(kappa_T, dtype=float))
+        n = self.N
+        if n == 1:
+            return np.ones_like(kappa_T)
+
+        m = 2 * n - 1
+        h = kappa_T / (n - 1)
+        with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+            sinh_sum = np.where(
+                m * h < 1e-2,
+                m * (m * m - 1) * h * h / 24 * (1 + (3 * m * m - 7) * h * h / 60),
+                (np.sinh(m * h) / np.sinh(h) - m) / 4
+            )
+            energy = sinh_sum / np.sinh(kappa_T) ** 2
+            asymptotic = -np.expm1(-2 * n * h) / -np.expm1(-2 * h)
+            energy = np.where(kappa_T > 50, asymptotic, energy)
+            # Same uniform fallback as the schedule when sinh(kappa T) is numerically zero
+            return np.where(np.sinh(kappa_T) < 1e-10, 1.0 / n, energy)
 
     def calculate_optimal_trade_schedule(self, X, S0):
         """
@@ -27,17 +73,18 @@ class AlmgrenChrissModel:
         :return: tuple of (trades per period, expected costs)
         """
         try:
-            # Calculate tau (time scale)
-            tau = self.gamma / (2.0 * self.eta)
-            
+            key = (X, self.sigma, self.eta, self.gamma, self.T, self.N)
+            cached = self._schedule_cache.get(key)
+            if cached is not None:
+                self._schedule_cache.move_to_end(key)
+                return cached
+
             # Calculate trading trajectory
             kappa = np.sqrt(self.eta / self.gamma) * self.sigma
-            alpha = np.sqrt(2.0 * self.eta * self.gamma) * np.sinh(kappa * self.T)
             
             # Calculate trading rates
             t = np.linspace(0, self.T, self.N)
             n = len(t)
-            v = np.zeros(n)
             
             # Check for numerical stability
             sinh_denominator = np.sinh(kappa * self.T)
@@ -45,11 +92,16 @@ class AlmgrenChrissModel:
                 logger.warning("Unstable market impact calculation, using fallback method")
                 v = np.full(n, X/n)  # Uniform distribution as fallback
             else:
-                for i in range(n):
-                    v[i] = X * np.sinh(kappa * (self.T - t[i])) / sinh_denominator
+                v = X * np.sinh(kappa * (self.T - t)) / sinh_denominator
             
             # Calculate expected implementation shortfall
-            E_IS = 0.5 * self.gamma * X**2 + self.eta * np.sum(v**2) * self.dt
+            E_IS = 0.5 * self.gamma * X**2 + self.eta * np.dot(v, v) * self.dt
+
+            # Cached schedules are shared between callers
+            v.setflags(write=False)
+            self._schedule_cache[key] = (v, E_IS)
+            if len(self._schedule_cache) > self.cache_size:
+                self._schedule_cache.popitem(last=False)
             
             return v, E_IS
             
@@ -70,22 +122,20 @@ class AlmgrenChrissModel:
             # Update model parameters based on current market conditions
             self.sigma = volatility
             
-            # Calculate optimal trading schedule
-            trades, expected_cost = self.calculate_optimal_trade_schedule(volume, current_price)
-            
-            if trades is None or expected_cost is None:
+            # Temporary impact eta * dt * sum(v**2) of the optimal schedule, in closed form
+            kappa_T = np.sqrt(self.eta / self.gamma) * volatility * self.T
+            temp_impact = self.eta * self.dt * volume**2 * float(self.schedule_energy(kappa_T))
+            perm_impact = self.gamma * volume
+
+            if not np.isfinite(temp_impact):
                 # Fallback to simple impact model if optimal calculation fails
                 logger.warning("Falling back to simple impact model")
                 return self.gamma * volume + self.eta * volatility * np.sqrt(volume / liquidity)
             
-            # Calculate temporary and permanent impact components
-            temp_impact = self.eta * np.sum(trades**2) * self.dt
-            perm_impact = self.gamma * volume
-            
             total_impact = temp_impact + perm_impact
             
             # Log the impact components for analysis
-            logger.info(f"Market Impact - Temporary: {temp_impact:.6f}, Permanent: {perm_impact:.6f}")
+            logger.debug(f"Market Impact - Temporary: {temp_impact:.6f}, Permanent: {perm_impact:.6f}")
             
             return total_impact
             
@@ -93,6 +143,19 @@ class AlmgrenChrissModel:
             logger.error(f"Error in market impact calculation: {e}")
             return self.gamma * volume  # Fallback to simple linear impact
 
+    def calculate_market_impact_batch(self, volumes, volatilities):
+        """
+        Evaluate market impact for arrays of order sizes and volatilities in one call
+        :param volumes: array of trading volumes
+        :param volatilities: array of volatilities, broadcast against volumes
+                             (e.g. volumes[:, None] and volatilities[None, :] for a grid)
+        :return: ndarray of total impacts with the broadcast shape
+        """
+        volumes = np.asarray(volumes, dtype=float)
+        kappa_T = np.sqrt(self.eta / self.gamma) * np.asarray(volatilities, dtype=float) * self.T
+        temp_impact = self.eta * self.dt * volumes**2 * self.schedule_energy(kappa_T)
+        return temp_impact + self.gamma * volumes
+
 # Create a global instance for use throughout the application
 market_impact_model = AlmgrenChrissModel()
 
@@ -104,3 +167,9 @@ def calculate_market_impact(volume, volatility, liquidity, current_price=None):
         current_price = 1.0  # Default to 1.0 if price not provided
     
     return market_impact_model.calculate_market_impact(volume, volatility, liquidity, current_price)
+
+def calculate_market_impact_batch(volumes, volatilities):
+    """
+    Wrapper function for vectorized market impact over a ladder of sizes and volatilities
+    """
+    return market_impact_model.calculate_market_impact_batch(volumes, volatilities)
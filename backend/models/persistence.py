@@ -0,0 +1,148 @@
+import json
+import os
+import shutil
+from datetime import datetime
+import numpy as np
+from utils.logger import logger
+
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+
+# Fitted attributes needed to resume partial_fit on the online estimators
+SCALER_ATTRIBUTES = ('mean_', 'var_', 'scale_', 'n_samples_seen_', 'n_features_in_')
+SGD_ATTRIBUTES = ('coef_', 'intercept_', 't_', 'n_features_in_')
+SGD_CLASSIFIER_ATTRIBUTES = SGD_ATTRIBUTES + ('classes_',)
+
+def export_estimator(estimator, attributes, prefix):
+    """
+    Collect fitted sklearn attributes into a flat state dict under `prefix.`
+    """
+    return {f"{prefix}.{name}": getattr(estimator, name) for name in attributes if hasattr(estimator, name)}
+
+def restore_estimator(estimator, state, prefix):
+    """
+    Set fitted sklearn attributes from a state dict; arrays are copied so the
+    estimator can keep training on them
+    :return: True if any attribute was restored
+    """
+    restored = False
+    for key, value in state.items():
+        if key.startswith(prefix + '.'):
+            # Copy arrays off the memory map; numbers become NumPy scalars as sklearn stores them
+            value = np.array(value)
+            if value.ndim == 0:
+                value = value[()]
+            setattr(estimator, key[len(prefix) + 1:], value)
+            restored = True
+    return restored
+
+def prefixed(prefix, state):
+    return {f"{prefix}.{key}": value for key, value in state.items()}
+
+def unprefixed(prefix, state):
+    start = len(prefix) + 1
+    return {key[start:]: value for key, value in state.items() if key.startswith(prefix + '.')}
+
+def save_state(path, components):
+    """
+    Write model state as a directory of .npy arrays plus a JSON manifest
+    :param path: target directory, replaced atomically
+    :param components: dict of component name -> state dict; arrays become
+                       memory-mappable .npy files, other values go in the manifest
+    """
+    tmp_path = path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    manifest = {'format_version': FORMAT_VERSION, 'saved_at': datetime.utcnow().isoformat(), 'components': {}}
+    for name, state in components.items():
+        scalars, arrays = {}, []
+        for key, value in state.items():
+            if isinstance(value, np.ndarray) and value.ndim > 0:
+                np.save(os.path.join(tmp_path, f"{name}.{key}.npy"), np.ascontiguousarray(value))
+                arrays.append(key)
+            else:
+                scalars[key] = value.item() if isinstance(value, (np.generic, np.ndarray)) else value
+        manifest['components'][name] = {'scalars': scalars, 'arrays': arrays}
+
+    with open(os.path.join(tmp_path, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    old_path = path + ".old"
+    if os.path.exists(path):
+        shutil.rmtree(old_path, ignore_errors=True)
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+def load_state(path, mmap=True):
+    """
+    Read a state directory written by save_state
+    :param mmap: memory-map the arrays instead of reading them into RAM
+    :return: dict of component name -> state dict
+    :raises ValueError: if the format version is not supported
+    """
+    with open(os.path.join(path, MANIFEST)) as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported model state version: {manifest.get('format_version')}")
+
+    components = {}
+    for name, entry in manifest['components'].items():
+        state = dict(entry['scalars'])
+        for key in entry['arrays']:
+            state[key] = np.load(os.path.join(path, f"{name}.{key}.npy"), mmap_mode='r' if mmap else None)
+        components[name] = state
+    return components
+
+def instrument_state_dir(path, inst_id):
+    """
+    State directory of one instrument's models, next to the shared `path`
+    (not inside it, as save_state replaces the whole directory)
+    """
+    return f"{path.rstrip(os.sep)}-{inst_id}"
+
+def save_models(path, slippage_model, maker_taker_model, impact_model, history=None):
+    """
+    Snapshot the cost models, plus the recent market history window if given
+    :param slippage_model: model to save, or None to leave it out (likewise the others)
+    :param history: dict of equal-length arrays (e.g. timestamps, prices, volumes)
+    """
+    try:
+        models = {
+            'slippage_model': slippage_model,
+            'maker_taker_model': maker_taker_model,
+            'market_impact_model': impact_model
+        }
+        components = {name: model.get_state() for name, model in models.items() if model is not None}
+        if history is not None:
+            components['history'] = history
+        save_state(path, components)
+        logger.info(f"Saved model state to {path}")
+        return True
+    except Exception as e:
+        logger.error(f"Error saving model state: {e}")
+        return False
+
+def load_models(path, slippage_model, maker_taker_model, impact_model):
+    """
+    Restore models saved by save_models in place; None models are skipped
+    :return: the saved history dict, or None if nothing was loaded
+    """
+    if not os.path.exists(os.path.join(path, MANIFEST)):
+        return None
+    try:
+        components = load_state(path)
+        models = {
+            'slippage_model': slippage_model,
+            'maker_taker_model': maker_taker_model,
+            'market_impact_model': impact_model
+        }
+        for name, model in models.items():
+            if model is not None:
+                model.set_state(components[name])
+        logger.info(f"Loaded model state from {path}")
+        return components.get('history', {})
+    except Exception as e:
+        logger.error(f"Error loading model state: {e}")
+        return None
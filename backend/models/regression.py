@@ -1,32 +1,60 @@
+import threading
+from collections import deque
 import numpy as np
-from sklearn.linear_model import LinearRegression, LogisticRegression
+from sklearn import __version__ as sklearn_version
+from sklearn.linear_model import LinearRegression, LogisticRegression, SGDRegressor, SGDClassifier
 from sklearn.ensemble import GradientBoostingRegressor
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
+from models.inference import LinearKernel, LogisticKernel, TreeEnsembleKernel
+from models.persistence import (
+    export_estimator, restore_estimator, prefixed, unprefixed,
+    SCALER_ATTRIBUTES, SGD_ATTRIBUTES, SGD_CLASSIFIER_ATTRIBUTES
+)
+from config.settings import TRAINING_BUFFER_SIZE, QUANTILE_RETRAIN_INTERVAL, ONLINE_BATCH_SIZE
 from utils.logger import logger
 
+# scikit-learn renamed the logistic SGD loss in 1.1
+LOG_LOSS = 'log_loss' if tuple(int(v) for v in sklearn_version.split('.')[:2]) >= (1, 1) else 'log'
+
 class SlippageModel:
-    def __init__(self):
+    def __init__(self, buffer_size=TRAINING_BUFFER_SIZE, retrain_interval=QUANTILE_RETRAIN_INTERVAL):
         self.linear_model = LinearRegression()
         self.quantile_model = GradientBoostingRegressor(loss='quantile', alpha=0.95)
         self.scaler = StandardScaler()
         self.is_fitted = False
 
-    def prepare_features(self, orderbook_data, volume):
+        # Online mode: SGD linear model updated per batch of ticks, quantile model
+        # retrained in the background on a bounded window of recent samples
+        self.online = False
+        self.online_scaler = StandardScaler()
+        self.online_model = SGDRegressor()
+        self.samples = deque(maxlen=buffer_size)
+        self.retrain_interval = retrain_interval
+        self.samples_since_retrain = 0
+        self.quantile_bundle = None  # (scaler, model), replaced atomically by the retrain thread
+        self._retrain_thread = None
+
+        # NumPy kernels exported from the fitted sklearn models for per-tick inference
+        self.use_compiled = True
+        self.compiled_linear = None
+        self.compiled_quantile = None
+        self.kernel_only = False  # Restored by set_state without the sklearn estimators behind the kernels
+
+    def prepare_features(self, orderbook, volume):
         """
-        Prepare features from orderbook data for slippage prediction
+        Prepare features for slippage prediction from the book's running aggregates
+        :param orderbook: OrderBookManager; top-5 sizes are O(1) reads
         """
         try:
-            # Extract relevant features from orderbook
-            bid_prices = np.array([float(price) for price, _ in orderbook_data['bids']])
-            ask_prices = np.array([float(price) for price, _ in orderbook_data['asks']])
-            bid_volumes = np.array([float(vol) for _, vol in orderbook_data['bids']])
-            ask_volumes = np.array([float(vol) for _, vol in orderbook_data['asks']])
+            best_bid, best_ask = orderbook.bids.best()[0], orderbook.asks.best()[0]
+            bid_depth = orderbook.calculate_market_depth('bids', 5)
+            ask_depth = orderbook.calculate_market_depth('asks', 5)
 
             # Calculate features
-            spread = ask_prices[0] - bid_prices[0]
-            mid_price = (ask_prices[0] + bid_prices[0]) / 2
-            depth_imbalance = np.sum(bid_volumes[:5]) / (np.sum(bid_volumes[:5]) + np.sum(ask_volumes[:5]))
+            spread = best_ask - best_bid
+            mid_price = (best_ask + best_bid) / 2
+            depth_imbalance = bid_depth / (bid_depth + ask_depth)
             price_impact = spread / mid_price
 
             features = np.array([
@@ -34,8 +62,8 @@ class SlippageModel:
                 spread,
                 depth_imbalance,
                 price_impact,
-                np.sum(bid_volumes[:5]),
-                np.sum(ask_volumes[:5])
+                bid_depth,
+                ask_depth
             ]).reshape(1, -1)
 
             return features
@@ -64,11 +92,71 @@ class SlippageModel:
             linear_score = self.linear_model.score(X_val_scaled, y_val)
             logger.info(f"Linear model R2 score: {linear_score:.4f}")
 
+            self.compiled_linear = LinearKernel(self.scaler, self.linear_model)
+            self.compiled_quantile = TreeEnsembleKernel(self.scaler, self.quantile_model)
             self.is_fitted = True
+            self.online = False
+            self.kernel_only = False
 
         except Exception as e:
             logger.error(f"Error fitting slippage models: {e}")
 
+    def partial_fit(self, features, target):
+        """
+        Update the online linear model from streamed samples and schedule a
+        background retrain of the quantile model every `retrain_interval` samples
+        """
+        try:
+            features = np.asarray(features, dtype=float)
+            target = np.asarray(target, dtype=float)
+
+            self.online_scaler.partial_fit(features)
+            self.online_model.partial_fit(self.online_scaler.transform(features), target)
+            self.samples.extend(zip(features, target))
+            self.samples_since_retrain += len(target)
+
+            if not self.online:
+                self.compiled_quantile = self._compile_quantile(self.quantile_bundle)
+            self.compiled_linear = LinearKernel(self.online_scaler, self.online_model)
+            self.online = True
+            self.is_fitted = True
+
+            if self.samples_since_retrain >= self.retrain_interval and not self.retraining:
+                self.samples_since_retrain = 0
+                self._retrain_thread = threading.Thread(target=self._retrain_quantile, daemon=True)
+                self._retrain_thread.start()
+
+        except Exception as e:
+            logger.error(f"Error updating online slippage model: {e}")
+
+    @property
+    def retraining(self):
+        return self._retrain_thread is not None and self._retrain_thread.is_alive()
+
+    def _retrain_quantile(self):
+        try:
+            samples = list(self.samples)
+            features = np.array([sample[0] for sample in samples])
+            target = np.array([sample[1] for sample in samples])
+
+            scaler = StandardScaler()
+            model = GradientBoostingRegressor(loss='quantile', alpha=0.95)
+            model.fit(scaler.fit_transform(features), target)
+
+            # Single attribute assignments, so predict() sees either the old or the new model
+            self.quantile_bundle = (scaler, model)
+            self.compiled_quantile = self._compile_quantile(self.quantile_bundle)
+            self.kernel_only = False
+            logger.info(f"Quantile slippage model retrained on {len(target)} samples")
+
+        except Exception as e:
+            logger.error(f"Error retraining quantile slippage model: {e}")
+
+    def _compile_quantile(self, quantile_bundle):
+        if quantile_bundle is None:
+            return None
+        return TreeEnsembleKernel(*quantile_bundle)
+
     def predict(self, features):
         """
         Make predictions using both models
@@ -78,6 +166,23 @@ class SlippageModel:
                 logger.warning("Models not fitted yet, returning default values")
                 return np.zeros(len(features))
 
+            compiled_linear, compiled_quantile = self.compiled_linear, self.compiled_quantile
+            if (self.use_compiled or self.kernel_only) and compiled_linear is not None:
+                features = np.asarray(features, dtype=float)
+                linear_pred = compiled_linear.predict(features)
+                if compiled_quantile is None:
+                    return linear_pred
+                return np.maximum(linear_pred, compiled_quantile.predict(features))
+
+            if self.online:
+                features = np.asarray(features, dtype=float)
+                linear_pred = self.online_model.predict(self.online_scaler.transform(features))
+                quantile_bundle = self.quantile_bundle
+                if quantile_bundle is None:
+                    return linear_pred
+                scaler, quantile_model = quantile_bundle
+                return np.maximum(linear_pred, quantile_model.predict(scaler.transform(features)))
+
             # Scale features
             features_scaled = self.scaler.transform(features)
 
@@ -94,28 +199,102 @@ class SlippageModel:
             logger.error(f"Error making slippage predictions: {e}")
             return np.zeros(len(features))
 
+    def get_state(self):
+        """
+        Export the fitted state as arrays: compiled kernels for inference plus,
+        in online mode, the SGD/scaler parameters and the retraining window
+        """
+        state = {'online': self.online, 'is_fitted': self.is_fitted}
+        if self.compiled_linear is not None:
+            state.update(prefixed('linear_kernel', self.compiled_linear.get_state()))
+        if self.compiled_quantile is not None:
+            state.update(prefixed('quantile_kernel', self.compiled_quantile.get_state()))
+        if self.online:
+            state.update(export_estimator(self.online_scaler, SCALER_ATTRIBUTES, 'online_scaler'))
+            state.update(export_estimator(self.online_model, SGD_ATTRIBUTES, 'online_model'))
+            samples = list(self.samples)
+            if samples:
+                state['samples.features'] = np.array([sample[0] for sample in samples])
+                state['samples.target'] = np.array([sample[1] for sample in samples])
+        return state
+
+    def set_state(self, state):
+        """
+        Restore a state exported by get_state. Predictions are served by the
+        compiled kernels, even with use_compiled off, until the sklearn models
+        are refitted; online training resumes from the saved parameters.
+        """
+        linear_state = unprefixed('linear_kernel', state)
+        quantile_state = unprefixed('quantile_kernel', state)
+        self.compiled_linear = LinearKernel.from_state(linear_state) if linear_state else None
+        self.compiled_quantile = TreeEnsembleKernel.from_state(quantile_state) if quantile_state else None
+        self.online = bool(state.get('online', False))
+        self.is_fitted = bool(state.get('is_fitted', False)) and self.compiled_linear is not None
+        # Only the online SGD model and scaler are saved; the batch models and the quantile bundle are not
+        self.kernel_only = self.compiled_linear is not None and (not self.online or self.compiled_quantile is not None)
+
+        if self.online:
+            restore_estimator(self.online_scaler, state, 'online_scaler')
+            restore_estimator(self.online_model, state, 'online_model')
+            self.samples.clear()
+            if 'samples.features' in state:
+                self.samples.extend(zip(np.array(state['samples.features']), np.array(state['samples.target'])))
+
 class MakerTakerModel:
     def __init__(self):
         self.model = LogisticRegression()
         self.scaler = StandardScaler()
         self.is_fitted = False
 
+        # Online mode: logistic regression fitted by SGD on streamed labels
+        self.online = False
+        self.online_scaler = StandardScaler()
+        self.online_model = SGDClassifier(loss=LOG_LOSS)
+
+        self.use_compiled = True
+        self.compiled = None
+        self.kernel_only = False  # Restored by set_state without the batch sklearn model
+
     def fit(self, features, target):
         try:
             # Scale features
             features_scaled = self.scaler.fit_transform(features)
             self.model.fit(features_scaled, target)
+            self.compiled = LogisticKernel(self.scaler, self.model)
             self.is_fitted = True
+            self.online = False
+            self.kernel_only = False
 
         except Exception as e:
             logger.error(f"Error fitting maker/taker model: {e}")
 
+    def partial_fit(self, features, target):
+        try:
+            features = np.asarray(features, dtype=float)
+            self.online_scaler.partial_fit(features)
+            self.online_model.partial_fit(self.online_scaler.transform(features), target, classes=[0, 1])
+            self.compiled = LogisticKernel(self.online_scaler, self.online_model)
+            self.online = True
+            self.is_fitted = True
+            self.kernel_only = False
+
+        except Exception as e:
+            logger.error(f"Error updating online maker/taker model: {e}")
+
     def predict_proba(self, features):
         try:
             if not self.is_fitted:
                 logger.warning("Model not fitted yet, returning default values")
                 return np.array([[0.5, 0.5]])
 
+            compiled = self.compiled
+            if (self.use_compiled or self.kernel_only) and compiled is not None:
+                return compiled.predict_proba(features)
+
+            if self.online:
+                features = np.asarray(features, dtype=float)
+                return self.online_model.predict_proba(self.online_scaler.transform(features))
+
             features_scaled = self.scaler.transform(features)
             return self.model.predict_proba(features_scaled)
 
@@ -123,6 +302,75 @@ class MakerTakerModel:
             logger.error(f"Error predicting maker/taker probabilities: {e}")
             return np.array([[0.5, 0.5]])
 
+    def get_state(self):
+        state = {'online': self.online, 'is_fitted': self.is_fitted}
+        if self.compiled is not None:
+            state.update(prefixed('kernel', self.compiled.get_state()))
+        if self.online:
+            state.update(export_estimator(self.online_scaler, SCALER_ATTRIBUTES, 'online_scaler'))
+            state.update(export_estimator(self.online_model, SGD_CLASSIFIER_ATTRIBUTES, 'online_model'))
+        return state
+
+    def set_state(self, state):
+        kernel_state = unprefixed('kernel', state)
+        self.compiled = LogisticKernel.from_state(kernel_state) if kernel_state else None
+        self.online = bool(state.get('online', False))
+        self.is_fitted = bool(state.get('is_fitted', False)) and self.compiled is not None
+        self.kernel_only = self.compiled is not None and not self.online
+        if self.online:
+            restore_estimator(self.online_scaler, state, 'online_scaler')
+            restore_estimator(self.online_model, state, 'online_model')
+
+class OnlineTrainer:
+    def __init__(self, slippage_model, maker_taker_model, trade_amount, batch_size=ONLINE_BATCH_SIZE):
+        """
+        Turn streamed ticks of one instrument into training samples for the online models
+        :param trade_amount: order notional whose walk-the-book buy slippage is the slippage target
+        :param batch_size: samples accumulated before each partial_fit call
+
+        Maker/taker labels are a proxy: a buy resting at the best bid counts as
+        filled passively (1) when the next tick's best bid is below it, i.e. the
+        level was traded through, and as needing to cross the spread (0) otherwise.
+        """
+        self.slippage_model = slippage_model
+        self.maker_taker_model = maker_taker_model
+        self.trade_amount = trade_amount
+        self.batch_size = batch_size
+        self.slippage_batch = ([], [])
+        self.maker_taker_batch = ([], [])
+        self.pending = None  # (features, best_bid) awaiting the next tick's label
+
+    def update(self, features, orderbook):
+        """
+        Record one tick
+        :param features: 1-D feature row, as used for prediction
+        :param orderbook: OrderBookManager holding the tick's live levels
+        """
+        try:
+            features = np.asarray(features, dtype=float).ravel()
+            execution = orderbook.estimate_execution('buy', self.trade_amount)
+            best_bid = orderbook.bids.best()
+            if execution is None or best_bid is None:
+                return
+
+            self._add(self.slippage_batch, features, float(execution['slippage']), self.slippage_model)
+
+            if self.pending is not None:
+                pending_features, pending_bid = self.pending
+                self._add(self.maker_taker_batch, pending_features, int(best_bid[0] < pending_bid), self.maker_taker_model)
+            self.pending = (features, best_bid[0])
+
+        except Exception as e:
+            logger.error(f"Error recording training sample: {e}")
+
+    def _add(self, batch, features, target, model):
+        batch[0].append(features)
+        batch[1].append(target)
+        if len(batch[1]) >= self.batch_size:
+            model.partial_fit(np.array(batch[0]), np.array(batch[1]))
+            batch[0].clear()
+            batch[1].clear()
+
 # Create global instances
 slippage_model = SlippageModel()
 maker_taker_model = MakerTakerModel()
@@ -131,7 +379,7 @@ def estimate_slippage(features, target=None):
     """
     Wrapper function for slippage estimation
     """
-    if target is not None:
+    if target is not None and len(target):
         slippage_model.fit(features, target)
     return slippage_model
 
@@ -139,6 +387,6 @@ def maker_taker_ratio(features, target=None):
     """
     Wrapper function for maker/taker prediction
     """
-    if target is not None:
+    if target is not None and len(target):
         maker_taker_model.fit(features, target)
     return maker_taker_model
@@ -0,0 +1,115 @@
+import numpy as np
+from config.settings import HISTORY_CAPACITY, VOLATILITY_WINDOW, EWMA_LAMBDA, DEFAULT_VOLATILITY
+from utils.ring_buffer import RingBuffer
+
+class RollingStats:
+    """
+    Sliding-window mean and variance updated in O(1) per value (Welford with
+    removal). The window sums are recomputed from the buffer every `resync`
+    updates to bound floating point drift.
+    """
+
+    def __init__(self, window, resync=10000):
+        self.window = window
+        self.resync = resync
+        self.values = RingBuffer(window, ('value',))
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.updates = 0
+
+    def __len__(self):
+        return len(self.values)
+
+    def update(self, value):
+        n = len(self.values)
+        if n < self.window:
+            delta = value - self.mean
+            self.mean += delta / (n + 1)
+            self.m2 += delta * (value - self.mean)
+        else:
+            old_value = self.values.oldest('value')
+            old_mean = self.mean
+            self.mean += (value - old_value) / n
+            self.m2 += (value - old_value) * (value - self.mean + old_value - old_mean)
+        self.values.append(value)
+
+        self.updates += 1
+        if self.updates % self.resync == 0:
+            window = self.values.last('value')
+            self.mean = float(window.mean())
+            self.m2 = float(((window - self.mean) ** 2).sum())
+
+    @property
+    def variance(self):
+        n = len(self.values)
+        return max(self.m2, 0.0) / n if n else 0.0
+
+    @property
+    def std(self):
+        return self.variance ** 0.5
+
+class VolatilityEstimator:
+    def __init__(self, capacity=HISTORY_CAPACITY, window=VOLATILITY_WINDOW, ewma_lambda=EWMA_LAMBDA,
+                 default=DEFAULT_VOLATILITY):
+        """
+        Per-tick volatility from a preallocated price history
+        :param capacity: ticks of (timestamp, mid, volume) history kept
+        :param window: number of returns in the rolling volatility window
+        :param ewma_lambda: decay factor of the EWMA variance (RiskMetrics style)
+        :param default: volatility reported until the rolling window is full
+        """
+        self.history = RingBuffer(capacity, ('timestamps', 'prices', 'volumes'))
+        self.returns = RollingStats(window)
+        self.ewma_lambda = ewma_lambda
+        self.ewma_variance = None
+        self.default = default
+        self.last_price = None
+        self.last_timestamp = None
+        self.resume_interval = None  # Set by restore: sampling interval of the restored history
+
+    def update(self, timestamp, price, volume):
+        """
+        Record one tick in O(1) time and memory. The first tick after a restore
+        yields no return if it comes more than one sampling interval after the
+        restored history, as that return would span the downtime.
+        """
+        self.history.append(timestamp, price, volume)
+        resume_interval, self.resume_interval = self.resume_interval, None
+        after_gap = resume_interval is not None and timestamp - self.last_timestamp > resume_interval
+        if self.last_price and not after_gap:
+            ret = (price - self.last_price) / self.last_price
+            self.returns.update(ret)
+            if self.ewma_variance is None:
+                self.ewma_variance = ret * ret
+            else:
+                self.ewma_variance = self.ewma_lambda * self.ewma_variance + (1 - self.ewma_lambda) * ret * ret
+        self.last_price = price
+        self.last_timestamp = timestamp
+
+    @property
+    def volatility(self):
+        """
+        Population standard deviation of returns over the rolling window
+        """
+        if len(self.returns) < self.returns.window:
+            return self.default
+        return self.returns.std
+
+    @property
+    def ewma_volatility(self):
+        if self.ewma_variance is None:
+            return self.default
+        return self.ewma_variance ** 0.5
+
+    def snapshot(self):
+        return self.history.snapshot()
+
+    def restore(self, history):
+        """
+        Rebuild the history and return statistics from a saved snapshot
+        """
+        timestamps = history['timestamps']
+        for timestamp, price, volume in zip(timestamps, history['prices'], history['volumes']):
+            self.update(float(timestamp), float(price), float(volume))
+        if len(timestamps) > 1:
+            self.resume_interval = float(np.median(np.diff(timestamps)))
@@ -0,0 +1,119 @@
+import argparse
+import gc
+import itertools
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import deque
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from performance.orderbook_benchmark import generate_messages
+
+class GCMonitor:
+    """
+    Counts garbage collections per generation and the time spent in them
+    """
+    def __init__(self):
+        self.collections = [0, 0, 0]
+        self.pause = 0.0
+        self._start = None
+
+    def __call__(self, phase, info):
+        if phase == 'start':
+            self._start = time.perf_counter()
+        else:
+            self.collections[info['generation']] += 1
+            self.pause += time.perf_counter() - self._start
+
+    def __enter__(self):
+        gc.callbacks.append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        gc.callbacks.remove(self)
+
+def tick_source(inst_id, levels=400, delta_size=10):
+    """
+    Raw OKX messages for a book of `levels` per side, cycling through 500 deltas
+    """
+    snapshot, deltas = generate_messages(levels, 500, delta_size)
+    first = json.dumps({'arg': {'channel': 'books', 'instId': inst_id}, 'action': 'snapshot', 'data': [snapshot]})
+    return first, itertools.cycle([json.dumps({'arg': {'channel': 'books', 'instId': inst_id}, 'data': [delta]})
+                                   for delta in deltas])
+
+def run_session(ticks, retain):
+    """
+    Feed `ticks` messages through decode, book update and cost analysis, keeping
+    the last `retain` processed ticks and results alive like queues and history do
+    :return: dict of timing, GC and memory statistics
+    """
+    import app as app_module
+    from websocket.codec import decode_book_message, dumps
+    from websocket.data_stream import process_book_message
+
+    app_module.ONLINE_LEARNING = False  # Background refits would dominate the allocation profile
+    inst_id = app_module.DEFAULT_INSTRUMENT
+    book = app_module.market_data_hub.orderbooks[inst_id]
+    first, messages = tick_source(inst_id)
+    process_book_message(book, inst_id, decode_book_message(first))
+
+    retained = deque(maxlen=retain)
+
+    def process(n):
+        for _ in range(n):
+            tick = process_book_message(book, inst_id, decode_book_message(next(messages)), {'received': time.time()})
+            message = app_module.analyze_market_data(tick)
+            dumps(message)
+            retained.append((tick, message))
+
+    process(min(1000, ticks))  # Warm caches and histogram buffers
+
+    # Timing and collector activity, without tracing overhead
+    gc.collect()
+    with GCMonitor() as monitor:
+        start_time = time.perf_counter()
+        process(ticks)
+        elapsed = time.perf_counter() - start_time
+
+    # Memory held by the retained ticks and peak usage while processing
+    retained.clear()
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    process(retain)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'ticks': ticks,
+        'us_per_tick': elapsed / ticks * 1e6,
+        'gen0_per_1k': monitor.collections[0] / ticks * 1000,
+        'gen1_per_1k': monitor.collections[1] / ticks * 1000,
+        'gen2': monitor.collections[2],
+        'gc_ms_per_1k': monitor.pause / ticks * 1e6,
+        'retained_bytes_per_tick': (current - baseline) / max(len(retained), 1),
+        'peak_mb': (peak - baseline) / 1e6
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure per-tick allocations and GC pressure over a long session")
+    parser.add_argument('--ticks', type=int, default=100000)
+    parser.add_argument('--retain', type=int, default=10000, help="processed ticks kept alive, as queues/history would")
+    args = parser.parse_args()
+
+    stats = run_session(args.ticks, args.retain)
+    print("\nAllocation / GC Benchmark")
+    print("=" * 50)
+    print(f"Ticks processed:          {stats['ticks']:,}")
+    print(f"Time per tick:            {stats['us_per_tick']:.1f} us")
+    print(f"Gen 0 collections / 1k:   {stats['gen0_per_1k']:.2f}")
+    print(f"Gen 1 collections / 1k:   {stats['gen1_per_1k']:.2f}")
+    print(f"Gen 2 collections:        {stats['gen2']}")
+    print(f"GC pause / 1k ticks:      {stats['gc_ms_per_1k']:.3f} ms")
+    print(f"Retained bytes per tick:  {stats['retained_bytes_per_tick']:,.0f}")
+    print(f"Peak traced memory:       {stats['peak_mb']:.1f} MB above baseline")
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,300 @@
-import sys
+import argparse
+import itertools
+import json
 import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+import numpy as np
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from models.latency import measure_latency
+from config.settings import TRADE_AMOUNT
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+# name -> setup(); each setup returns a zero-argument callable timed as one operation
+CASES = {}
+
+def benchmark(name):
+    def register(setup):
+        CASES[name] = setup
+        return setup
+    return register
+
+def okx_message(inst_id, action, book, seq_id=1):
+    """
+    Raw `books` channel push, as received from the socket
+    """
+    data = dict(book, ts=str(int(time.time() * 1000)), seqId=seq_id, prevSeqId=seq_id - 1, checksum=0)
+    return json.dumps({'arg': {'channel': 'books', 'instId': inst_id}, 'action': action, 'data': [data]})
+
+def processed_tick(levels=400):
+    """
+    A book with `levels` per side and its processed top-of-book data
+    """
+    from websocket.data_stream import OrderBookManager, process_book_message
+    from performance.orderbook_benchmark import generate_messages
+    snapshot, deltas = generate_messages(levels, 1)
+    book = OrderBookManager()
+    data = process_book_message(book, 'BTC-USDT-SWAP', {'action': 'snapshot', 'data': [snapshot]})
+    return book, data
+
+def register_orderbook_cases():
+    from performance.orderbook_benchmark import generate_messages
+
+    for levels, delta_size in itertools.product((50, 400, 5000), (10, 100)):
+        def setup(levels=levels, delta_size=delta_size):
+            from websocket.codec import decode_levels
+            from websocket.data_stream import OrderBookManager
+            snapshot, deltas = generate_messages(levels, 500, delta_size)
+            book = OrderBookManager()
+            book.update_orderbook(snapshot)
+            # Decoded once up front: parsing is measured by the book_decode cases
+            messages = itertools.cycle([decode_levels(delta) for delta in deltas])
+            return lambda: book.update_orderbook(next(messages))
+        benchmark(f"orderbook_update[levels={levels},delta={delta_size}]")(setup)
+
+register_orderbook_cases()
+
+def register_decode_cases():
+    from performance.orderbook_benchmark import generate_messages
+    from websocket.codec import decode_book_message
+
+    snapshot, deltas = generate_messages(400, 1, 10)
+    payloads = {
+        'snapshot=400': okx_message('BTC-USDT-SWAP', 'snapshot', snapshot),
+        'delta=10': okx_message('BTC-USDT-SWAP', 'update', deltas[0])
+    }
+    for label, raw in payloads.items():
+        # Standard library parse alone, then the feed decoder including numeric level arrays
+        benchmark(f"json_decode[{label}]")(lambda raw=raw: lambda: json.loads(raw))
+        benchmark(f"book_decode[{label}]")(lambda raw=raw: lambda: decode_book_message(raw))
+
+register_decode_cases()
+
+@benchmark("annotate_tick")
+def annotate_tick_case():
+    book, data = processed_tick()
+    return lambda: book.annotate_tick(data)
+
+@benchmark("prepare_features")
+def prepare_features_case():
+    from models.features import prepare_features
+    _, data = processed_tick()
+    return lambda: prepare_features(data)
+
+def fitted_models():
+    from models.regression import SlippageModel, MakerTakerModel
+    rng = np.random.default_rng(0)
+    features = rng.normal(size=(2000, 6))
+    slippage = SlippageModel()
+    slippage.fit(features, features @ np.arange(6.0) + rng.normal(size=2000))
+    maker_taker = MakerTakerModel()
+    maker_taker.fit(features, (features[:, 0] > 0).astype(int))
+    return slippage, maker_taker, features[:1]
+
+@benchmark("slippage_predict")
+def slippage_predict():
+    slippage, _, row = fitted_models()
+    return lambda: slippage.predict(row)
+
+@benchmark("maker_taker_predict")
+def maker_taker_predict():
+    _, maker_taker, row = fitted_models()
+    return lambda: maker_taker.predict_proba(row)
+
+@benchmark("calculate_market_impact")
+def market_impact():
+    from models.market_impact import calculate_market_impact
+    return lambda: calculate_market_impact(TRADE_AMOUNT, 0.02, 250.0, 50000.0)
+
+@benchmark("tick_to_emit")
+def tick_to_emit():
+    """
+    Raw socket message to encoded client payload: decode, book update,
+    features, inference, cost curve and JSON encode. Online learning is
+    disabled so background refits do not add noise to the timings.
+    """
+    import app as app_module
+    app_module.ONLINE_LEARNING = False
+    from websocket.codec import decode_book_message, dumps
+    from websocket.data_stream import process_book_message
+    from performance.orderbook_benchmark import generate_messages
+
+    inst_id = app_module.DEFAULT_INSTRUMENT
+    book = app_module.market_data_hub.orderbooks[inst_id]
+    snapshot, deltas = generate_messages(400, 500, 10)
+    process_book_message(book, inst_id, {'action': 'snapshot', 'data': [snapshot]})
+    messages = itertools.cycle([json.dumps({'arg': {'channel': 'books', 'instId': inst_id}, 'data': [delta]})
+                                for delta in deltas])
+
+    def run():
+        data = decode_book_message(next(messages))
+        processed = process_book_message(book, inst_id, data, {'received': time.time()})
+        return dumps(app_module.analyze_market_data(processed))
+    return run
+
+def analysis_messages(count=500):
+    """
+    Consecutive analysis messages, as emitted to FastAPI clients
+    """
+    import app as app_module
+    app_module.ONLINE_LEARNING = False
+    from websocket.data_stream import process_book_message
+    from performance.orderbook_benchmark import generate_messages
+
+    inst_id = app_module.DEFAULT_INSTRUMENT
+    book = app_module.market_data_hub.orderbooks[inst_id]
+    snapshot, deltas = generate_messages(400, count, 10)
+    process_book_message(book, inst_id, {'action': 'snapshot', 'data': [snapshot]})
+    messages = [app_module.analyze_market_data(process_book_message(book, inst_id, {'data': [delta]}))
+                for delta in deltas]
+    return [message for message in messages if message is not None]
+
+@benchmark("client_encode[json]")
+def client_encode_json():
+    from websocket.codec import dumps
+    messages = itertools.cycle(analysis_messages())
+    return lambda: dumps(next(messages))
+
+@benchmark("client_encode[delta]")
+def client_encode_delta():
+    """
+    Shared delta frame per tick plus one client's bytes (see websocket.delta)
+    """
+    from websocket.delta import DeltaEncoder, DeltaStream
+    messages = itertools.cycle(analysis_messages())
+    encoder, stream = DeltaEncoder(), DeltaStream()
+    return lambda: stream.frames(encoder.encode(next(messages)))
+
+def time_case(func, warmup, repeats, min_time):
+    """
+    Warm up, calibrate calls per repeat to last at least `min_time`, then time `repeats` runs
+    :return: list of seconds per call, one per repeat
+    """
+    deadline = time.perf_counter() + warmup
+    while time.perf_counter() < deadline:
+        func()
+
+    number = 1
+    while True:
+        start_time = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start_time
+        if elapsed >= min_time:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9) * 1.1))
+
+    samples = [elapsed / number]
+    for _ in range(repeats - 1):
+        start_time = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start_time) / number)
+    return samples
+
+def summarize(samples):
+    samples = sorted(samples)
+    median = statistics.median(samples)
+    return {
+        'repeats': len(samples),
+        'min': samples[0],
+        'median': median,
+        'mean': statistics.fmean(samples),
+        'stdev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        'max': samples[-1],
+        'ops_per_sec': 1.0 / median if median > 0 else 0.0
+    }
+
+def run_suite(pattern=None, warmup=0.2, repeats=7, min_time=0.1):
+    """
+    Run every registered case whose name contains `pattern`
+    :return: results dict with environment metadata and per-case statistics (seconds per call)
+    """
+    results = {}
+    for name, setup in CASES.items():
+        if pattern and pattern not in name:
+            continue
+        func = setup()
+        results[name] = summarize(time_case(func, warmup, repeats, min_time))
+    return {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'processor': platform.processor() or platform.machine()
+        },
+        'results': results
+    }
+
+def compare(results, baseline, threshold=0.1):
+    """
+    Compare medians against a baseline run
+    :param threshold: relative slowdown reported as a regression
+    :return: list of (name, baseline median, current median, ratio, status)
+    """
+    rows = []
+    for name, stats in results['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if base is None:
+            rows.append((name, None, stats['median'], None, 'new'))
+            continue
+        ratio = stats['median'] / base['median']
+        status = 'REGRESSION' if ratio > 1 + threshold else 'improved' if ratio < 1 - threshold else 'ok'
+        rows.append((name, base['median'], stats['median'], ratio, status))
+    return rows
+
+def print_results(results, comparison=None):
+    print("Trade Simulator Benchmarks")
+    print("=" * 96)
+    print(f"{'Case':<40} | {'Median (us)':>11} | {'Stdev (us)':>10} | {'Ops/s':>11} | {'Baseline':>9} | {'Status':>10}")
+    print("-" * 96)
+    comparison = {row[0]: row for row in comparison or []}
+    for name, stats in results['results'].items():
+        row = comparison.get(name)
+        ratio = f"{row[3]:.2f}x" if row and row[3] is not None else '-'
+        status = row[4] if row else '-'
+        print(f"{name:<40} | {stats['median'] * 1e6:>11.2f} | {stats['stdev'] * 1e6:>10.2f} | "
+              f"{stats['ops_per_sec']:>11,.0f} | {ratio:>9} | {status:>10}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the trade simulator hot paths")
+    parser.add_argument('--filter', help="only run cases whose name contains this string")
+    parser.add_argument('--warmup', type=float, default=0.2, help="seconds of warmup per case")
+    parser.add_argument('--repeats', type=int, default=7)
+    parser.add_argument('--min-time', type=float, default=0.1, help="minimum seconds per repeat")
+    parser.add_argument('--output', help="write results as JSON to this path")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="baseline JSON to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=0.1, help="relative slowdown that fails the run")
+    args = parser.parse_args()
+    if not args.save_baseline and not os.path.exists(args.baseline):
+        parser.error(f"baseline {args.baseline} not found; record one with --save-baseline")
+
+    results = run_suite(args.filter, args.warmup, args.repeats, args.min_time)
+
+    comparison = None
+    if not args.save_baseline:
+        with open(args.baseline) as f:
+            comparison = compare(results, json.load(f), args.threshold)
+    print_results(results, comparison)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved baseline to {args.baseline}")
 
-@measure_latency
-def benchmark_calculation():
-    # Simulate a calculation
-    sum([i ** 2 for i in range(10000)])
+    regressions = [row[0] for row in comparison or [] if row[4] == 'REGRESSION']
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
 
-benchmark_calculation()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import argparse
+import asyncio
+import json
+import socket
+import time
+import sys
+import os
+from datetime import datetime
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uvicorn
+import websockets
+import app as app_module
+from performance.orderbook_benchmark import generate_messages
+
+SERVER_SNDBUF = 16 * 1024
+SLOW_CLIENT_RCVBUF = 4096
+
+def synthetic_feed(rate, levels=400):
+    """
+    Local stand-in for stream_orderbooks(): replays generated OKX-style deltas
+    for every instrument at `rate` updates/sec without any network access
+    """
+    async def source(instruments, orderbooks):
+        snapshot, deltas = generate_messages(levels, 5000)
+        for inst_id in instruments:
+            orderbooks[inst_id].update_orderbook(snapshot)
+
+        interval = 1.0 / rate
+        i = 0
+        while True:
+            delta = dict(deltas[i % len(deltas)], timestamp=datetime.utcnow().isoformat())
+            for inst_id in instruments:
+                orderbook = orderbooks[inst_id]
+                processed_data = orderbook.update_orderbook(delta)
+                processed_data.inst_id = inst_id
+                orderbook.annotate_tick(processed_data)
+                yield inst_id, processed_data
+            i += 1
+            await asyncio.sleep(interval)
+    return source
+
+async def run_client(url, duration, results, slow=False):
+    latencies = []
+    received = 0
+    sock = None
+    if slow:
+        # A tiny receive window and a single-message client queue stop the kernel
+        # and websockets buffers from absorbing the backlog, so back-pressure
+        # reaches the server and fills that client's bounded queue
+        host, port = url.split('//')[1].split('/')[0].split(':')
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SLOW_CLIENT_RCVBUF)
+        sock.connect((host, int(port)))
+    async with websockets.connect(url, sock=sock, max_queue=1 if slow else None) as ws:
+        end = time.monotonic() + duration
+        while time.monotonic() < end:
+            try:
+                message = await asyncio.wait_for(ws.recv(), timeout=end - time.monotonic())
+            except asyncio.TimeoutError:
+                break
+            data = json.loads(message)
+            sent = datetime.fromisoformat(data['market_data']['timestamp'])
+            latencies.append((datetime.utcnow() - sent).total_seconds())
+            received += 1
+            if slow:
+                await asyncio.sleep(1.0)  # Simulate a client that cannot keep up
+    results.append((received, latencies, slow))
+
+async def load_test(clients, duration, rate, port, slow_fraction):
+    app_module.market_data_hub.source = synthetic_feed(rate)
+    config = uvicorn.Config(app_module.app, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    # Accepted sockets inherit this small send buffer, otherwise the kernel soaks
+    # up minutes of a stalled client's backlog before the server's queue fills
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SERVER_SNDBUF)
+    listener.bind(("127.0.0.1", port))
+    server_task = asyncio.ensure_future(server.serve(sockets=[listener]))
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    url = f"ws://127.0.0.1:{port}/ws"
+    results = []
+    n_slow = int(clients * slow_fraction)
+    await asyncio.gather(*[
+        run_client(url, duration, results, slow=i < n_slow) for i in range(clients)
+    ])
+    dropped = app_module.broadcaster.dropped_total
+    ticks = sum(app_module.broadcaster.ticks.values())
+
+    server.should_exit = True
+    await server_task
+    return results, ticks, dropped
+
+def fast_latencies(results):
+    return np.array([l for r in results if not r[2] for l in r[1]]) * 1000
+
+def report(results, ticks, duration):
+    fast = [r for r in results if not r[2]]
+    slow = [r for r in results if r[2]]
+    latencies = fast_latencies(results)
+    total = sum(r[0] for r in results)
+
+    print(f"Clients: {len(results)} ({len(slow)} slow) | Duration: {duration}s")
+    print(f"Analysis ticks produced: {ticks} ({ticks / duration:,.0f}/s)")
+    print(f"Messages delivered: {total:,} ({total / duration:,.0f}/s)")
+    if fast:
+        print(f"Fast client msgs/s (avg): {np.mean([r[0] for r in fast]) / duration:,.1f}")
+    if slow:
+        print(f"Slow client msgs/s (avg): {np.mean([r[0] for r in slow]) / duration:,.1f}")
+    if latencies.size:
+        print(f"Fan-out latency (fast clients): p50 {np.percentile(latencies, 50):.2f}ms | "
+              f"p99 {np.percentile(latencies, 99):.2f}ms | max {latencies.max():.2f}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the FastAPI broadcast path against a local feed")
+    parser.add_argument('--clients', type=int, default=300)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--rate', type=float, default=50.0, help="feed updates per second")
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--slow-fraction', type=float, default=0.1)
+    parser.add_argument('--max-p99-ms', type=float, default=250.0,
+                        help="fail if fast-client fan-out p99 exceeds this")
+    args = parser.parse_args()
+
+    print("Broadcast Load Test")
+    print("=" * 50)
+    results, ticks, dropped = asyncio.run(
+        load_test(args.clients, args.duration, args.rate, args.port, args.slow_fraction))
+    report(results, ticks, args.duration)
+    print(f"Messages dropped for slow clients: {dropped:,}")
+
+    failures = []
+    if args.slow_fraction > 0 and dropped == 0:
+        failures.append("slow clients never filled their server-side queues")
+    latencies = fast_latencies(results)
+    if not latencies.size:
+        failures.append("fast clients received no messages")
+    elif np.percentile(latencies, 99) > args.max_p99_ms:
+        failures.append(f"fast-client p99 {np.percentile(latencies, 99):.2f}ms exceeds {args.max_p99_ms:.0f}ms")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import time
+import sys
+import os
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.regression import SlippageModel, MakerTakerModel
+
+def time_per_call(func, features, iterations):
+    for _ in range(100):
+        func(features)
+    start_time = time.perf_counter()
+    for _ in range(iterations):
+        func(features)
+    return (time.perf_counter() - start_time) / iterations * 1e6
+
+def main(iterations=5000):
+    rng = np.random.default_rng(0)
+    features = rng.normal(size=(2000, 6))
+    slippage = SlippageModel()
+    slippage.fit(features, features @ np.arange(6.0) + rng.normal(size=2000))
+    maker_taker = MakerTakerModel()
+    maker_taker.fit(features, (features[:, 0] > 0).astype(int))
+
+    row = features[:1]
+    print("Per-Tick Inference Benchmark (1x6 feature row)")
+    print("=" * 62)
+    print(f"{'Model':<30} | {'sklearn (us)':>12} | {'compiled (us)':>13}")
+    print("-" * 62)
+
+    for name, model, predict in (("SlippageModel.predict", slippage, slippage.predict),
+                                 ("MakerTakerModel.predict_proba", maker_taker, maker_taker.predict_proba)):
+        model.use_compiled = False
+        sklearn_us = time_per_call(predict, row, iterations)
+        model.use_compiled = True
+        compiled_us = time_per_call(predict, row, iterations)
+        print(f"{name:<30} | {sklearn_us:>12.1f} | {compiled_us:>13.1f}")
+
+if __name__ == "__main__":
+    main()
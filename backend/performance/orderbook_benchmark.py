@@ -0,0 +1,91 @@
+import time
+import sys
+import os
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from websocket.data_stream import OrderBookManager
+
+class DictResortOrderBook:
+    """
+    The previous OrderBookManager update path: dict updates followed by a full
+    re-sort of both sides and a list copy for the top-10 slice
+    """
+    def __init__(self):
+        self.bids = {}
+        self.asks = {}
+
+    def update_orderbook(self, data):
+        for bid in data.get('bids', []):
+            price, size = float(bid[0]), float(bid[1])
+            if size == 0:
+                self.bids.pop(price, None)
+            else:
+                self.bids[price] = size
+
+        for ask in data.get('asks', []):
+            price, size = float(ask[0]), float(ask[1])
+            if size == 0:
+                self.asks.pop(price, None)
+            else:
+                self.asks[price] = size
+
+        self.bids = dict(sorted(self.bids.items(), reverse=True))
+        self.asks = dict(sorted(self.asks.items()))
+
+        return {
+            'bids': [[str(price), str(size)] for price, size in list(self.bids.items())[:10]],
+            'asks': [[str(price), str(size)] for price, size in list(self.asks.items())[:10]],
+        }
+
+def generate_messages(levels, n_messages, delta_size=10, tick=0.1, seed=42):
+    """
+    Build a full snapshot of `levels` per side followed by `n_messages` deltas.
+    Deltas are concentrated near the touch, mixing size changes, deletions and
+    new levels the way a live OKX `books` feed does.
+    """
+    rng = np.random.default_rng(seed)
+    mid = 50000.0
+
+    def level(price, size):
+        return [f"{price:.1f}", f"{size:.4f}", "0", "1"]
+
+    snapshot = {
+        'bids': [level(mid - tick * (i + 1), rng.uniform(0.1, 5.0)) for i in range(levels)],
+        'asks': [level(mid + tick * (i + 1), rng.uniform(0.1, 5.0)) for i in range(levels)],
+    }
+
+    deltas = []
+    for _ in range(n_messages):
+        message = {}
+        for side, sign in (('bids', -1), ('asks', 1)):
+            offsets = np.minimum(rng.geometric(0.15, delta_size), levels)
+            sizes = rng.uniform(0.1, 5.0, delta_size)
+            sizes[rng.random(delta_size) < 0.2] = 0.0
+            message[side] = [level(mid + sign * tick * o, s) for o, s in zip(offsets, sizes)]
+        deltas.append(message)
+
+    return snapshot, deltas
+
+def run_book(book, snapshot, deltas):
+    book.update_orderbook(snapshot)
+    start_time = time.perf_counter()
+    for message in deltas:
+        book.update_orderbook(message)
+    elapsed = time.perf_counter() - start_time
+    return len(deltas) / elapsed
+
+def main(depths=(50, 400, 5000), n_messages=2000):
+    print("Order Book Update Benchmark")
+    print("=" * 60)
+    print(f"{'Levels':>8} | {'Dict re-sort (upd/s)':>20} | {'Sorted array (upd/s)':>20} | {'Speedup':>7}")
+    print("-" * 60)
+
+    for levels in depths:
+        snapshot, deltas = generate_messages(levels, n_messages)
+        baseline = run_book(DictResortOrderBook(), snapshot, deltas)
+        optimized = run_book(OrderBookManager(), snapshot, deltas)
+        print(f"{levels:>8} | {baseline:>20,.0f} | {optimized:>20,.0f} | {optimized / baseline:>6.1f}x")
+
+if __name__ == "__main__":
+    main()
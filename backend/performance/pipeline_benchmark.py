@@ -0,0 +1,184 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from performance.orderbook_benchmark import generate_messages
+
+ANALYZER = "performance.pipeline_benchmark:create_analyzer"
+
+def create_analyzer(orderbooks):
+    """
+    Worker analyzer: the app's analysis without online learning, whose
+    background refits would dominate the timings
+    """
+    import app as app_module
+    app_module.ONLINE_LEARNING = False
+    analyze = app_module.create_worker_analyzer(orderbooks)
+    analyze.close = None  # Nothing learned; write no model state for the synthetic instruments
+    return analyze
+
+def instrument_feed(instruments, levels=400, delta_size=10):
+    """
+    Raw OKX pushes per instrument: a snapshot and a cycle of 500 deltas,
+    compact like the exchange's
+    """
+    snapshot, deltas = generate_messages(levels, 500, delta_size)
+    snapshots, cycles = {}, {}
+    for inst_id in instruments:
+        arg = {'channel': 'books', 'instId': inst_id}
+        snapshots[inst_id] = json.dumps({'arg': arg, 'action': 'snapshot', 'data': [snapshot]}, separators=(',', ':'))
+        cycles[inst_id] = itertools.cycle([json.dumps({'arg': arg, 'data': [delta]}, separators=(',', ':')) for delta in deltas])
+    return snapshots, cycles
+
+def pace(start_time, i, rate):
+    """
+    Sleep until update `i` is due at `rate` updates/sec (0 = unpaced)
+    """
+    if rate:
+        wait = start_time + i / rate - time.perf_counter()
+        if wait > 0:
+            time.sleep(wait)
+
+def run_inline(instruments, messages, rate=0):
+    """
+    Everything on one thread, as the event loop does with ANALYSIS_WORKERS = 0
+    """
+    import app as app_module
+    from websocket.codec import decode_book_message
+    from websocket.data_stream import OrderBookManager, process_book_message
+
+    app_module.ONLINE_LEARNING = False
+    orderbooks = {inst_id: OrderBookManager() for inst_id in instruments}
+    analyze = app_module.create_worker_analyzer(orderbooks)
+    snapshots, cycles = instrument_feed(instruments)
+    for inst_id in instruments:
+        process_book_message(orderbooks[inst_id], inst_id, decode_book_message(snapshots[inst_id]))
+
+    order = itertools.cycle(instruments)
+    latencies = []
+    start_time = time.perf_counter()
+    for i in range(messages):
+        pace(start_time, i, rate)
+        inst_id = next(order)
+        received = time.perf_counter()
+        data = decode_book_message(next(cycles[inst_id]))
+        analyze(process_book_message(orderbooks[inst_id], inst_id, data))
+        latencies.append(time.perf_counter() - received)
+    elapsed = time.perf_counter() - start_time
+    return {
+        'workers': 0,
+        'applied': messages / elapsed,
+        'throughput': messages / elapsed,
+        'loop_us': sum(latencies) / messages * 1e6,
+        'p99_ms': np.percentile(latencies, 99) * 1e3,
+        'completed': messages,
+        'dropped': 0,
+        'resyncs': 0,
+        'high_water': 0.0
+    }
+
+def run_sharded(instruments, workers, messages, ring_size, rate=0, timeout=60.0):
+    """
+    Submit raw pushes from this process and collect the workers' analyses
+    """
+    from websocket.sharded import ShardedPipeline
+
+    pipeline = ShardedPipeline(instruments, workers, analyzer=ANALYZER, ring_size=ring_size)
+    snapshots, cycles = instrument_feed(instruments)
+    pipeline.start()
+    try:
+        # Wait until every worker has applied its snapshots and analysed a tick
+        pending = set(instruments)
+        deadline = time.monotonic() + timeout
+        while pending and time.monotonic() < deadline:
+            for inst_id in pending:
+                pipeline.submit(inst_id, snapshots[inst_id])
+                pipeline.submit(inst_id, next(cycles[inst_id]))
+            time.sleep(0.2)
+            pending -= {inst_id for inst_id, _ in pipeline.poll()}
+
+        order = itertools.cycle(instruments)
+        latencies = []
+        completed = 0
+        loop_time = 0.0
+        start_time = time.perf_counter()
+        for i in range(messages):
+            pace(start_time, i, rate)
+            inst_id = next(order)
+            call_start = time.perf_counter()
+            pipeline.submit(inst_id, next(cycles[inst_id]))
+            if rate or i % 32 == 0:
+                now = time.time()
+                results = pipeline.poll()
+                latencies.extend(now - tick.trace['received'] for _, tick in results)
+                completed += len(results)
+                # Stand-in for the feed resubscribing: send a fresh snapshot
+                for resync_id in list(pipeline.resync):
+                    pipeline.resync.discard(resync_id)
+                    pipeline.submit(resync_id, snapshots[resync_id])
+            loop_time += time.perf_counter() - call_start
+
+        # Let the workers finish what is queued
+        idle_since = time.monotonic()
+        while time.monotonic() - idle_since < 0.5:
+            now = time.time()
+            results = pipeline.poll()
+            if results:
+                idle_since = time.monotonic()
+                latencies.extend(now - tick.trace['received'] for _, tick in results)
+                completed += len(results)
+            else:
+                time.sleep(0.001)
+        elapsed = time.perf_counter() - start_time - 0.5
+
+        metrics = pipeline.metrics()
+        return {
+            'workers': pipeline.workers,
+            # Workers apply every push but analyse only the newest tick per instrument
+            'applied': sum(shard['input']['read'] for shard in metrics['shards']) / elapsed,
+            'throughput': completed / elapsed,
+            'loop_us': loop_time / messages * 1e6,
+            'p99_ms': np.percentile(latencies, 99) * 1e3 if latencies else float('nan'),
+            'completed': completed,
+            'dropped': sum(shard['input']['dropped'] + shard['output']['dropped'] for shard in metrics['shards'])
+                       + metrics['discarded'],
+            'resyncs': metrics['resyncs'],
+            'high_water': max(shard['input']['high_water'] for shard in metrics['shards'])
+        }
+    finally:
+        pipeline.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput of book maintenance and analytics in worker processes")
+    parser.add_argument('--instruments', type=int, default=4)
+    parser.add_argument('--workers', default="0,1,2,4", help="comma separated; 0 runs everything inline")
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--rate', type=float, default=0, help="total updates/sec; 0 submits as fast as possible")
+    parser.add_argument('--ring-size', type=int, default=4 * 1024 * 1024, help="bytes per ring")
+    args = parser.parse_args()
+
+    instruments = [f"INST{i}-USDT-SWAP" for i in range(args.instruments)]
+    rows = []
+    for workers in (int(w) for w in args.workers.split(',')):
+        if workers == 0:
+            rows.append(run_inline(instruments, args.messages, args.rate))
+        else:
+            rows.append(run_sharded(instruments, workers, args.messages, args.ring_size, args.rate))
+
+    print(f"\nPipeline Benchmark ({args.instruments} instruments, {args.messages:,} updates, {os.cpu_count()} CPUs)")
+    print("=" * 105)
+    print(f"{'Workers':>7} | {'Applied/s':>10} | {'Analysed/s':>10} | {'Loop us/msg':>11} | {'p99 (ms)':>9} | "
+          f"{'Completed':>9} | {'Dropped':>7} | {'Resyncs':>7} | {'Ring peak':>9}")
+    print("-" * 105)
+    for row in rows:
+        print(f"{row['workers']:>7} | {row['applied']:>10,.0f} | {row['throughput']:>10,.0f} | {row['loop_us']:>11.1f} | "
+              f"{row['p99_ms']:>9.2f} | {row['completed']:>9,} | {row['dropped']:>7,} | {row['resyncs']:>7} | "
+              f"{row['high_water']:>9.1%}")
+
+if __name__ == "__main__":
+    main()
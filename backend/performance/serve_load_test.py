@@ -0,0 +1,133 @@
+import argparse
+import asyncio
+import functools
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import time
+from datetime import datetime
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import websockets
+from serve import install_loop, start_producer, stop_producer
+from websocket.pubsub import private_socket_path
+from config.settings import INSTRUMENTS
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run_synthetic_producer(path, loop, rate):
+    """
+    Producer process fed by generated deltas instead of OKX (see broadcast_load_test)
+    """
+    install_loop(loop)
+    import app as app_module
+    from performance.broadcast_load_test import synthetic_feed
+    app_module.market_data_hub.source = synthetic_feed(rate)
+    try:
+        asyncio.run(app_module.produce_market_data(path))
+    except KeyboardInterrupt:
+        pass  # Stopped by stop_producer
+
+async def run_client(url, duration, results):
+    latencies = []
+    received = 0
+    async with websockets.connect(url, max_queue=None) as ws:
+        end = time.monotonic() + duration
+        while time.monotonic() < end:
+            try:
+                message = await asyncio.wait_for(ws.recv(), timeout=end - time.monotonic())
+            except asyncio.TimeoutError:
+                break
+            data = json.loads(message)
+            sent = datetime.fromisoformat(data['market_data']['timestamp'])
+            latencies.append((datetime.utcnow() - sent).total_seconds())
+            received += 1
+    results.append((received, latencies))
+
+async def wait_until_serving(url, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with websockets.connect(url):
+                return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not start within {timeout}s")
+
+async def drive_clients(port, clients, duration, instruments):
+    urls = [f"ws://127.0.0.1:{port}/ws?instId={inst_id}" for inst_id in instruments]
+    await wait_until_serving(urls[0])
+    results = []
+    await asyncio.gather(*[run_client(urls[i % len(urls)], duration, results) for i in range(clients)])
+    return results
+
+def run_workers(workers, clients, duration, port, socket_path, loop, instruments, startup):
+    """
+    One serving tier of `workers` processes against the running producer
+    :return: dict of throughput and latency statistics
+    """
+    server = subprocess.Popen(
+        [sys.executable, 'serve.py', '--no-producer', '--workers', str(workers), '--host', '127.0.0.1',
+         '--port', str(port), '--loop', loop, '--socket', socket_path],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        time.sleep(startup * workers)  # Let every worker import the app and subscribe
+        results = asyncio.run(drive_clients(port, clients, duration, instruments))
+    finally:
+        server.send_signal(signal.SIGINT)
+        try:
+            server.wait(30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    latencies = np.array([l for r in results for l in r[1]]) * 1000
+    total = sum(r[0] for r in results)
+    return {
+        'workers': workers,
+        'clients': clients,
+        'messages': total,
+        'msgs_per_sec': total / duration,
+        'p50_ms': np.percentile(latencies, 50) if latencies.size else float('nan'),
+        'p99_ms': np.percentile(latencies, 99) if latencies.size else float('nan'),
+        'max_ms': latencies.max() if latencies.size else float('nan')
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Fan-out throughput and latency of serve.py versus worker count")
+    parser.add_argument('--workers', default="1,2,4", help="comma separated worker counts to compare")
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--rate', type=float, default=50.0, help="feed updates per second per instrument")
+    parser.add_argument('--instruments', type=int, default=1, help="clients are spread over this many instruments")
+    parser.add_argument('--port', type=int, default=5056)
+    parser.add_argument('--loop', choices=('auto', 'uvloop', 'asyncio'), default='auto')
+    parser.add_argument('--startup', type=float, default=2.0, help="seconds allowed per worker to start")
+    args = parser.parse_args()
+
+    instruments = INSTRUMENTS[:args.instruments]
+    socket_path = private_socket_path()
+    producer = start_producer(socket_path, args.loop, functools.partial(run_synthetic_producer, rate=args.rate))
+    rows = []
+    try:
+        for workers in (int(w) for w in args.workers.split(',')):
+            rows.append(run_workers(workers, args.clients, args.duration, args.port, socket_path, args.loop,
+                                    instruments, args.startup))
+    finally:
+        stop_producer(producer)
+        shutil.rmtree(os.path.dirname(socket_path), ignore_errors=True)
+
+    print(f"\nServe Load Test ({args.clients} clients, {len(instruments)} instrument(s), "
+          f"{args.rate:g} updates/s, loop={args.loop}, {os.cpu_count()} CPUs)")
+    print("=" * 72)
+    print(f"{'Workers':>7} | {'Messages':>9} | {'Msgs/s':>9} | {'p50 (ms)':>9} | {'p99 (ms)':>9} | {'max (ms)':>9}")
+    print("-" * 72)
+    for row in rows:
+        print(f"{row['workers']:>7} | {row['messages']:>9,} | {row['msgs_per_sec']:>9,.0f} | {row['p50_ms']:>9.2f} | "
+              f"{row['p99_ms']:>9.2f} | {row['max_ms']:>9.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# serve.py
+
+import argparse
+import asyncio
+import inspect
+import multiprocessing
+import os
+import shutil
+import signal
+import uvicorn
+from websocket.pubsub import PUBSUB_ENV, private_socket_path
+from config.settings import SERVE_WORKERS, SERVE_LOOP, PUBSUB_PATH, WS_PER_MESSAGE_DEFLATE
+from utils.logger import logger
+
+def install_loop(loop=SERVE_LOOP):
+    """
+    Use uvloop for this process when requested and available
+    :param loop: 'auto' (uvloop if installed), 'uvloop' or 'asyncio'
+    """
+    if loop == 'asyncio':
+        return False
+    try:
+        import uvloop
+    except ImportError:
+        if loop == 'uvloop':
+            raise
+        return False
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
+
+def run_producer(path, loop=SERVE_LOOP):
+    """
+    Producer process: the only OKX connection, order books and analysis
+    """
+    install_loop(loop)
+    import app as app_module
+    try:
+        asyncio.run(app_module.produce_market_data(path))
+    except KeyboardInterrupt:
+        pass  # Stopped by serve.py; the feed is shut down and the models saved
+
+def start_producer(path, loop=SERVE_LOOP, target=run_producer):
+    # Spawned before PUBSUB_ENV is set, so the producer runs the feed itself
+    process = multiprocessing.get_context('spawn').Process(target=target, args=(path, loop), daemon=True)
+    process.start()
+    logger.info(f"Market data producer started (pid {process.pid}) on {path}")
+    return process
+
+def stop_producer(process, timeout=10.0):
+    """
+    Interrupt the producer so it stops the feed and saves its models, then make sure it exits
+    """
+    if process.is_alive() and os.name != 'nt':
+        os.kill(process.pid, signal.SIGINT)
+    process.join(timeout)
+    if process.is_alive():
+        process.terminate()
+        process.join()
+
+def uvicorn_options(**options):
+    """
+    Drop options the installed uvicorn does not know (permessage-deflate needs 0.19+)
+    """
+    parameters = inspect.signature(uvicorn.Config).parameters
+    return {name: value for name, value in options.items() if name in parameters}
+
+def serve(workers, host, port, loop, path):
+    """
+    Run `workers` uvicorn processes serving app:app, all fed by the producer on `path`
+    """
+    os.environ[PUBSUB_ENV] = path  # Inherited by the workers; see app.py
+    uvicorn.run("app:app", host=host, port=port, workers=workers, loop=loop,
+                **uvicorn_options(ws_per_message_deflate=WS_PER_MESSAGE_DEFLATE))
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the FastAPI app from several workers sharing one market data feed")
+    parser.add_argument('--workers', type=int, default=SERVE_WORKERS)
+    parser.add_argument('--host', default="0.0.0.0")
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--loop', choices=('auto', 'uvloop', 'asyncio'), default=SERVE_LOOP)
+    parser.add_argument('--socket', default=PUBSUB_PATH,
+                        help="pub/sub socket between producer and workers, in a directory only this user "
+                             "can write (default: a new private directory)")
+    parser.add_argument('--no-producer', action='store_true',
+                        help="attach to a producer already publishing on --socket")
+    args = parser.parse_args()
+
+    if args.no_producer and not args.socket:
+        parser.error("--no-producer needs the --socket of the running producer")
+    path = args.socket or private_socket_path()
+    producer = None if args.no_producer else start_producer(path, args.loop)
+    try:
+        serve(args.workers, args.host, args.port, args.loop, path)
+    finally:
+        if producer is not None:
+            stop_producer(producer)
+        if not args.socket:
+            shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+# storage package initialization
+
+from .tick_store import TickStore, import_recording
+
+__all__ = ['TickStore', 'import_recording']
\ No newline at end of file
@@ -0,0 +1,262 @@
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timezone
+import numpy as np
+from utils.logger import logger
+from config.settings import TICK_STORE_DEPTH, TICK_STORE_FLUSH_ROWS
+
+META_FILE = "meta.json"
+ROWS_FILE = "rows"  # Committed row count; readers never look past it
+NANOSECONDS = 1_000_000_000
+
+def column_layout(depth):
+    """
+    Column name -> (dtype, per-row shape) for a store of `depth` levels per side
+    """
+    return {
+        'timestamp': (np.dtype('<i8'), ()),  # Epoch nanoseconds
+        'seq_id': (np.dtype('<i8'), ()),
+        'bid_px': (np.dtype('<f8'), (depth,)),
+        'bid_sz': (np.dtype('<f8'), (depth,)),
+        'ask_px': (np.dtype('<f8'), (depth,)),
+        'ask_sz': (np.dtype('<f8'), (depth,))
+    }
+
+def partition_day(timestamp_ns):
+    return datetime.fromtimestamp(timestamp_ns // NANOSECONDS, timezone.utc).strftime('%Y-%m-%d')
+
+class PartitionWriter:
+    """
+    Appends rows to one instrument/day partition. Rows are buffered in
+    preallocated arrays and written column by column; the row count is
+    published last so concurrent readers only ever see complete rows.
+    """
+
+    def __init__(self, path, depth, buffer_rows):
+        self.path = path
+        self.layout = column_layout(depth)
+        os.makedirs(path, exist_ok=True)
+
+        meta_path = os.path.join(path, META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                if json.load(f)['depth'] != depth:
+                    raise ValueError(f"Partition {path} was written with a different depth")
+        else:
+            with open(meta_path, 'w') as f:
+                json.dump({'depth': depth, 'columns': {name: [dtype.str, list(shape)]
+                                                       for name, (dtype, shape) in self.layout.items()}}, f)
+
+        self.rows = read_row_count(path)
+        self.last_timestamp = None
+        self.files = {}
+        for name, (dtype, shape) in self.layout.items():
+            f = open(os.path.join(path, f"{name}.bin"), 'ab')
+            # Drop rows from a write that was interrupted before it was committed
+            f.truncate(self.rows * dtype.itemsize * int(np.prod(shape)))
+            self.files[name] = f
+        if self.rows:
+            self.last_timestamp = int(open_column(path, 'timestamp', self.layout, self.rows)[-1])
+
+        self.buffer = {name: np.empty((buffer_rows,) + shape, dtype) for name, (dtype, shape) in self.layout.items()}
+        self.pending = 0
+
+    def append(self, timestamp_ns, seq_id, bid_px, bid_sz, ask_px, ask_sz):
+        if self.last_timestamp is not None and timestamp_ns < self.last_timestamp:
+            timestamp_ns = self.last_timestamp  # Keep the time column sorted for binary search
+        i = self.pending
+        self.buffer['timestamp'][i] = timestamp_ns
+        self.buffer['seq_id'][i] = seq_id
+        self.buffer['bid_px'][i] = bid_px
+        self.buffer['bid_sz'][i] = bid_sz
+        self.buffer['ask_px'][i] = ask_px
+        self.buffer['ask_sz'][i] = ask_sz
+        self.pending += 1
+        self.last_timestamp = timestamp_ns
+        if self.pending == len(self.buffer['timestamp']):
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        for name, f in self.files.items():
+            f.write(self.buffer[name][:self.pending].tobytes())
+            f.flush()
+        self.rows += self.pending
+        self.pending = 0
+        write_row_count(self.path, self.rows)
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            for f in self.files.values():
+                f.close()
+
+def read_row_count(path):
+    try:
+        with open(os.path.join(path, ROWS_FILE)) as f:
+            return int(f.read() or 0)
+    except FileNotFoundError:
+        return 0
+
+def write_row_count(path, rows):
+    tmp_path = os.path.join(path, ROWS_FILE + ".tmp")
+    with open(tmp_path, 'w') as f:
+        f.write(str(rows))
+    os.replace(tmp_path, os.path.join(path, ROWS_FILE))
+
+def open_column(path, name, layout, rows):
+    """
+    Memory-map the first `rows` committed rows of a column read-only
+    """
+    dtype, shape = layout[name]
+    if rows == 0:
+        return np.empty((0,) + shape, dtype)
+    return np.memmap(os.path.join(path, f"{name}.bin"), dtype=dtype, mode='r', shape=(rows,) + shape)
+
+class TickStore:
+    """
+    Columnar store of top-N order book levels, partitioned as
+    <root>/<instId>/<YYYY-MM-DD>/<column>.bin. Reads memory-map the column
+    files and return zero-copy slices, so partitions of any size can be
+    queried without loading them into RAM. One process appends; any number
+    of readers may query concurrently.
+    """
+
+    def __init__(self, root, depth=TICK_STORE_DEPTH, flush_rows=TICK_STORE_FLUSH_ROWS):
+        """
+        :param root: store directory
+        :param depth: book levels kept per side
+        :param flush_rows: rows buffered per partition before they are written
+        """
+        self.root = root
+        self.depth = depth
+        self.flush_rows = flush_rows
+        self.writers = {}  # instId -> (day, PartitionWriter)
+        self._px = np.full(depth, np.nan)
+        self._sz = np.zeros(depth)
+
+    def append(self, inst_id, orderbook, timestamp=None):
+        """
+        Append the current top levels of an OrderBookManager
+        :param timestamp: epoch seconds of the update, defaults to now
+        """
+        try:
+            timestamp_ns = int((time.time() if timestamp is None else timestamp) * NANOSECONDS)
+            day = partition_day(timestamp_ns)
+            current = self.writers.get(inst_id)
+            if current is None or current[0] != day:
+                if current is not None:
+                    current[1].close()
+                writer = PartitionWriter(os.path.join(self.root, inst_id, day), self.depth, self.flush_rows)
+                self.writers[inst_id] = (day, writer)
+            writer = self.writers[inst_id][1]
+
+            bid_px, bid_sz = self._levels(orderbook.bids)
+            ask_px, ask_sz = self._levels(orderbook.asks)
+            seq_id = orderbook.seq_id if orderbook.seq_id is not None else -1
+            writer.append(timestamp_ns, seq_id, bid_px, bid_sz, ask_px, ask_sz)
+        except Exception as e:
+            logger.error(f"Error appending to tick store: {e}")
+
+    def _levels(self, book):
+        """
+        Fixed-width price/size rows; missing levels are NaN prices with zero size
+        """
+        px = self._px.copy()
+        sz = self._sz.copy()
+        levels = book.top(self.depth)
+        if levels:
+            px[:len(levels)], sz[:len(levels)] = zip(*levels)
+        return px, sz
+
+    def flush(self):
+        for _, writer in self.writers.values():
+            writer.flush()
+
+    def close(self):
+        for _, writer in self.writers.values():
+            writer.close()
+        self.writers = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def instruments(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, name)))
+
+    def days(self, inst_id):
+        path = os.path.join(self.root, inst_id)
+        if not os.path.isdir(path):
+            return []
+        return sorted(os.listdir(path))
+
+    def read_partition(self, inst_id, day, start=None, end=None):
+        """
+        Zero-copy view of one partition's committed rows in [start, end]
+        :param start: optional epoch seconds, inclusive
+        :param end: optional epoch seconds, inclusive
+        :return: dict of column name -> read-only memory-mapped array
+        """
+        path = os.path.join(self.root, inst_id, day)
+        with open(os.path.join(path, META_FILE)) as f:
+            layout = column_layout(json.load(f)['depth'])
+        rows = read_row_count(path)
+        columns = {name: open_column(path, name, layout, rows) for name in layout}
+
+        timestamps = columns['timestamp']
+        first = 0 if start is None else int(np.searchsorted(timestamps, int(start * NANOSECONDS), 'left'))
+        last = rows if end is None else int(np.searchsorted(timestamps, int(end * NANOSECONDS), 'right'))
+        return {name: column[first:last] for name, column in columns.items()}
+
+    def read(self, inst_id, start=None, end=None):
+        """
+        Iterate zero-copy partition views covering a time range, oldest first
+        :return: generator of (day, columns dict)
+        """
+        first_day = partition_day(int(start * NANOSECONDS)) if start is not None else None
+        last_day = partition_day(int(end * NANOSECONDS)) if end is not None else None
+        for day in self.days(inst_id):
+            if (first_day and day < first_day) or (last_day and day > last_day):
+                continue
+            columns = self.read_partition(inst_id, day, start, end)
+            if len(columns['timestamp']):
+                yield day, columns
+
+    def load(self, inst_id, start=None, end=None):
+        """
+        Concatenate a time range into in-memory arrays (copies; use read() for large ranges)
+        """
+        blocks = [columns for _, columns in self.read(inst_id, start, end)]
+        layout = column_layout(self.depth)
+        if not blocks:
+            return {name: np.empty((0,) + shape, dtype) for name, (dtype, shape) in layout.items()}
+        return {name: np.concatenate([block[name] for block in blocks]) for name in blocks[0]}
+
+def import_recording(feed_path, store, instruments=None):
+    """
+    Populate a tick store by replaying a FeedRecorder file through the order books
+    :return: number of rows appended
+    """
+    from websocket.recorder import replay_orderbooks
+
+    async def run():
+        orderbooks = {}
+        rows = 0
+        async for inst_id, data in replay_orderbooks(feed_path, instruments, orderbooks):
+            store.append(inst_id, orderbooks[inst_id], data.received_at)
+            rows += 1
+        return rows
+
+    rows = asyncio.run(run())
+    store.flush()
+    logger.info(f"Imported {rows} book updates from {feed_path}")
+    return rows
@@ -0,0 +1,117 @@
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest.engine import book_features, run_backtest, schedule_fractions, walk_levels
+from models.features import prepare_features
+from models.market_impact import AlmgrenChrissModel
+from models.persistence import save_models, instrument_state_dir
+from models.regression import SlippageModel, MakerTakerModel
+from storage.tick_store import TickStore
+from websocket.data_stream import OrderBookManager
+from websocket.tick import BookTick
+from tests.test_tick_store import START, DAY
+
+class TestBacktestEngine(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        rng = np.random.default_rng(2)
+        with TickStore(self.root, depth=5) as store:
+            for inst_id in ('BTC-USDT', 'ETH-USDT'):
+                for day in range(2):
+                    mid = 100.0
+                    for i in range(300):
+                        mid += rng.normal(scale=0.05)
+                        orderbook = OrderBookManager()
+                        for level in range(5):
+                            orderbook.bids.update(round(mid - 0.05 - level * 0.1, 2), 1.0 + level)
+                            orderbook.asks.update(round(mid + 0.05 + level * 0.1, 2), 1.0 + level)
+                        store.append(inst_id, orderbook, START + day * DAY + i)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_walk_levels_matches_orderbook(self):
+        orderbook = OrderBookManager()
+        orderbook.bids.update(99.0, 1.0)
+        for price, size in ((101.0, 1.0), (102.0, 2.0), (103.0, 0.5)):
+            orderbook.asks.update(price, size)
+        prices = np.array([[101.0, 102.0, 103.0, np.nan]] * 3)
+        sizes = np.array([[1.0, 2.0, 0.5, 0.0]] * 3)
+        amounts = np.array([50.0, 200.0, 1000.0])
+        quantity, notional, complete = walk_levels(prices, sizes, amounts)
+        expected = orderbook.estimate_execution('buy', amounts)
+        np.testing.assert_allclose(quantity, expected['filled_quantity'])
+        np.testing.assert_allclose(notional, expected['filled_notional'])
+        np.testing.assert_array_equal(complete, expected['complete'])
+
+    def test_process_pool_matches_in_process(self):
+        serial = run_backtest(self.root, workers=0, model_dir=None, trade_amount=100, slices=5, slice_ticks=4)
+        pooled = run_backtest(self.root, workers=2, model_dir=None, trade_amount=100, slices=5, slice_ticks=4)
+        self.assertEqual(len(pooled['partitions']), 4)
+        self.assertEqual(pooled['rows'], 4 * (300 - 16))
+        self.assertEqual(serial['rows'], pooled['rows'])
+        for name, stats in serial['summary'].items():
+            self.assertAlmostEqual(stats['mae'], pooled['summary'][name]['mae'])
+
+        # Unfitted models predict no slippage, so the error is minus the realized walk-the-book cost
+        slippage = pooled['summary']['slippage']
+        self.assertGreater(slippage['mean_realized'], 0)
+        self.assertAlmostEqual(slippage['bias'], -slippage['mean_realized'])
+
+    def test_book_features_match_live_features(self):
+        ticks = []
+        with TickStore(self.root + '/parity', depth=5) as store:
+            rng = np.random.default_rng(3)
+            for i in range(20):
+                orderbook = OrderBookManager()
+                for level in range(3 + i % 3):  # Some rows have missing levels
+                    orderbook.bids.update(100.0 - 0.1 * level, rng.uniform(0.5, 3))
+                    orderbook.asks.update(100.1 + 0.1 * level, rng.uniform(0.5, 3))
+                store.append('BTC-USDT', orderbook, START + i)
+                bids, asks = orderbook.bids.top(5), orderbook.asks.top(5)
+                tick = BookTick(str(i), *zip(*bids), *zip(*asks))
+                ticks.append(orderbook.annotate_tick(tick, 5))
+        features, mid_price = book_features(TickStore(self.root + '/parity').read_partition('BTC-USDT', '2023-11-15'))
+        live = [prepare_features(tick) for tick in ticks]
+        np.testing.assert_allclose(features, np.vstack([row[0] for row in live]))
+        np.testing.assert_allclose(mid_price, [row[2] for row in live])
+
+    def test_schedule_fractions_are_trades_per_slice(self):
+        impact_model = AlmgrenChrissModel(eta=2.0, gamma=0.5, T=1.0)
+        volatility, slices = 0.4, 5
+        fractions = schedule_fractions(impact_model, volatility, slices)
+        kappa = np.sqrt(2.0 / 0.5) * volatility
+        holdings = np.sinh(kappa * (1.0 - np.linspace(0, 1.0, slices + 1))) / np.sinh(kappa)
+        np.testing.assert_allclose(fractions, holdings[:-1] - holdings[1:])
+        self.assertAlmostEqual(fractions.sum(), 1.0)
+        self.assertTrue(np.all(np.diff(fractions) < 0))  # Front-loaded
+
+    def test_each_instrument_uses_its_own_models(self):
+        model_dir = os.path.join(tempfile.mkdtemp(), 'model_state')
+        self.addCleanup(shutil.rmtree, os.path.dirname(model_dir))
+        slippage = SlippageModel()
+        features = np.random.default_rng(4).normal(size=(200, 6))
+        slippage.fit(features, np.full(200, 7.0))
+        save_models(instrument_state_dir(model_dir, 'BTC-USDT'), slippage, MakerTakerModel(), None)
+
+        report = run_backtest(self.root, workers=0, model_dir=model_dir, trade_amount=100, slices=2, slice_ticks=1)
+        predicted = {}
+        for result in report['partitions']:
+            stats = result['summary']['slippage']
+            predicted[result['instId']] = stats['mean_predicted']
+        self.assertAlmostEqual(predicted['BTC-USDT'], 7.0, places=3)
+        self.assertAlmostEqual(predicted['ETH-USDT'], 0.0)
+
+    def test_time_range_limits_partitions(self):
+        report = run_backtest(self.root, instruments=['ETH-USDT'], start=START + DAY, workers=0, model_dir=None,
+                              slices=2, slice_ticks=1)
+        self.assertEqual([result['day'] for result in report['partitions']], ['2023-11-16'])
+        self.assertEqual(report['rows'], 299)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.features import prepare_features
+from performance.benchmark import CASES, compare, processed_tick, summarize, time_case
+
+class TestBenchmarkHarness(unittest.TestCase):
+    def test_summarize(self):
+        stats = summarize([3.0, 1.0, 2.0])
+        self.assertEqual(stats['min'], 1.0)
+        self.assertEqual(stats['median'], 2.0)
+        self.assertEqual(stats['max'], 3.0)
+        self.assertAlmostEqual(stats['ops_per_sec'], 0.5)
+
+    def test_time_case_calls_func(self):
+        calls = []
+        samples = time_case(lambda: calls.append(1), warmup=0.0, repeats=3, min_time=0.001)
+        self.assertEqual(len(samples), 3)
+        self.assertTrue(calls)
+        self.assertTrue(all(sample > 0 for sample in samples))
+
+    def test_compare_flags_regressions(self):
+        baseline = {'results': {'a': {'median': 1.0}, 'b': {'median': 1.0}, 'c': {'median': 1.0}}}
+        results = {'results': {'a': {'median': 1.05}, 'b': {'median': 1.5}, 'c': {'median': 0.5},
+                               'd': {'median': 1.0}}}
+        status = {row[0]: row[4] for row in compare(results, baseline, threshold=0.1)}
+        self.assertEqual(status, {'a': 'ok', 'b': 'REGRESSION', 'c': 'improved', 'd': 'new'})
+
+    def test_cases_run(self):
+        for name in ('orderbook_update[levels=50,delta=10]', 'json_decode[delta=10]', 'calculate_market_impact'):
+            CASES[name]()()
+
+    def test_prepare_features(self):
+        _, data = processed_tick(levels=20)
+        features, volume, mid_price = prepare_features(data)
+        self.assertEqual(features.shape, (1, 6))
+        self.assertGreater(mid_price, 0)
+        self.assertIsNone(prepare_features({'best_bid': None})[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import json
+import unittest
+import sys
+import os
+from unittest import mock
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from websocket import codec
+from websocket.codec import decode_book_message, dumps, is_snapshot_message, parse_levels, peek_inst_id
+from websocket.data_stream import OrderBookManager, process_book_message
+
+MESSAGE = json.dumps({
+    'arg': {'channel': 'books', 'instId': 'BTC-USDT'},
+    'action': 'snapshot',
+    'data': [{'bids': [['99.5', '1.25', '0', '3'], ['99.0', '2', '0', '1']],
+              'asks': [['100.1', '0.5', '0', '2']], 'ts': '1700000000000'}]
+})
+
+class TestCodec(unittest.TestCase):
+    def test_parse_levels(self):
+        prices, sizes = parse_levels([['99.5', '1.25', '0', '3'], ['99.0', '2']])
+        np.testing.assert_array_equal(prices, [99.5, 99.0])
+        np.testing.assert_array_equal(sizes, [1.25, 2.0])
+        self.assertEqual(prices.dtype, np.float64)
+        self.assertEqual(len(parse_levels([])[0]), 0)
+
+    def test_decode_adds_numeric_levels(self):
+        for backend in (codec.orjson, None):
+            with mock.patch.object(codec, 'orjson', backend):
+                entry = decode_book_message(MESSAGE)['data'][0]
+                np.testing.assert_array_equal(entry['bid_px'], [99.5, 99.0])
+                np.testing.assert_array_equal(entry['ask_sz'], [0.5])
+                self.assertEqual(entry['bids'][0][0], '99.5')  # Kept for checksums
+
+    def test_decode_error_is_json_error(self):
+        with self.assertRaises(json.JSONDecodeError):
+            decode_book_message('{not json')
+
+    def test_dumps_numpy(self):
+        for backend in (codec.orjson, None):
+            with mock.patch.object(codec, 'orjson', backend):
+                payload = json.loads(dumps({'a': np.float64(1.5), 'b': np.arange(3.0)}))
+                self.assertEqual(payload, {'a': 1.5, 'b': [0.0, 1.0, 2.0]})
+
+    def test_peek_routing_fields(self):
+        compact = json.dumps(json.loads(MESSAGE), separators=(',', ':'))
+        self.assertEqual(peek_inst_id(compact), 'BTC-USDT')
+        self.assertEqual(peek_inst_id(MESSAGE), 'BTC-USDT')  # Falls back to decoding
+        self.assertTrue(is_snapshot_message(compact))
+        self.assertFalse(is_snapshot_message(compact.replace('snapshot', 'update')))
+
+    def test_processed_tick_carries_floats(self):
+        orderbook = OrderBookManager()
+        tick = process_book_message(orderbook, 'BTC-USDT', decode_book_message(MESSAGE), {'received': 1700000000.1})
+        self.assertEqual(tick.bid_px, [99.5, 99.0])
+        self.assertEqual(tick.bids, [(99.5, 1.25), (99.0, 2.0)])
+        self.assertFalse(hasattr(tick, '__dict__'))
+        self.assertEqual(tick.best_ask, 100.1)
+        self.assertAlmostEqual(tick.bid_depth, 3.25)
+        self.assertEqual(tick.trace['exchange'], 1700000000.0)
+        self.assertEqual(orderbook.bids.raw_levels(1), [('99.5', '1.25')])
+
+if __name__ == '__main__':
+    unittest.main()
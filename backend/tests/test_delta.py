@@ -0,0 +1,73 @@
+import json
+import math
+import unittest
+import sys
+import os
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from websocket.delta import (DELTA_PROTOCOL, JSON_PROTOCOL, DeltaEncoder, DeltaStream, decode_frame,
+                             iso_to_epoch, negotiate)
+
+def message(bid, microprice=None, curve=None):
+    return {
+        'market_data': {'instrument': 'BTC-USDT', 'timestamp': '2024-01-01T00:00:00.250000',
+                        'best_bid': bid, 'best_ask': 101.0, 'microprice': microprice},
+        'analysis': {'slippage': 0.1, 'fees': 0.2},
+        'cost_curve': {'sizes': np.array([10.0, 100.0]), 'tiers': ['Tier1'],
+                       'net_cost': curve if curve is not None else np.zeros((2, 1))}
+    }
+
+class TestDeltaProtocol(unittest.TestCase):
+    def test_negotiate(self):
+        self.assertEqual(negotiate(['json', DELTA_PROTOCOL]), (DELTA_PROTOCOL, DELTA_PROTOCOL))
+        self.assertEqual(negotiate(['json']), (JSON_PROTOCOL, JSON_PROTOCOL))
+        self.assertEqual(negotiate([]), (JSON_PROTOCOL, None))
+
+    def test_delta_carries_only_changed_values(self):
+        encoder = DeltaEncoder()
+        stream = DeltaStream()
+        first = stream.frames(encoder.encode(message(100.0)))
+        schema = json.loads(first[0])
+        self.assertEqual(schema['static'], {'market_data.instrument': 'BTC-USDT', 'cost_curve.tiers': ['Tier1']})
+        seq, state = decode_frame(schema, first[1])
+        self.assertEqual(seq, 1)
+
+        curve = np.array([[0.5], [0.0]])
+        frame = encoder.encode(message(100.5, curve=curve))
+        self.assertEqual(int(frame.changed.sum()), 2)  # best_bid and one curve cell
+        [data] = stream.frames(frame)
+        self.assertLess(len(data), len(first[1]))
+        _, state = decode_frame(schema, data, state)
+        np.testing.assert_array_equal(state, encoder.flatten(message(100.5, curve=curve))[1])
+        self.assertEqual(state[0], iso_to_epoch('2024-01-01T00:00:00.250000'))
+
+    def test_missing_values_are_nan_and_unchanged(self):
+        encoder = DeltaEncoder()
+        encoder.encode(message(100.0))
+        frame = encoder.encode(message(100.0))
+        self.assertTrue(math.isnan(frame.values[3]))
+        self.assertFalse(frame.changed.any())
+
+    def test_gap_sends_keyframe(self):
+        encoder = DeltaEncoder()
+        stream = DeltaStream()
+        stream.frames(encoder.encode(message(100.0)))
+        encoder.encode(message(100.5))  # Dropped from the client's queue
+        frames = stream.frames(encoder.encode(message(101.0)))
+        self.assertEqual(len(frames), 1)
+        self.assertEqual(frames[0][0], 1)  # Keyframe
+        self.assertEqual((stream.keyframes, stream.deltas), (2, 0))
+
+    def test_layout_change_sends_new_schema(self):
+        encoder = DeltaEncoder()
+        stream = DeltaStream()
+        stream.frames(encoder.encode(message(100.0)))
+        changed = message(100.0)
+        changed['market_data']['instrument'] = 'ETH-USDT'
+        frames = stream.frames(encoder.encode(changed))
+        self.assertEqual(json.loads(frames[0])['id'], 1)
+        self.assertEqual(frames[1][1], 1)
+
+if __name__ == '__main__':
+    unittest.main()
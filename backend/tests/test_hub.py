@@ -0,0 +1,144 @@
+import asyncio
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from websocket.hub import MarketDataHub
+from websocket.broadcast import AnalysisBroadcaster
+from websocket.tick import BookTick
+from websocket.delta import DELTA_PROTOCOL
+from utils.conflation import ConflatingSlot
+
+def fake_source(updates_per_instrument):
+    async def source(instruments, orderbooks):
+        for i in range(updates_per_instrument):
+            for inst_id in instruments:
+                yield inst_id, {'instId': inst_id, 'seq': i}
+            await asyncio.sleep(0)
+    return source
+
+class TestMarketDataHub(unittest.TestCase):
+    def test_partitions_spread_instruments_over_pool(self):
+        hub = MarketDataHub([f"I{i}" for i in range(5)], connections=2)
+        self.assertEqual(hub.partitions(), [['I0', 'I2', 'I4'], ['I1', 'I3']])
+        self.assertEqual(len(hub.orderbooks), 5)
+
+    def test_subscribers_receive_only_their_instrument(self):
+        async def scenario():
+            hub = MarketDataHub(['A', 'B', 'C'], connections=2, source=fake_source(3))
+            queue_a = hub.subscribe('A')
+            queue_c = hub.subscribe('C', maxsize=2)
+            hub.start()
+            await asyncio.gather(*hub.tasks)
+            return hub, queue_a, queue_c
+
+        hub, queue_a, queue_c = asyncio.run(scenario())
+        self.assertEqual([queue_a.get_nowait()['seq'] for _ in range(3)], [0, 1, 2])
+        # The bounded queue kept only the newest updates
+        self.assertEqual([queue_c.get_nowait()['seq'] for _ in range(2)], [1, 2])
+        self.assertEqual(hub.latest['B']['seq'], 2)
+
+    def test_unknown_instrument_rejected(self):
+        hub = MarketDataHub(['A'])
+        with self.assertRaises(KeyError):
+            hub.subscribe('B')
+
+class TestAnalysisBroadcaster(unittest.TestCase):
+    def test_analysis_runs_once_and_slow_clients_drop_oldest(self):
+        calls = []
+
+        def analyze(data):
+            calls.append(data.timestamp)
+            return {'seq': data.timestamp}
+
+        async def scenario():
+            hub = MarketDataHub(['A'], source=None)
+            broadcaster = AnalysisBroadcaster(hub, analyze, queue_size=2, encode=lambda m: m['seq'])
+            queues = [broadcaster.register('A', connection_id) for connection_id in range(3)]
+            await asyncio.sleep(0)  # Let the producer subscribe to the hub
+            for seq in range(4):
+                tick = BookTick(seq, [], [], [], [])
+                tick.trace = {'received': 1.0, 'book': 1.001}
+                hub.publish('A', tick)
+                await asyncio.sleep(0)
+            await broadcaster.stop()
+            return broadcaster, queues
+
+        broadcaster, queues = asyncio.run(scenario())
+        self.assertEqual(calls, [0, 1, 2, 3])
+        for queue in queues:
+            self.assertEqual([queue.get_nowait(), queue.get_nowait()], [2, 3])
+        self.assertEqual(broadcaster.dropped_total, 6)
+        self.assertEqual(broadcaster.ticks['A'], 4)
+        summary = broadcaster.tracer.summary()
+        self.assertEqual(summary['book']['count'], 4)
+        self.assertEqual(summary['emit']['count'], 4)
+        self.assertEqual(summary['total']['count'], 4)
+
+    def test_encodes_once_per_protocol(self):
+        encoded = []
+
+        def encode(message):
+            encoded.append(message['seq'])
+            return str(message['seq'])
+
+        broadcaster = AnalysisBroadcaster(MarketDataHub(['A'], source=None), None, encode=encode)
+        broadcaster.clients['A'] = {i: asyncio.Queue() for i in range(4)}
+        broadcaster.protocols = {0: 'json', 1: 'json', 2: DELTA_PROTOCOL, 3: DELTA_PROTOCOL}
+        broadcaster.broadcast('A', {'seq': 7})
+        self.assertEqual(encoded, [7])
+        messages = [broadcaster.clients['A'][i].get_nowait() for i in range(4)]
+        self.assertEqual(messages[:2], ['7', '7'])
+        self.assertIs(messages[2], messages[3])  # One shared delta frame
+        self.assertEqual(messages[2].values.tolist(), [7.0])
+
+class TestConflatingSlot(unittest.TestCase):
+    def test_slow_consumer_only_sees_latest(self):
+        async def scenario():
+            slot = ConflatingSlot(max_staleness=None)
+            seen = []
+
+            async def produce():
+                for i in range(50):
+                    slot.put(i)
+                    await asyncio.sleep(0.001)
+                slot.close()
+
+            producer = asyncio.create_task(produce())
+            while (item := await slot.get()) is not None:
+                seen.append(item)
+                await asyncio.sleep(0.01)  # Analytics slower than the feed
+            await producer
+            return slot, seen
+
+        slot, seen = asyncio.run(scenario())
+        self.assertEqual(seen[-1], 49)
+        self.assertEqual(seen, sorted(seen))
+        self.assertLess(slot.processed, 20)
+        self.assertEqual(slot.received, 50)
+        self.assertEqual(slot.processed + slot.conflated, 50)
+
+    def test_stale_items_dropped_and_min_interval(self):
+        async def scenario():
+            slot = ConflatingSlot(max_staleness=0.1, min_interval=0.05)
+            slot.put('first')
+            first = await slot.get()
+            slot.put('second')
+            start = asyncio.get_running_loop().time()
+            second = await slot.get()
+            waited = asyncio.get_running_loop().time() - start
+
+            slot.put('old')
+            await asyncio.sleep(0.15)
+            slot.close()
+            return slot, first, second, waited, await slot.get()
+
+        slot, first, second, waited, last = asyncio.run(scenario())
+        self.assertEqual((first, second), ('first', 'second'))
+        self.assertGreaterEqual(waited, 0.04)
+        self.assertIsNone(last)
+        self.assertEqual(slot.stats(), {'received': 3, 'processed': 2, 'conflated': 0, 'stale': 1})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.linear_model import LinearRegression, LogisticRegression, SGDRegressor
+from sklearn.preprocessing import StandardScaler
+from models.inference import LinearKernel, LogisticKernel, TreeEnsembleKernel
+from models.regression import SlippageModel, MakerTakerModel
+
+class TestCompiledInferenceParity(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        self.features = rng.normal(loc=[100, 0.5, 0.5, 1e-4, 50, 50], scale=[20, 0.2, 0.1, 5e-5, 10, 10], size=(400, 6))
+        self.target = self.features[:, 0] * 0.01 + rng.normal(scale=0.1, size=400)
+        self.labels = (self.features[:, 2] > 0.5).astype(int)
+        self.scaler = StandardScaler().fit(self.features)
+        self.scaled = self.scaler.transform(self.features)
+
+    def test_linear_models(self):
+        for model in (LinearRegression(), SGDRegressor()):
+            model.fit(self.scaled, self.target)
+            kernel = LinearKernel(self.scaler, model)
+            np.testing.assert_allclose(kernel.predict(self.features), model.predict(self.scaled), rtol=1e-9, atol=1e-9)
+
+    def test_logistic_model(self):
+        model = LogisticRegression().fit(self.scaled, self.labels)
+        kernel = LogisticKernel(self.scaler, model)
+        np.testing.assert_allclose(kernel.predict_proba(self.features), model.predict_proba(self.scaled), atol=1e-12)
+
+    def test_gradient_boosting_quantile(self):
+        model = GradientBoostingRegressor(loss='quantile', alpha=0.95).fit(self.scaled, self.target)
+        kernel = TreeEnsembleKernel(self.scaler, model)
+        np.testing.assert_allclose(kernel.predict(self.features), model.predict(self.scaled), rtol=1e-9, atol=1e-12)
+        np.testing.assert_allclose(kernel.predict(self.features[:1]), model.predict(self.scaled[:1]), rtol=1e-9)
+
+    def test_models_use_compiled_path(self):
+        slippage = SlippageModel()
+        slippage.fit(self.features, self.target)
+        compiled = slippage.predict(self.features[:5])
+        slippage.use_compiled = False
+        np.testing.assert_allclose(compiled, slippage.predict(self.features[:5]), rtol=1e-9)
+
+        maker_taker = MakerTakerModel()
+        maker_taker.fit(self.features, self.labels)
+        compiled = maker_taker.predict_proba(self.features[:5])
+        maker_taker.use_compiled = False
+        np.testing.assert_allclose(compiled, maker_taker.predict_proba(self.features[:5]), atol=1e-12)
+
+if __name__ == "__main__":
+    unittest.main()
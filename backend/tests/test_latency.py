@@ -0,0 +1,107 @@
+import unittest
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pickle
+import time
+from models.latency import LatencyHistogram, LatencyTracer, LatencyAnalyzer, WindowedHistogram, DecayingHistogram
+from websocket.data_stream import OrderBookManager
+
+class TestLatencyHistogram(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        self.samples = rng.lognormal(mean=np.log(2e-4), sigma=1.0, size=20000)
+
+    def test_percentiles_within_bucket_error(self):
+        histogram = LatencyHistogram()
+        for value in self.samples:
+            histogram.record(value)
+        ordered = np.sort(self.samples)
+        for q in (50, 90, 99, 99.9):
+            expected = ordered[int(np.ceil(round(q * len(ordered) / 100, 6))) - 1]
+            self.assertAlmostEqual(histogram.percentile(q) / expected, 1.0, delta=1 / 128)
+        self.assertEqual(histogram.percentile(100), self.samples.max())
+        self.assertAlmostEqual(histogram.mean, self.samples.mean())
+
+    def test_merge_matches_single_histogram(self):
+        whole, first, second = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+        for i, value in enumerate(self.samples):
+            whole.record(value)
+            (first if i % 2 else second).record(value)
+        first.merge(second)
+        np.testing.assert_array_equal(first.counts, whole.counts)
+        self.assertEqual(first.percentiles([50, 99, 99.9]), whole.percentiles([50, 99, 99.9]))
+        self.assertAlmostEqual(first.mean, whole.mean)
+        with self.assertRaises(ValueError):
+            first.merge(LatencyHistogram(sub_buckets=16))
+
+    def test_tracer_records_stage_deltas(self):
+        tracer = LatencyTracer()
+        tracer.record({'exchange': 99.99, 'received': 100.0, 'decoded': 100.0001, 'book': 100.0003, 'emit': 100.002})
+        summary = tracer.summary()
+        self.assertAlmostEqual(summary['decoded']['p50'], 1e-4, delta=1e-6)
+        self.assertAlmostEqual(summary['book']['p50'], 2e-4, delta=2e-6)
+        self.assertAlmostEqual(summary['emit']['p50'], 1.7e-3, delta=2e-5)
+        self.assertAlmostEqual(summary['exchange_to_emit']['p99.9'], 0.012, delta=1e-4)
+        self.assertNotIn('features', summary)
+
+class TestLatencyAnalyzer(unittest.TestCase):
+    def test_per_operation_statistics_and_merge(self):
+        analyzer, worker = LatencyAnalyzer(), LatencyAnalyzer()
+        for i in range(1, 101):
+            analyzer.record('decode', i * 1e-5)
+            worker.record('book', i * 1e-4)
+        with analyzer.timer('decode'):
+            pass
+
+        stats = analyzer.get_statistics('decode')
+        self.assertEqual(stats['count'], 101)
+        self.assertAlmostEqual(stats['p50'], 5e-4, delta=5e-6)
+        self.assertEqual(analyzer.get_statistics('book'), {})
+
+        # Analyzers from other processes arrive pickled
+        analyzer.merge(pickle.loads(pickle.dumps(worker)))
+        self.assertAlmostEqual(analyzer.percentile(99, 'book', view='window'), 9.9e-3, delta=1e-4)
+        self.assertEqual(analyzer.get_statistics()['count'], 201)
+        with self.assertRaises(ValueError):
+            analyzer.histogram('book', view='hourly')
+
+    def test_window_and_decay_forget_old_samples(self):
+        window = WindowedHistogram(window=0.2, slices=2)
+        decaying = DecayingHistogram(half_life=0.02)
+        for _ in range(100):
+            window.record(1e-3)
+            decaying.record(1e-3)
+        time.sleep(0.25)
+        window.record(2e-3)
+        decaying.record(2e-3)
+        self.assertEqual(window.histogram().count, 1)
+        self.assertLess(decaying.count, 1.1)
+        self.assertAlmostEqual(decaying.percentile(50), 2e-3, delta=2e-5)
+
+    def test_views_are_derived_on_read(self):
+        analyzer = LatencyAnalyzer(window=0.2, slices=2, half_life=0.02)
+        for _ in range(100):
+            analyzer.record('book', 1e-3)
+        self.assertAlmostEqual(analyzer.mean('book', view='decay'), 1e-3)
+        self.assertAlmostEqual(analyzer.percentile(50, 'book', view='decay'), 1e-3, delta=1e-5)
+        self.assertEqual(analyzer.histogram('book', view='window').count, 100)
+        time.sleep(0.25)
+        analyzer.record('book', 2e-3)
+        self.assertEqual(analyzer.histogram('book', view='window').count, 1)
+        self.assertAlmostEqual(analyzer.mean('book', view='decay'), 2e-3, delta=5e-5)
+        self.assertAlmostEqual(analyzer.percentile(50, 'book', view='decay'), 2e-3, delta=2e-5)
+        self.assertEqual(analyzer.histogram('book').count, 101)
+
+    def test_orderbook_uses_bounded_analyzer(self):
+        manager = OrderBookManager()
+        for i in range(2000):
+            manager.update_orderbook({'bids': [[str(100 - i % 50), '1']], 'asks': [[str(101 + i % 50), '1']]})
+        stats = manager.latency.get_statistics('update_orderbook')
+        self.assertEqual(stats['count'], 2000)
+        self.assertGreater(manager.get_average_latency(), 0)
+
+if __name__ == "__main__":
+    unittest.main()
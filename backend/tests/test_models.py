@@ -1,14 +1,160 @@
 import unittest
+import numpy as np
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from models.market_impact import calculate_market_impact
+from models.market_impact import calculate_market_impact, AlmgrenChrissModel
+from models.cost_engine import CostEngine, estimate_costs
+from models.regression import SlippageModel, MakerTakerModel, OnlineTrainer
+from models.volatility import VolatilityEstimator
+from websocket.data_stream import OrderBookManager
 
 class TestMarketImpact(unittest.TestCase):
     def test_market_impact(self):
         result = calculate_market_impact(100, 0.02, 1000)
         self.assertGreater(result, 0)
 
+    def test_closed_form_matches_schedule(self):
+        model = AlmgrenChrissModel()
+        for sigma in [1e-6, 0.02, 0.3, 5.0]:
+            model.sigma = sigma
+            trades, _ = model.calculate_optimal_trade_schedule(250.0, 100.0)
+            expected = model.eta * np.sum(trades**2) * model.dt + model.gamma * 250.0
+            self.assertAlmostEqual(model.calculate_market_impact(250.0, sigma, 1000, 100.0) / expected, 1.0, places=9)
+
+    def test_batch_matches_scalar(self):
+        model = AlmgrenChrissModel()
+        volumes = np.array([10.0, 100.0, 1000.0])
+        volatilities = np.array([0.01, 0.02, 0.05])
+        batch = model.calculate_market_impact_batch(volumes[:, None], volatilities[None, :])
+        self.assertEqual(batch.shape, (3, 3))
+        for i, volume in enumerate(volumes):
+            for j, volatility in enumerate(volatilities):
+                self.assertAlmostEqual(batch[i, j], model.calculate_market_impact(volume, volatility, 1000, 1.0))
+
+    def test_schedule_cache_is_bounded(self):
+        model = AlmgrenChrissModel(cache_size=4)
+        for sigma in np.linspace(0.01, 0.1, 10):
+            model.sigma = sigma
+            model.calculate_optimal_trade_schedule(100.0, 1.0)
+        self.assertEqual(len(model._schedule_cache), 4)
+        first, _ = model.calculate_optimal_trade_schedule(100.0, 1.0)
+        self.assertIs(model.calculate_optimal_trade_schedule(100.0, 1.0)[0], first)
+
+class TestCostEngine(unittest.TestCase):
+    def test_matrix_matches_single_point_cost(self):
+        model = AlmgrenChrissModel()
+        engine = CostEngine([100, 1000], {'Tier1': 0.001, 'Tier2': 0.0008}, model)
+        curve = engine.evaluate(0.02, maker_proportion=0.25, slippage=[[1.0, 2.0], [3.0, 4.0]])
+        self.assertEqual(curve['net_cost'].shape, (2, 2, 2))
+
+        impact = model.calculate_market_impact(1000, 0.02, 1000, 1.0)
+        fees = (0.25 * 0.0008 * 0.8 + 0.75 * 0.0008) * 1000
+        self.assertAlmostEqual(curve['net_cost'][1, 1, 1], 4.0 + fees + impact)
+        self.assertAlmostEqual(curve['net_cost'][1, 1, 0], 3.0 + fees + impact)
+
+    def test_estimate_costs(self):
+        rng = np.random.default_rng(1)
+        features = rng.normal(size=(200, 6))
+        slippage_model = SlippageModel()
+        slippage_model.fit(features, features[:, 0])
+        maker_taker_model = MakerTakerModel()
+        maker_taker_model.fit(features, (features[:, 1] > 0).astype(int))
+
+        costs = estimate_costs(features[:1], 100.0, 50.0, 0.02, slippage_model, maker_taker_model,
+                               latency=0.001, amount=100)
+        proportion = maker_taker_model.predict_proba(features[:1])[0][1]
+        self.assertAlmostEqual(costs.fees, (proportion * 0.0008 + (1 - proportion) * 0.001) * 100)
+        self.assertAlmostEqual(costs.net_cost, costs.slippage + costs.fees + costs.market_impact)
+        self.assertIsInstance(costs.slippage, float)
+        self.assertEqual(set(costs.to_dict()), {'slippage', 'fees', 'market_impact', 'net_cost',
+                                                'maker_taker_ratio', 'latency'})
+        self.assertFalse(hasattr(costs, '__dict__'))
+
+class TestOnlineModels(unittest.TestCase):
+    def test_slippage_partial_fit_and_background_retrain(self):
+        rng = np.random.default_rng(0)
+        model = SlippageModel(buffer_size=300, retrain_interval=1500)
+        for _ in range(100):
+            features = rng.normal(size=(20, 6))
+            model.partial_fit(features, features @ np.arange(6.0) + 1.0)
+
+        self.assertLessEqual(len(model.samples), 300)
+        model._retrain_thread.join(timeout=30)
+        self.assertIsNotNone(model.quantile_bundle)
+
+        features = rng.normal(size=(50, 6))
+        linear_pred = model.online_model.predict(model.online_scaler.transform(features))
+        target = features @ np.arange(6.0) + 1.0
+        self.assertLess(np.mean((linear_pred - target) ** 2), 0.05 * np.var(target))
+        self.assertEqual(model.predict(features).shape, (50,))
+
+    def test_maker_taker_partial_fit(self):
+        rng = np.random.default_rng(1)
+        model = MakerTakerModel()
+        for _ in range(20):
+            features = rng.normal(size=(50, 6))
+            model.partial_fit(features, (features[:, 0] > 0).astype(int))
+        proba = model.predict_proba(np.array([[3.0, 0, 0, 0, 0, 0], [-3.0, 0, 0, 0, 0, 0]]))
+        self.assertGreater(proba[0, 1], 0.8)
+        self.assertLess(proba[1, 1], 0.2)
+
+    def test_trainer_uses_walk_the_book_target(self):
+        slippage, maker_taker = SlippageModel(), MakerTakerModel()
+        trainer = OnlineTrainer(slippage, maker_taker, trade_amount=203, batch_size=2)
+        orderbook = OrderBookManager()
+        orderbook.update_orderbook({'bids': [['99', '1']], 'asks': [['101', '1'], ['102', '2']]})
+        trainer.update(np.ones(6), orderbook)
+        orderbook.update_orderbook({'bids': [['99', '0'], ['98', '1']], 'asks': []})
+        trainer.update(np.ones(6), orderbook)
+
+        self.assertTrue(slippage.online)
+        self.assertEqual([target for _, target in slippage.samples], [3.0, 203 - 2 * 99.5])
+        self.assertEqual(trainer.maker_taker_batch[1], [1])
+
+class TestVolatilityEstimator(unittest.TestCase):
+    def test_matches_list_slicing(self):
+        rng = np.random.default_rng(5)
+        prices = 100 * np.cumprod(1 + rng.normal(scale=1e-3, size=3000))
+        estimator = VolatilityEstimator(capacity=1000, window=99)
+        self.assertEqual(estimator.volatility, estimator.default)
+        for i, price in enumerate(prices):
+            estimator.update(float(i), price, 1.0)
+            if i >= 99:
+                window = prices[i - 99:i + 1]
+                self.assertAlmostEqual(estimator.volatility, np.std(np.diff(window) / window[:-1]), places=12)
+
+        history = estimator.snapshot()
+        self.assertEqual(len(history['prices']), 1000)
+        np.testing.assert_array_equal(history['prices'], prices[-1000:])
+
+        restored = VolatilityEstimator(capacity=1000, window=99)
+        restored.restore(history)
+        self.assertAlmostEqual(restored.volatility, estimator.volatility, places=12)
+
+    def test_first_return_after_downtime_is_skipped(self):
+        history = {'timestamps': np.arange(200.0), 'prices': 100 + np.sin(np.arange(200.0)) / 10,
+                   'volumes': np.ones(200)}
+        restored = VolatilityEstimator(capacity=1000, window=99)
+        restored.restore(history)
+        volatility, ewma = restored.volatility, restored.ewma_volatility
+        restored.update(3600.0, 150.0, 1.0)  # An hour later, after a large move
+        self.assertEqual((restored.volatility, restored.ewma_volatility), (volatility, ewma))
+        restored.update(3601.0, 150.15, 1.0)
+        self.assertNotEqual(restored.volatility, volatility)  # Later returns count again
+
+        resumed = VolatilityEstimator(capacity=1000, window=99)
+        resumed.restore(history)
+        resumed.update(200.0, 100.2, 1.0)  # No gap: the return is kept
+        self.assertNotEqual(resumed.ewma_volatility, ewma)
+
+    def test_ewma(self):
+        estimator = VolatilityEstimator(ewma_lambda=0.5)
+        for price in (100.0, 101.0, 100.0):
+            estimator.update(0.0, price, 1.0)
+        r1, r2 = 0.01, -1 / 101
+        self.assertAlmostEqual(estimator.ewma_volatility, (0.5 * r1 * r1 + 0.5 * r2 * r2) ** 0.5)
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,193 @@
+import unittest
+import zlib
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from websocket.data_stream import OrderBookManager, OrderBookOutOfSync
+from websocket.price_levels import PriceLevelBook
+
+class TestPriceLevelBook(unittest.TestCase):
+    def test_bids_sorted_descending(self):
+        book = PriceLevelBook('bids')
+        for price, size in [(100.0, 1.0), (102.0, 2.0), (101.0, 3.0)]:
+            book.update(price, size)
+        self.assertEqual(book.best(), (102.0, 2.0))
+        self.assertEqual(book.top(2), [(102.0, 2.0), (101.0, 3.0)])
+
+    def test_asks_sorted_ascending_and_delete(self):
+        book = PriceLevelBook('asks')
+        for price, size in [(101.0, 1.0), (100.0, 2.0), (102.0, 3.0)]:
+            book.update(price, size)
+        book.update(100.0, 0)
+        book.update(105.0, 0)  # deleting an unknown level is a no-op
+        self.assertEqual(book.best(), (101.0, 1.0))
+        self.assertEqual(len(book), 2)
+        self.assertAlmostEqual(book.total_size(10), 4.0)
+
+    def test_columns_match_top(self):
+        for side in ('bids', 'asks'):
+            book = PriceLevelBook(side)
+            for price, size in [(100.0, 1.0), (102.0, 2.0), (101.0, 3.0), (99.0, 4.0)]:
+                book.update(price, size)
+            prices, sizes = book.columns(3)
+            self.assertEqual(list(zip(prices, sizes)), book.top(3))
+            self.assertEqual(book.columns(0), ([], []))
+
+    def test_running_aggregates_match_recomputation(self):
+        rng = np.random.default_rng(3)
+        for side in ('bids', 'asks'):
+            book = PriceLevelBook(side, depths=(1, 5, 10), resync=10 ** 9)
+            for _ in range(3000):
+                price = float(rng.integers(90, 130))
+                size = 0.0 if rng.random() < 0.35 else float(rng.integers(1, 50)) / 10
+                book.update(price, size)
+                for depth in (1, 5, 10):
+                    levels = book.top(depth)
+                    self.assertAlmostEqual(book.total_size(depth), sum(s for _, s in levels), places=9)
+                    self.assertAlmostEqual(book.total_notional(depth), sum(p * s for p, s in levels), places=6)
+            self.assertAlmostEqual(book.total_size(3), sum(s for _, s in book.top(3)))  # Untracked depth
+
+    def test_resync_and_clear(self):
+        book = PriceLevelBook('bids', depths=(2,), resync=3)
+        for price in (100.0, 101.0, 102.0):
+            book.update(price, 0.1)
+        self.assertEqual(book._updates, 0)
+        self.assertAlmostEqual(book.total_notional(2), 20.3)
+        self.assertAlmostEqual(book.vwap(2), 101.5)
+        book.clear()
+        self.assertEqual(book.total_size(2), 0.0)
+        self.assertIsNone(book.vwap(2))
+
+    def test_deletes_count_towards_resync(self):
+        book = PriceLevelBook('bids', depths=(2,), resync=3)
+        book.update(100.0, 0.1)
+        book.update(101.0, 0.1)
+        book.total_size(2)
+        book.update(101.0, 0.0)
+        self.assertEqual(book._updates, 0)
+        self.assertEqual(book._bands_stale_from, 0)
+        self.assertAlmostEqual(book.total_size(2), 0.1)
+
+class TestOrderBookManager(unittest.TestCase):
+    def test_update_orderbook_top_levels(self):
+        manager = OrderBookManager()
+        manager.update_orderbook({
+            'bids': [['99.5', '1'], ['99.0', '2'], ['99.8', '3']],
+            'asks': [['100.5', '1'], ['100.1', '2']],
+        })
+        result = manager.update_orderbook({'bids': [['99.8', '0']], 'asks': []})
+        self.assertEqual(result.bids[0], (99.5, 1.0))
+        self.assertEqual(result.asks[0], (100.1, 2.0))
+        self.assertAlmostEqual(result.mid_price, 99.8)
+        self.assertAlmostEqual(manager.calculate_market_depth('bids'), 3.0)
+
+    def test_update_orderbook_numeric_levels_only(self):
+        manager = OrderBookManager()
+        manager.update_orderbook({'bids': [['99.5', '1.00']], 'asks': [['100.5', '1.00']]})
+        result = manager.update_orderbook({
+            'bid_px': np.array([99.5, 99.0]), 'bid_sz': np.array([2.0, 1.0]),
+            'ask_px': np.array([100.5]), 'ask_sz': np.array([0.0])
+        })
+        self.assertEqual(result.bids, [(99.5, 2.0), (99.0, 1.0)])
+        self.assertEqual(result.asks, [])
+        # No stale exchange string is kept for a level updated without one
+        self.assertEqual(manager.bids.raw_levels(1), [('99.5', '2.0')])
+
+    def test_book_aggregates(self):
+        manager = OrderBookManager()
+        manager.update_orderbook({
+            'bids': [['99', '3'], ['98', '1']],
+            'asks': [['101', '1'], ['102', '3']],
+        })
+        self.assertAlmostEqual(manager.imbalance(), 0.0)
+        self.assertAlmostEqual(manager.imbalance(depth=1), 0.5)
+        self.assertAlmostEqual(manager.microprice(), (99 * 1 + 101 * 3) / 4)
+        self.assertAlmostEqual(manager.weighted_mid(), ((99 * 3 + 98) / 4 + (101 + 102 * 3) / 4) / 2)
+        tick = manager.annotate_tick(manager.update_orderbook({'bids': [], 'asks': []}))
+        self.assertAlmostEqual(tick.bid_notional, 395.0)
+        self.assertAlmostEqual(tick.microprice, manager.microprice())
+
+    def test_every_annotated_tick_feeds_volatility(self):
+        manager = OrderBookManager()
+        manager.update_orderbook({'bids': [['99', '1']], 'asks': [['101', '1']]})
+        for i in range(5):
+            tick = manager.annotate_tick(manager.update_orderbook({'bids': [[str(99 + i), '1']], 'asks': []}))
+        self.assertEqual(len(manager.volatility.history), 5)
+        self.assertEqual(tick.volatility, manager.volatility.volatility)
+
+class TestWalkTheBook(unittest.TestCase):
+    def brute_force_fill(self, levels, quantity):
+        filled, notional = 0.0, 0.0
+        for price, size in levels:
+            take = min(size, quantity - filled)
+            filled += take
+            notional += take * price
+            if filled >= quantity:
+                break
+        return filled, notional
+
+    def test_fill_matches_brute_force_after_random_updates(self):
+        rng = np.random.default_rng(7)
+        book = PriceLevelBook('asks')
+        for _ in range(500):
+            price = float(100 + rng.integers(0, 50))
+            book.update(price, float(rng.choice([0.0, rng.uniform(0.1, 3.0)])))
+            if rng.random() < 0.2:
+                quantity = rng.uniform(0, 20)
+                expected = self.brute_force_fill(book.top(None), quantity)
+                filled, notional = book.fill(quantity)
+                self.assertAlmostEqual(float(filled), expected[0])
+                self.assertAlmostEqual(float(notional), expected[1])
+
+    def test_estimate_execution_vwap_and_slippage(self):
+        manager = OrderBookManager()
+        manager.update_orderbook({
+            'bids': [['99', '1'], ['98', '2']],
+            'asks': [['101', '1'], ['102', '2']],
+        })
+        buy = manager.estimate_execution('buy', 2, by='quantity')
+        self.assertAlmostEqual(float(buy['vwap']), 101.5)
+        self.assertAlmostEqual(float(buy['slippage']), 203 - 200)
+        sell = manager.estimate_execution('sell', 10, by='quantity')
+        self.assertFalse(sell['complete'])
+        self.assertAlmostEqual(float(sell['filled_quantity']), 3.0)
+        curve = manager.slippage_curve([101, 203])
+        self.assertEqual(curve.shape, (2, 2))
+        self.assertAlmostEqual(curve[1, 0], 3.0)
+
+class TestSnapshotDeltaHandling(unittest.TestCase):
+    def setUp(self):
+        self.manager = OrderBookManager()
+        self.snapshot = {
+            'bids': [['99.5', '1.00', '0', '1'], ['99.4', '2.50', '0', '1']],
+            'asks': [['99.6', '3.00', '0', '2']],
+            'seqId': 10,
+            'prevSeqId': -1,
+        }
+
+    def signed_crc(self, text):
+        checksum = zlib.crc32(text.encode())
+        return checksum - (1 << 32) if checksum >= (1 << 31) else checksum
+
+    def test_checksum_uses_raw_strings_interleaved(self):
+        self.snapshot['checksum'] = self.signed_crc('99.5:1.00:99.6:3.00:99.4:2.50')
+        self.manager.apply_message('snapshot', self.snapshot)
+        self.assertEqual(self.manager.seq_id, 10)
+
+    def test_checksum_mismatch_raises(self):
+        self.snapshot['checksum'] = 12345
+        with self.assertRaises(OrderBookOutOfSync):
+            self.manager.apply_message('snapshot', self.snapshot)
+
+    def test_sequence_gap_raises_and_updates_wait_for_snapshot(self):
+        self.assertIsNone(self.manager.apply_message('update', {'bids': [], 'asks': [], 'seqId': 1, 'prevSeqId': 0}))
+        self.manager.apply_message('snapshot', self.snapshot)
+        self.manager.apply_message('update', {'bids': [['99.5', '0', '0', '0']], 'asks': [], 'seqId': 11, 'prevSeqId': 10})
+        self.assertEqual(self.manager.bids.best(), (99.4, 2.5))
+        with self.assertRaises(OrderBookOutOfSync):
+            self.manager.apply_message('update', {'bids': [], 'asks': [], 'seqId': 14, 'prevSeqId': 13})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import tempfile
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.market_impact import AlmgrenChrissModel
+from models.regression import SlippageModel, MakerTakerModel
+from models.persistence import save_models, load_models, instrument_state_dir
+
+class TestModelPersistence(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(5)
+        self.features = rng.normal(size=(600, 6))
+        self.target = self.features @ np.arange(6.0)
+        self.labels = (self.features[:, 0] > 0).astype(int)
+        self.path = os.path.join(tempfile.mkdtemp(), "model_state")
+
+    def roundtrip(self, slippage, maker_taker, impact, history=None):
+        self.assertTrue(save_models(self.path, slippage, maker_taker, impact, history))
+        restored = SlippageModel(), MakerTakerModel(), AlmgrenChrissModel()
+        loaded_history = load_models(self.path, *restored)
+        self.assertIsNotNone(loaded_history)
+        return restored, loaded_history
+
+    def test_batch_models_roundtrip(self):
+        slippage, maker_taker = SlippageModel(), MakerTakerModel()
+        slippage.fit(self.features, self.target)
+        maker_taker.fit(self.features, self.labels)
+        impact = AlmgrenChrissModel(eta=1.5, gamma=0.2, N=50)
+
+        (slippage2, maker_taker2, impact2), _ = self.roundtrip(slippage, maker_taker, impact)
+        rows = self.features[:10]
+        np.testing.assert_allclose(slippage2.predict(rows), slippage.predict(rows))
+        np.testing.assert_allclose(maker_taker2.predict_proba(rows), maker_taker.predict_proba(rows))
+
+        # Only the kernels are restored, so they serve predictions even when not preferred
+        slippage.use_compiled = slippage2.use_compiled = False
+        maker_taker.use_compiled = maker_taker2.use_compiled = False
+        np.testing.assert_allclose(slippage2.predict(rows), slippage.predict(rows))
+        np.testing.assert_allclose(maker_taker2.predict_proba(rows), maker_taker.predict_proba(rows))
+        self.assertEqual(impact2.calculate_market_impact(100, 0.02, 1000, 1.0), impact.calculate_market_impact(100, 0.02, 1000, 1.0))
+
+    def test_online_models_resume_training_and_history(self):
+        slippage, maker_taker = SlippageModel(), MakerTakerModel()
+        for start in range(0, 600, 50):
+            slippage.partial_fit(self.features[start:start + 50], self.target[start:start + 50])
+            maker_taker.partial_fit(self.features[start:start + 50], self.labels[start:start + 50])
+        history = {'timestamps': np.arange(5.0), 'prices': np.full(5, 100.0), 'volumes': np.ones(5)}
+
+        (slippage2, maker_taker2, _), loaded_history = self.roundtrip(slippage, maker_taker, AlmgrenChrissModel(), history)
+        rows = self.features[:10]
+        np.testing.assert_allclose(slippage2.predict(rows), slippage.predict(rows))
+        np.testing.assert_allclose(maker_taker2.predict_proba(rows), maker_taker.predict_proba(rows))
+        self.assertEqual(len(slippage2.samples), 600)
+        slippage.use_compiled = slippage2.use_compiled = False
+        np.testing.assert_allclose(slippage2.predict(rows), slippage.predict(rows))
+        np.testing.assert_array_equal(loaded_history['prices'], history['prices'])
+
+        self.assertEqual(slippage2.online_scaler.n_samples_seen_, 600)
+        slippage2.partial_fit(self.features[:50], self.target[:50])
+        self.assertEqual(slippage2.online_scaler.n_samples_seen_, 650)
+
+    def test_instrument_models_skip_missing_components(self):
+        slippage = SlippageModel()
+        slippage.fit(self.features, self.target)
+        path = instrument_state_dir(self.path, 'SOL-USDT-SWAP')
+        self.assertEqual(os.path.dirname(path), os.path.dirname(self.path))
+        self.assertTrue(save_models(path, slippage, MakerTakerModel(), None))
+
+        restored = SlippageModel()
+        self.assertIsNotNone(load_models(path, restored, None, None))
+        np.testing.assert_allclose(restored.predict(self.features[:10]), slippage.predict(self.features[:10]))
+
+if __name__ == "__main__":
+    unittest.main()
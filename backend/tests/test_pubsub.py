@@ -0,0 +1,76 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from websocket.hub import MarketDataHub
+from websocket.pubsub import MarketDataPublisher, MarketDataSubscriber, private_socket_path, publish_analysis
+from websocket.tick import BookTick
+
+class TestPubSub(unittest.TestCase):
+    def setUp(self):
+        self.path = private_socket_path()
+        self.addCleanup(shutil.rmtree, os.path.dirname(self.path), True)
+
+    def test_socket_directory_must_be_private(self):
+        self.assertEqual(os.stat(os.path.dirname(self.path)).st_mode & 0o777, 0o700)
+        shared = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, shared, True)
+        os.chmod(shared, 0o777)
+        with self.assertRaises(PermissionError):
+            asyncio.run(MarketDataPublisher(os.path.join(shared, 'pubsub.sock')).start())
+
+    def test_subscribers_receive_their_instruments(self):
+        async def scenario():
+            publisher = MarketDataPublisher(self.path)
+            await publisher.start()
+            subscriber = MarketDataSubscriber(self.path, reconnect_delay=0.01)
+            stream = subscriber.source(['A'])
+            first = asyncio.ensure_future(stream.__anext__())
+            while not publisher.subscribers:
+                await asyncio.sleep(0.01)
+            publisher.publish('B', {'seq': 0})
+            publisher.publish('A', {'seq': 1}, {'received': 1.0})
+            inst_id, tick = await asyncio.wait_for(first, 5)
+            await stream.aclose()
+            await publisher.stop()
+            return publisher, inst_id, tick
+
+        publisher, inst_id, tick = asyncio.run(scenario())
+        self.assertEqual((inst_id, tick.message, tick.trace), ('A', {'seq': 1}, {'received': 1.0}))
+        self.assertEqual(publisher.stats(), {'subscribers': 0, 'published': 2, 'sent': 1, 'dropped': 0})
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_producer_analyses_once_and_drops_for_slow_subscribers(self):
+        async def scenario():
+            publisher = MarketDataPublisher(self.path, buffer_limit=-1)  # Every subscriber counts as behind
+            await publisher.start()
+            hub = MarketDataHub(['A'], source=None)
+            calls = []
+
+            def analyze(data):
+                calls.append(data.timestamp)
+                return {'seq': data.timestamp}
+
+            producer = asyncio.ensure_future(publish_analysis(hub, analyze, publisher))
+            reader, writer = await asyncio.open_unix_connection(self.path)
+            writer.write(b'["A"]\n')
+            while not publisher.subscribers:
+                await asyncio.sleep(0.01)
+            for seq in range(3):
+                hub.publish('A', BookTick(seq, [], [], [], []))
+                await asyncio.sleep(0)
+            producer.cancel()
+            writer.close()
+            await publisher.stop()
+            return calls, publisher.stats()
+
+        calls, stats = asyncio.run(scenario())
+        self.assertEqual(calls, [0, 1, 2])
+        self.assertEqual((stats['published'], stats['sent'], stats['dropped']), (3, 0, 3))
+
+if __name__ == '__main__':
+    unittest.main()
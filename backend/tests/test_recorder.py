@@ -0,0 +1,75 @@
+import unittest
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from websocket.recorder import FeedRecorder, FeedReader, replay_orderbooks, replay_messages
+
+def book_message(inst_id, action, seq_id, bid, ask):
+    return json.dumps({
+        'arg': {'channel': 'books', 'instId': inst_id},
+        'action': action,
+        'data': [{'bids': [[bid, '1.0', '0', '1']], 'asks': [[ask, '2.0', '0', '1']],
+                  'seqId': seq_id, 'prevSeqId': -1 if action == 'snapshot' else seq_id - 1}]
+    })
+
+class TestFeedRecorder(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'feed.okx')
+        self.messages = [json.dumps({'event': 'subscribe'})]
+        self.messages.append(book_message('BTC-USDT', 'snapshot', 1, '100.0', '100.5'))
+        for seq_id in range(2, 50):
+            self.messages.append(book_message('BTC-USDT', 'update', seq_id, f"{100 + seq_id * 0.1:.1f}", '200.0'))
+        with FeedRecorder(self.path, chunk_messages=8) as recorder:
+            for i, message in enumerate(self.messages):
+                recorder.record(message, timestamp=1000.0 + i * 0.01)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip_and_time_index(self):
+        reader = FeedReader(self.path)
+        self.assertEqual(len(reader.index), 7)
+        self.assertEqual(reader.message_count, len(self.messages))
+        self.assertEqual([m.decode() for _, m in reader.read()], self.messages)
+
+        window = list(reader.read(start=1000.195, end=1000.305))
+        self.assertEqual([round(ts, 2) for ts, _ in window], [round(1000.2 + i * 0.01, 2) for i in range(11)])
+
+    def test_index_rebuilt_from_chunk_headers(self):
+        os.remove(self.path + '.idx')
+        self.assertEqual(FeedReader(self.path).message_count, len(self.messages))
+
+    def test_appending_keeps_earlier_chunks(self):
+        with FeedRecorder(self.path) as recorder:
+            recorder.record('extra', timestamp=2000.0)
+        reader = FeedReader(self.path)
+        self.assertEqual(reader.time_range, (1000.0, 2000.0))
+        self.assertEqual(list(reader.read(start=1500))[0][1], b'extra')
+
+    def test_replay_rebuilds_book(self):
+        async def replay():
+            return [data async for _, data in replay_orderbooks(self.path, ['BTC-USDT'])]
+        updates = asyncio.run(replay())
+        self.assertEqual(len(updates), 49)
+        self.assertEqual(updates[-1].best_bid, 104.9)
+        self.assertEqual(updates[-1].inst_id, 'BTC-USDT')
+
+    def test_speed_scales_replay_time(self):
+        async def replay(speed):
+            start_time = time.perf_counter()
+            async for _ in replay_messages(self.path, speed=speed):
+                pass
+            return time.perf_counter() - start_time
+        # The recording spans 0.49s of feed time
+        self.assertLess(asyncio.run(replay(None)), 0.2)
+        self.assertGreater(asyncio.run(replay(2.0)), 0.2)
+
+if __name__ == "__main__":
+    unittest.main()
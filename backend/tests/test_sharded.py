@@ -0,0 +1,152 @@
+import json
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.shm_ring import SharedRingBuffer
+from websocket.sharded import RESET, ShardedPipeline
+
+def top_of_book(orderbooks):
+    """
+    Worker analyzer used by the end-to-end test; on close it leaves a file
+    named after its shard in SHARDED_TEST_CLOSE_DIR
+    """
+    def analyze(tick):
+        return {'instrument': tick.inst_id, 'best_bid': tick.best_bid, 'books': sorted(orderbooks)}
+    closed = os.path.join(os.environ['SHARDED_TEST_CLOSE_DIR'], '-'.join(sorted(orderbooks)))
+    analyze.close = lambda: open(closed, 'w').close()
+    return analyze
+
+def push(inst_id, bids, asks, action=None):
+    message = {'arg': {'channel': 'books', 'instId': inst_id}, 'data': [{'bids': bids, 'asks': asks}]}
+    if action:
+        message['action'] = action
+    return json.dumps(message, separators=(',', ':'))
+
+class TestSharedRingBuffer(unittest.TestCase):
+    def setUp(self):
+        self.producer = SharedRingBuffer(capacity=64)
+        self.consumer = SharedRingBuffer(self.producer.name, create=False)
+
+    def tearDown(self):
+        self.consumer.close()
+        self.producer.close()
+
+    def test_records_wrap_around(self):
+        self.assertEqual(self.consumer.capacity, 64)
+        for i in range(100):
+            record = bytes([i]) * (i % 23)
+            self.assertTrue(self.producer.put(record))
+            self.assertEqual(self.consumer.get(), record)
+        self.assertIsNone(self.consumer.get())
+        self.assertEqual(self.consumer.stats()['read'], 100)
+
+    def test_full_ring_drops(self):
+        accepted = [self.producer.put(b'x' * 10) for _ in range(6)]
+        self.assertEqual(accepted, [True, True, True, True, False, False])  # 16 bytes per record
+        stats = self.consumer.stats()
+        self.assertEqual((stats['dropped'], stats['fill'], stats['high_water']), (2, 1.0, 1.0))
+        self.consumer.get()
+        self.assertTrue(self.producer.put(b'y'))
+
+    def test_attaching_does_not_register_with_resource_tracker(self):
+        with mock.patch('multiprocessing.resource_tracker.register') as register:
+            SharedRingBuffer(self.producer.name, create=False).close()
+        register.assert_not_called()
+
+class TestShardedPipeline(unittest.TestCase):
+    def test_refuses_cpus_without_store_ordering(self):
+        with mock.patch('platform.machine', return_value='arm64'):
+            with self.assertRaises(RuntimeError):
+                ShardedPipeline(['A'], 1)
+
+    def test_full_shard_resyncs_after_draining(self):
+        pipeline = ShardedPipeline(['A', 'B'], workers=2)
+        pipeline.inboxes = [SharedRingBuffer(capacity=256) for _ in range(2)]
+        worker_side = SharedRingBuffer(pipeline.inboxes[0].name, create=False)
+        try:
+            delta = push('A', [['99', '1']], [])
+            while pipeline.submit('A', delta):
+                pass
+            self.assertEqual(pipeline.stalled, {'A'})
+            self.assertTrue(pipeline.submit('B', push('B', [['99', '1']], [])))  # Other shards unaffected
+            self.assertFalse(pipeline.submit('A', delta))
+
+            while worker_side.get() is not None:
+                pass
+            self.assertFalse(pipeline.submit('A', delta))  # Book reset instead of the delta
+            self.assertEqual(pipeline.resync, {'A'})
+            self.assertEqual(pipeline.stalled, set())
+            self.assertEqual(worker_side.get(), RESET + b'A')
+
+            self.assertFalse(pipeline.submit('A', delta))  # Waiting for the snapshot
+            self.assertTrue(pipeline.submit('A', push('A', [['99', '1']], [['100', '1']], 'snapshot')))
+            self.assertTrue(pipeline.submit('A', delta))
+            self.assertEqual(pipeline.metrics()['resyncs'], 1)
+        finally:
+            worker_side.close()
+            for ring in pipeline.inboxes:
+                ring.close()
+
+    def test_workers_maintain_books_and_analyse(self):
+        pipeline = ShardedPipeline(['A', 'B', 'C'], workers=2, analyzer='test_sharded:top_of_book',
+                                   ring_size=1 << 16, poll_interval=0.001)
+        self.assertEqual(pipeline.shards, [['A', 'C'], ['B']])
+        close_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, close_dir)
+        with mock.patch.dict(os.environ, SHARDED_TEST_CLOSE_DIR=close_dir):
+            pipeline.start()
+        try:
+            for inst_id in ('A', 'B', 'C'):
+                pipeline.submit(inst_id, push(inst_id, [['99', '1']], [['100', '1']], 'snapshot'))
+            pipeline.submit('A', push('A', [['99.5', '2']], [], 'update'))
+
+            results, latest = [], {}
+            deadline = time.monotonic() + 30
+            while (len(latest) < 3 or latest['A'][0] != 99.5) and time.monotonic() < deadline:
+                results.extend(pipeline.poll())
+                latest = {inst_id: (tick.message['best_bid'], tick.message['books']) for inst_id, tick in results}
+                time.sleep(0.01)
+        finally:
+            pipeline.stop()
+
+        # The snapshot of A may be conflated into its update
+        self.assertEqual(latest, {'A': (99.5, ['A', 'C']), 'B': (99.0, ['B']), 'C': (99.0, ['A', 'C'])})
+        self.assertTrue(all(tick.trace['dequeued'] >= tick.trace['received'] for _, tick in results))
+        self.assertEqual(sorted(os.listdir(close_dir)), ['A-C', 'B'])  # Each worker closed its analyzer
+
+    def test_burst_is_conflated_without_resync(self):
+        updates = 500
+        pipeline = ShardedPipeline(['A'], workers=1, analyzer='test_sharded:top_of_book',
+                                   ring_size=1 << 16, poll_interval=0.001, batch_size=64)
+        close_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, close_dir)
+        with mock.patch.dict(os.environ, SHARDED_TEST_CLOSE_DIR=close_dir):
+            pipeline.start()
+        try:
+            # Queued while the worker is still starting up, so it meets the whole burst at once
+            self.assertTrue(pipeline.submit('A', push('A', [['99', '1']], [['200', '1']], 'snapshot')))
+            for i in range(updates):
+                self.assertTrue(pipeline.submit('A', push('A', [[f"{100 + i * 0.01:.2f}", '1']], [], 'update')))
+
+            results = []
+            deadline = time.monotonic() + 30
+            while (not results or results[-1][1].message['best_bid'] != 104.99) and time.monotonic() < deadline:
+                results.extend(pipeline.poll())
+                time.sleep(0.01)
+            metrics = pipeline.metrics()
+        finally:
+            pipeline.stop()
+
+        self.assertEqual(results[-1][1].message['best_bid'], 104.99)  # Every update was applied
+        self.assertLess(len(results), updates)
+        self.assertEqual((metrics['stalled'], metrics['resyncs'], metrics['discarded']), ([], 0, 0))
+        self.assertEqual(metrics['shards'][0]['input']['dropped'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
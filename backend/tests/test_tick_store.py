@@ -0,0 +1,83 @@
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage.tick_store import TickStore, import_recording
+from websocket.data_stream import OrderBookManager
+from websocket.recorder import FeedRecorder
+from tests.test_recorder import book_message
+
+DAY = 86400.0
+START = 1700006400.0  # 2023-11-15 00:00 UTC
+
+class TestTickStore(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.orderbook = OrderBookManager()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def append_ticks(self, store, timestamps):
+        for i, timestamp in enumerate(timestamps):
+            self.orderbook.bids.update(100.0 - i * 0.01, 1.0 + i)
+            self.orderbook.asks.update(101.0 + i * 0.01, 2.0)
+            store.append('BTC-USDT', self.orderbook, timestamp)
+
+    def test_partitions_and_time_range_slicing(self):
+        timestamps = START + DAY - 50 + np.arange(100)  # Crosses midnight
+        with TickStore(self.root, depth=5, flush_rows=16) as store:
+            self.append_ticks(store, timestamps)
+
+        reader = TickStore(self.root, depth=5)
+        self.assertEqual(reader.days('BTC-USDT'), ['2023-11-15', '2023-11-16'])
+        columns = reader.load('BTC-USDT', start=timestamps[40], end=timestamps[59])
+        self.assertEqual(len(columns['timestamp']), 20)
+        self.assertEqual(columns['bid_px'].shape, (20, 5))
+        self.assertEqual(columns['bid_px'][0, 0], 100.0)  # Best bid stays first
+        self.assertEqual(columns['bid_sz'][-1, 0], 1.0)
+        self.assertEqual(columns['ask_px'][-1, 0], 101.0)
+
+        day, block = next(reader.read('BTC-USDT', start=timestamps[45]))
+        self.assertIsInstance(block['bid_px'].base, np.memmap)  # Zero-copy view
+        self.assertEqual(len(block['timestamp']), 5)
+
+    def test_missing_levels_are_nan(self):
+        with TickStore(self.root, depth=5) as store:
+            self.append_ticks(store, [START, START + 1])
+        columns = TickStore(self.root, depth=5).load('BTC-USDT')
+        self.assertTrue(np.isnan(columns['ask_px'][0, 1:]).all())
+        self.assertEqual(columns['ask_sz'][0, 1:].sum(), 0)
+
+    def test_readers_only_see_committed_rows(self):
+        store = TickStore(self.root, depth=5, flush_rows=10)
+        self.append_ticks(store, START + np.arange(15))
+        reader = TickStore(self.root, depth=5)
+        self.assertEqual(len(reader.load('BTC-USDT')['timestamp']), 10)
+        store.flush()
+        self.assertEqual(len(reader.load('BTC-USDT')['timestamp']), 15)
+
+        # Reopening appends after the committed rows
+        store.close()
+        with TickStore(self.root, depth=5) as store:
+            self.append_ticks(store, START + 20 + np.arange(5))
+        self.assertEqual(len(reader.load('BTC-USDT')['timestamp']), 20)
+
+    def test_import_recording(self):
+        feed_path = os.path.join(self.root, 'feed.okx')
+        with FeedRecorder(feed_path) as recorder:
+            recorder.record(book_message('ETH-USDT', 'snapshot', 1, '100.0', '100.5'), START)
+            recorder.record(book_message('ETH-USDT', 'update', 2, '100.2', '100.4'), START + 1)
+        store = TickStore(os.path.join(self.root, 'store'), depth=3)
+        self.assertEqual(import_recording(feed_path, store), 2)
+        columns = store.load('ETH-USDT')
+        np.testing.assert_array_equal(columns['timestamp'], [START * 1e9, (START + 1) * 1e9])
+        self.assertEqual(columns['bid_px'][1, 0], 100.2)
+        self.assertEqual(columns['seq_id'][1], 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import threading
+import time
+from PyQt5.QtCore import QObject, QTimer, Qt, pyqtSignal
+from config.settings import UI_MAX_FPS
+from utils.logger import logger
+
+class UIUpdateBridge(QObject):
+    """
+    Thread-safe, frame-rate capped path from the simulation thread to the widgets.
+    Worker threads only store the latest values and emit a queued signal; the
+    GUI thread renders at most `max_fps` times per second, so bursts of ticks
+    are coalesced and only the newest metrics are drawn.
+    """
+    render_requested = pyqtSignal()
+    simulation_stopped = pyqtSignal()
+
+    def __init__(self, ui, max_fps=UI_MAX_FPS):
+        """
+        :param ui: TradeSimulatorUI; the bridge must be created in the GUI thread
+        :param max_fps: maximum renders per second
+        """
+        super().__init__()
+        self.ui = ui
+        self.interval = 1.0 / max_fps
+        self._lock = threading.Lock()
+        self._latest = {}
+        self._scheduled = False
+        self._last_render = 0.0
+        self.submitted = 0
+        self.rendered = 0
+
+        # Queued connections run the slots in the GUI thread whatever thread emits
+        self.render_requested.connect(self._schedule_render, Qt.QueuedConnection)
+        self.simulation_stopped.connect(ui.reset_simulation_controls, Qt.QueuedConnection)
+
+    def update_costs(self, costs):
+        """
+        :param costs: CostResult; formatted for display only when rendered
+        """
+        self._publish('costs', costs)
+
+    def update_latency(self, summary):
+        self._publish('latency', (summary,))
+
+    def stop(self):
+        """
+        Called from the simulation thread when the simulation fails. The running
+        flag is cleared right away, so run_async_app cannot restart the
+        simulation before the GUI thread resets the controls.
+        """
+        self.ui.simulation_running = False
+        self.simulation_stopped.emit()
+
+    def _publish(self, kind, args):
+        """
+        Overwrite the pending update of this kind; safe to call from any thread
+        """
+        with self._lock:
+            self._latest[kind] = args
+            self.submitted += 1
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self.render_requested.emit()
+
+    def _schedule_render(self):
+        delay = max(0.0, self._last_render + self.interval - time.monotonic())
+        QTimer.singleShot(int(delay * 1000), self._render)
+
+    def _render(self):
+        with self._lock:
+            latest, self._latest = self._latest, {}
+            self._scheduled = False
+        self._last_render = time.monotonic()
+        try:
+            costs = latest.get('costs')
+            if costs is not None:
+                self.ui.update_output(
+                    f"{costs.slippage:.5f}",
+                    f"{costs.fees:.5f}",
+                    f"{costs.market_impact:.5f}",
+                    f"{costs.net_cost:.5f}",
+                    f"{costs.maker_taker_ratio:.2f}",
+                    f"{costs.latency:.5f}"
+                )
+                if costs.cost_curve is not None:
+                    self.ui.update_cost_curve(costs.cost_curve)
+            if 'latency' in latest:
+                self.ui.update_latency(*latest['latency'])
+            self.rendered += 1
+        except Exception as e:
+            logger.error(f"Error rendering UI update: {e}")
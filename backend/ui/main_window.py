@@ -1,6 +1,9 @@
 from PyQt5.QtWidgets import (
-    QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QFrame
+    QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QFrame,
+    QTableWidget, QTableWidgetItem
 )
+from ui.bridge import UIUpdateBridge
+from utils.logger import logger
 import sys
 
 class TradeSimulatorUI(QWidget):
@@ -54,6 +57,14 @@ class TradeSimulatorUI(QWidget):
         right_panel.addWidget(self.proportion_label)
         right_panel.addWidget(self.latency_label)
 
+        right_panel.addWidget(QLabel("Net Cost Curve"))
+        self.cost_curve_table = QTableWidget()
+        right_panel.addWidget(self.cost_curve_table)
+
+        right_panel.addWidget(QLabel("Latency by Stage (ms)"))
+        self.latency_table = QTableWidget()
+        right_panel.addWidget(self.latency_table)
+
         main_layout.addLayout(left_panel)
         line = QFrame()
         line.setFrameShape(QFrame.VLine)
@@ -62,6 +73,9 @@ class TradeSimulatorUI(QWidget):
 
         self.setLayout(main_layout)
 
+        # Worker threads update the widgets only through the bridge
+        self.bridge = UIUpdateBridge(self)
+
     def start_simulation(self):
         if not self.simulation_running:
             self.start_button.setText("Stop Simulation")
@@ -74,11 +88,14 @@ class TradeSimulatorUI(QWidget):
             self.latency_label.setText("Internal Latency: Connecting...")
             # Simulator will be created and started in main.py
         else:
-            self.start_button.setText("Start Simulation")
-            self.simulation_running = False
+            self.reset_simulation_controls()
             if self.simulator:
                 self.simulator.running = False
 
+    def reset_simulation_controls(self):
+        self.simulation_running = False
+        self.start_button.setText("Start Simulation")
+
     def update_output(self, slippage, fees, impact, net_cost, proportion, latency):
         try:
             self.slippage_label.setText(f"Expected Slippage: {slippage}")
@@ -87,11 +104,50 @@ class TradeSimulatorUI(QWidget):
             self.net_cost_label.setText(f"Net Cost: {net_cost}")
             self.proportion_label.setText(f"Maker/Taker Proportion: {proportion}")
             self.latency_label.setText(f"Internal Latency: {latency}")
-            QApplication.processEvents()
         except Exception as e:
             logger.error(f"Error updating UI: {e}")
-            self.simulation_running = False
-            self.start_button.setText("Start Simulation")
+            self.reset_simulation_controls()
+
+    def update_cost_curve(self, curve):
+        """
+        Show net cost per order size (rows) for each fee tier and side (columns)
+        """
+        try:
+            sizes, tiers, sides = curve['sizes'], curve['tiers'], curve['sides']
+            net_cost = curve['net_cost']
+            if self.cost_curve_table.rowCount() != len(sizes):
+                self.cost_curve_table.setRowCount(len(sizes))
+                self.cost_curve_table.setColumnCount(len(tiers) * len(sides))
+                self.cost_curve_table.setHorizontalHeaderLabels(
+                    [f"{tier} {side.title()}" for tier in tiers for side in sides])
+                self.cost_curve_table.setVerticalHeaderLabels([f"{size:g}" for size in sizes])
+
+            for row in range(len(sizes)):
+                for i in range(len(tiers)):
+                    for j in range(len(sides)):
+                        self.cost_curve_table.setItem(
+                            row, i * len(sides) + j, QTableWidgetItem(f"{net_cost[row, i, j]:.5f}"))
+        except Exception as e:
+            logger.error(f"Error updating cost curve: {e}")
+
+    def update_latency(self, summary):
+        """
+        Show p50/p99/p99.9 per pipeline stage from LatencyTracer.summary()
+        """
+        try:
+            columns = ['p50', 'p99', 'p99.9']
+            stages = list(summary)
+            if self.latency_table.rowCount() != len(stages):
+                self.latency_table.setRowCount(len(stages))
+                self.latency_table.setColumnCount(len(columns))
+                self.latency_table.setHorizontalHeaderLabels(columns)
+            self.latency_table.setVerticalHeaderLabels(stages)
+
+            for row, stage in enumerate(stages):
+                for column, key in enumerate(columns):
+                    self.latency_table.setItem(row, column, QTableWidgetItem(f"{summary[stage][key] * 1000:.3f}"))
+        except Exception as e:
+            logger.error(f"Error updating latency table: {e}")
 
 def start_ui():
     app = QApplication(sys.argv)
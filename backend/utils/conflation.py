@@ -0,0 +1,79 @@
+import asyncio
+import time
+from config.settings import CONFLATION_MAX_STALENESS, CONFLATION_MIN_INTERVAL
+
+class ConflatingSlot:
+    """
+    Single-item "latest value" hand-off between an asyncio producer and consumer.
+    put() always overwrites the pending item, so the consumer picks up the newest
+    tick whenever it is free instead of working through a backlog.
+    """
+
+    def __init__(self, max_staleness=CONFLATION_MAX_STALENESS, min_interval=CONFLATION_MIN_INTERVAL):
+        """
+        :param max_staleness: seconds after which a pending item is discarded
+                              rather than processed (None to disable)
+        :param min_interval: minimum seconds between items handed to the consumer
+        """
+        self.max_staleness = max_staleness
+        self.min_interval = min_interval
+        self._item = None
+        self._received_at = None
+        self._event = asyncio.Event()
+        self._last_get = 0.0
+        self.closed = False
+        self.received = 0
+        self.processed = 0
+        self.conflated = 0  # Overwritten before the consumer saw them
+        self.stale = 0  # Discarded for exceeding max_staleness
+
+    def put(self, item):
+        if self._item is not None:
+            self.conflated += 1
+        self._item = item
+        self._received_at = time.monotonic()
+        self.received += 1
+        self._event.set()
+
+    def close(self):
+        """
+        Wake the consumer; get() returns None once the slot is drained
+        """
+        self.closed = True
+        self._event.set()
+
+    async def get(self):
+        """
+        Wait for the newest item not yet processed
+        :return: the item, or None when the slot is closed and empty
+        """
+        while True:
+            if self.min_interval:
+                wait = self._last_get + self.min_interval - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)  # Newer ticks keep overwriting the slot meanwhile
+
+            while self._item is None:
+                if self.closed:
+                    return None
+                self._event.clear()
+                await self._event.wait()
+
+            item, received_at = self._item, self._received_at
+            self._item = None
+            now = time.monotonic()
+            if self.max_staleness is not None and now - received_at > self.max_staleness:
+                self.stale += 1
+                continue
+
+            self._last_get = now
+            self.processed += 1
+            return item
+
+    def stats(self):
+        return {
+            'received': self.received,
+            'processed': self.processed,
+            'conflated': self.conflated,
+            'stale': self.stale
+        }
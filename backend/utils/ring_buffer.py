@@ -0,0 +1,54 @@
+import numpy as np
+
+class RingBuffer:
+    """
+    Fixed-capacity columnar ring buffer backed by preallocated NumPy arrays.
+    Appends are O(1) and never allocate; reads return the newest rows in
+    chronological order.
+    """
+
+    def __init__(self, capacity, columns, dtype=np.float64):
+        """
+        :param capacity: maximum number of rows kept
+        :param columns: column names, e.g. ('timestamps', 'prices', 'volumes')
+        """
+        self.capacity = capacity
+        self.columns = tuple(columns)
+        self._data = {name: np.zeros(capacity, dtype=dtype) for name in self.columns}
+        self._next = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, *values):
+        i = self._next
+        for name, value in zip(self.columns, values):
+            self._data[name][i] = value
+        self._next = (i + 1) % self.capacity
+        if self._size < self.capacity:
+            self._size += 1
+
+    def oldest(self, column):
+        """
+        Value that the next append will overwrite once the buffer is full
+        """
+        return self._data[column][self._next if self._size == self.capacity else 0]
+
+    def last(self, column, n=None):
+        """
+        Return the newest `n` values of a column (all by default), oldest first
+        """
+        n = self._size if n is None else min(n, self._size)
+        start = (self._next - n) % self.capacity
+        data = self._data[column]
+        if start + n <= self.capacity:
+            return data[start:start + n].copy()
+        return np.concatenate((data[start:], data[:self._next]))
+
+    def snapshot(self):
+        return {name: self.last(name) for name in self.columns}
+
+    def clear(self):
+        self._next = 0
+        self._size = 0
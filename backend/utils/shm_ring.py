@@ -0,0 +1,161 @@
+import platform
+import struct
+from multiprocessing import resource_tracker, shared_memory
+
+# Producer and consumer counters live on separate cache lines so the two
+# processes never write to the same line. Native formats are packed with a
+# single memcpy, so aligned positions are written in one store; the explicit
+# little-endian formats write byte by byte and a reader could see a torn value.
+PRODUCER = struct.Struct('@QQQQ')  # head, records written, records dropped, high-water bytes
+CONSUMER = struct.Struct('@QQ')    # tail, records read
+POSITION = struct.Struct('@Q')
+CONSUMER_OFFSET = 64
+CAPACITY = struct.Struct('@Q')  # Written once by the owner; attached blocks may be rounded up to a page
+CAPACITY_OFFSET = 120
+DATA_OFFSET = 128
+LENGTH = struct.Struct('@I')
+ORDERED_STORE_MACHINES = ('x86_64', 'amd64', 'i386', 'i686', 'x86')  # Total store order
+
+def check_store_ordering():
+    """
+    :raises RuntimeError: on CPUs that may reorder stores (ARM, POWER), where a
+                          consumer could see a new head before the record bytes
+    """
+    machine = platform.machine().lower()
+    if machine not in ORDERED_STORE_MACHINES:
+        raise RuntimeError(f"SharedRingBuffer needs x86 store ordering and is not safe on {machine or 'this CPU'}; "
+                           f"set ANALYSIS_WORKERS = 0")
+
+def attach(name):
+    """
+    Attach to an existing block without registering it with this process's
+    resource tracker: the owner tracks and unlinks it, and a worker's
+    registration would otherwise report it leaked or unlink it at exit
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        pass
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+class SharedRingBuffer:
+    """
+    Single-producer single-consumer ring of variable-length byte records in
+    shared memory, for handing messages between two processes without pickling
+    through a pipe. Records are length-prefixed and padded to 4 bytes; positions
+    only ever grow, so used space is head - tail.
+
+    Only the producer writes head and only the consumer writes tail, each after
+    the record bytes it covers. This relies on aligned 8-byte stores not being
+    torn and on stores becoming visible in program order, as on x86-64; see
+    check_store_ordering.
+    """
+
+    def __init__(self, name=None, capacity=1 << 20, create=True):
+        """
+        :param name: shared memory block name; generated when creating
+        :param capacity: data bytes, rounded up to a multiple of 4
+        :param create: allocate the block (owner) or attach to an existing one
+        """
+        if create:
+            capacity = (capacity + 3) & ~3
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=DATA_OFFSET + capacity)
+            self.shm.buf[:DATA_OFFSET] = bytes(DATA_OFFSET)
+            CAPACITY.pack_into(self.shm.buf, CAPACITY_OFFSET, capacity)
+        else:
+            self.shm = attach(name)
+            capacity = CAPACITY.unpack_from(self.shm.buf, CAPACITY_OFFSET)[0]
+        self.name = self.shm.name
+        self.capacity = capacity
+        self.owner = create
+        self._buf = self.shm.buf
+        self._data = self.shm.buf[DATA_OFFSET:DATA_OFFSET + capacity]
+        self._head, self.written, self.dropped, self.high_water = PRODUCER.unpack_from(self._buf, 0)
+        self._tail, self.read = CONSUMER.unpack_from(self._buf, CONSUMER_OFFSET)
+
+    def _copy_in(self, position, data):
+        start = position % self.capacity
+        first = min(len(data), self.capacity - start)
+        self._data[start:start + first] = data[:first]
+        if first < len(data):
+            self._data[:len(data) - first] = data[first:]
+
+    def _copy_out(self, position, size):
+        start = position % self.capacity
+        if start + size <= self.capacity:
+            return bytes(self._data[start:start + size])
+        first = self.capacity - start
+        return bytes(self._data[start:]) + bytes(self._data[:size - first])
+
+    def put(self, data):
+        """
+        Producer side: append one record
+        :return: False (and count a drop) if there is not enough free space
+        """
+        size = len(data)
+        need = 4 + ((size + 3) & ~3)
+        tail = POSITION.unpack_from(self._buf, CONSUMER_OFFSET)[0]
+        used = self._head - tail
+        if need > self.capacity - used:
+            self.dropped += 1
+            PRODUCER.pack_into(self._buf, 0, self._head, self.written, self.dropped, self.high_water)
+            return False
+        start = self._head % self.capacity
+        LENGTH.pack_into(self._data, start, size)  # Never straddles the end: everything is 4-byte aligned
+        self._copy_in(self._head + 4, data)
+        self._head += need
+        self.written += 1
+        self.high_water = max(self.high_water, used + need)
+        PRODUCER.pack_into(self._buf, 0, self._head, self.written, self.dropped, self.high_water)
+        return True
+
+    def get(self):
+        """
+        Consumer side: take the oldest record
+        :return: bytes, or None if the ring is empty
+        """
+        head = POSITION.unpack_from(self._buf, 0)[0]
+        if head <= self._tail:
+            return None
+        size = LENGTH.unpack_from(self._data, self._tail % self.capacity)[0]
+        data = self._copy_out(self._tail + 4, size)
+        self._tail += 4 + ((size + 3) & ~3)
+        self.read += 1
+        CONSUMER.pack_into(self._buf, CONSUMER_OFFSET, self._tail, self.read)
+        return data
+
+    def used(self):
+        head = POSITION.unpack_from(self._buf, 0)[0]
+        tail = POSITION.unpack_from(self._buf, CONSUMER_OFFSET)[0]
+        return head - tail
+
+    def stats(self):
+        """
+        Backpressure counters, readable from either side
+        """
+        head, written, dropped, high_water = PRODUCER.unpack_from(self._buf, 0)
+        tail, read = CONSUMER.unpack_from(self._buf, CONSUMER_OFFSET)
+        return {
+            'capacity': self.capacity,
+            'used': head - tail,
+            'fill': (head - tail) / self.capacity,
+            'high_water': high_water / self.capacity,
+            'written': written,
+            'read': read,
+            'dropped': dropped
+        }
+
+    def close(self):
+        """
+        Detach; the owner also frees the block
+        """
+        self._data.release()
+        self._buf = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
@@ -1,5 +1,12 @@
 # websocket package initialization
 
-from .data_stream import connect_websocket
+from .data_stream import connect_websocket, stream_orderbooks
+from .hub import MarketDataHub
+from .recorder import FeedRecorder, FeedReader, replay_orderbooks, replay_websocket
+from .sharded import ShardedPipeline
+from .pubsub import MarketDataPublisher, MarketDataSubscriber
+from .tick import BookTick
 
-__all__ = ['connect_websocket']
\ No newline at end of file
+__all__ = ['connect_websocket', 'stream_orderbooks', 'MarketDataHub', 'FeedRecorder', 'FeedReader',
+           'replay_orderbooks', 'replay_websocket', 'ShardedPipeline',
+           'MarketDataPublisher', 'MarketDataSubscriber', 'BookTick']
\ No newline at end of file
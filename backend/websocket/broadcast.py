@@ -0,0 +1,119 @@
+import asyncio
+from models.latency import LatencyTracer, stamp
+from websocket.codec import dumps
+from websocket.delta import JSON_PROTOCOL, DELTA_PROTOCOL, DeltaEncoder
+from utils.logger import logger
+from config.settings import CLIENT_QUEUE_SIZE
+
+class AnalysisBroadcaster:
+    """
+    Runs one producer task per instrument that analyses each book update once
+    and fans the encoded result out to every client watching that instrument.
+
+    Each client gets its own bounded queue; when a client falls behind its
+    oldest pending message is dropped (queue_size=1 gives pure conflation), so
+    one slow client never stalls the producer or the other clients.
+
+    Messages are encoded once per tick for each protocol in use by at least
+    one client: JSON text, or a shared delta Frame (see websocket.delta).
+    """
+
+    def __init__(self, hub, analyze, queue_size=CLIENT_QUEUE_SIZE, encode=dumps, tracer=None):
+        """
+        :param hub: MarketDataHub providing processed book updates
+        :param analyze: callable(data) -> message dict, or None to skip the tick
+        :param queue_size: per-client queue bound
+        :param encode: JSON serializer applied once per tick before fan-out
+        :param tracer: LatencyTracer collecting the stage traces of emitted ticks
+        """
+        self.hub = hub
+        self.analyze = analyze
+        self.queue_size = queue_size
+        self.encode = encode
+        self.clients = {}    # instId -> {connection_id: asyncio.Queue}
+        self.protocols = {}  # connection_id -> protocol of its queued messages
+        self.delta_encoders = {}  # instId -> DeltaEncoder
+        self.producers = {}  # instId -> producer task
+        self.dropped = {}    # connection_id -> messages dropped for that client
+        self.dropped_total = 0
+        self.ticks = {}      # instId -> ticks analysed
+        self.tracer = tracer if tracer is not None else LatencyTracer()
+
+    def register(self, inst_id, connection_id, protocol=JSON_PROTOCOL):
+        """
+        Add a client for an instrument, starting its producer if needed
+        :param protocol: JSON_PROTOCOL (queued str) or DELTA_PROTOCOL (queued Frame)
+        :return: asyncio.Queue of encoded messages for this client
+        """
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self.clients.setdefault(inst_id, {})[connection_id] = queue
+        self.protocols[connection_id] = protocol
+        self.dropped[connection_id] = 0
+        if inst_id not in self.producers:
+            self.producers[inst_id] = asyncio.ensure_future(self._produce(inst_id))
+            logger.info(f"Started analysis producer for {inst_id}")
+        return queue
+
+    def unregister(self, inst_id, connection_id):
+        clients = self.clients.get(inst_id, {})
+        clients.pop(connection_id, None)
+        self.dropped.pop(connection_id, None)
+        self.protocols.pop(connection_id, None)
+        if not clients:
+            self.clients.pop(inst_id, None)
+            self.delta_encoders.pop(inst_id, None)
+            producer = self.producers.pop(inst_id, None)
+            if producer is not None:
+                producer.cancel()
+                logger.info(f"Stopped analysis producer for {inst_id}")
+
+    async def _produce(self, inst_id):
+        # A single-slot hub queue means the producer always analyses the newest
+        # book and skips updates that arrived while it was busy
+        async for data in self.hub.stream(inst_id, maxsize=1):
+            try:
+                trace = data.trace
+                if trace is not None and 'dequeued' not in trace:  # Worker processes stamp their own
+                    stamp(trace, 'dequeued')
+                message = self.analyze(data)
+                if message is None:
+                    continue
+                self.ticks[inst_id] = self.ticks.get(inst_id, 0) + 1
+                self.broadcast(inst_id, message)
+                if trace is not None:
+                    stamp(trace, 'emit')
+                    self.tracer.record(trace)
+            except Exception as e:
+                logger.error(f"Error producing analysis for {inst_id}: {e}")
+
+    def encode_for(self, inst_id, protocol, message):
+        if protocol == DELTA_PROTOCOL:
+            if inst_id not in self.delta_encoders:
+                self.delta_encoders[inst_id] = DeltaEncoder()
+            return self.delta_encoders[inst_id].encode(message)
+        return self.encode(message)
+
+    def broadcast(self, inst_id, message):
+        """
+        Encode a message dict for each protocol in use and queue it for every client
+        """
+        encoded = {}
+        for connection_id, queue in self.clients.get(inst_id, {}).items():
+            protocol = self.protocols.get(connection_id, JSON_PROTOCOL)
+            if protocol not in encoded:
+                encoded[protocol] = self.encode_for(inst_id, protocol, message)
+            if queue.full():
+                queue.get_nowait()
+                self.dropped[connection_id] += 1
+                self.dropped_total += 1
+            queue.put_nowait(encoded[protocol])
+
+    async def stop(self):
+        producers = list(self.producers.values())
+        for producer in producers:
+            producer.cancel()
+        await asyncio.gather(*producers, return_exceptions=True)
+        self.producers.clear()
+        self.clients.clear()
+        self.protocols.clear()
+        self.delta_encoders.clear()
@@ -0,0 +1,84 @@
+import json
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # Optional; the standard library decoder is used instead
+    orjson = None
+
+EMPTY_LEVELS = np.zeros(0)
+
+def loads(message):
+    """
+    Decode a JSON message (str or bytes) with the fastest available backend.
+    Both backends raise json.JSONDecodeError (orjson's error subclasses it).
+    """
+    if orjson is not None:
+        return orjson.loads(message)
+    return json.loads(message)
+
+def _default(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps(obj):
+    """
+    Encode to JSON text; NumPy scalars and arrays are serialized as numbers
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    return json.dumps(obj, default=_default)
+
+def parse_levels(levels):
+    """
+    Parse OKX [price, size, ...] string levels straight into float64 arrays
+    :return: (prices, sizes)
+    """
+    if not levels:
+        return EMPTY_LEVELS, EMPTY_LEVELS
+    return (np.array([level[0] for level in levels], dtype=np.float64),
+            np.array([level[1] for level in levels], dtype=np.float64))
+
+def decode_levels(entry):
+    """
+    Add bid_px/bid_sz/ask_px/ask_sz arrays to a parsed `books` data entry in place.
+    The string levels are kept, as OKX checksums are defined over the exact strings.
+    """
+    if 'bid_px' not in entry:
+        entry['bid_px'], entry['bid_sz'] = parse_levels(entry.get('bids'))
+        entry['ask_px'], entry['ask_sz'] = parse_levels(entry.get('asks'))
+    return entry
+
+def decode_book_message(message):
+    """
+    Decode one raw OKX push; book entries carry numeric level arrays
+    :raises json.JSONDecodeError: if the message is not valid JSON
+    """
+    data = loads(message)
+    entries = data.get('data') if isinstance(data, dict) else None
+    if isinstance(entries, list):
+        for entry in entries:
+            if isinstance(entry, dict) and 'bids' in entry and 'asks' in entry:
+                decode_levels(entry)
+    return data
+
+def is_snapshot_message(message):
+    """
+    Whether a raw OKX `books` push is a full snapshot, without decoding it
+    """
+    return '"action":"snapshot"' in message[:200]
+
+def peek_inst_id(message):
+    """
+    Instrument of a raw OKX push without decoding it, for routing
+    :return: instId, or None if the message carries no channel argument
+    """
+    start = message.find('"instId":"')
+    if start < 0:
+        arg = loads(message).get('arg') or {}
+        return arg.get('instId')
+    start += 10
+    return message[start:message.index('"', start)]
@@ -2,78 +2,293 @@ import asyncio
 import websockets
 import json
 import time
+import zlib
 from datetime import datetime
 from utils.logger import logger
-from config.settings import OKX_WEBSOCKET_URL, TRADE_AMOUNT
+from config.settings import OKX_WEBSOCKET_URL, TRADE_AMOUNT, DEFAULT_INSTRUMENT, QUIET_MODE, MARKET_DEPTH_LEVELS
+from websocket.codec import decode_book_message, decode_levels
+from websocket.price_levels import PriceLevelBook
+from websocket.tick import BookTick
+from models.latency import stamp, LatencyAnalyzer
+from models.volatility import VolatilityEstimator
+import numpy as np
 import sys
 
+CHECKSUM_DEPTH = 25  # OKX checksums cover the top 25 levels of each side
+
+class OrderBookOutOfSync(Exception):
+    """Raised when a book message cannot be applied consistently to the local book"""
+
 class OrderBookManager:
     def __init__(self):
-        self.bids = {}
-        self.asks = {}
-        self.processing_times = []
+        self.bids = PriceLevelBook('bids')
+        self.asks = PriceLevelBook('asks')
+        self.latency = LatencyAnalyzer()
+        self.volatility = VolatilityEstimator()
+        self.seq_id = None
+        self.awaiting_snapshot = True
         print("\nInitializing OrderBook Manager...")
         logger.info("Initializing OrderBook Manager")
 
+    def reset(self):
+        """
+        Drop all levels and wait for the next snapshot before applying deltas
+        """
+        self.bids.clear()
+        self.asks.clear()
+        self.seq_id = None
+        self.awaiting_snapshot = True
+
+    def apply_message(self, action, data):
+        """
+        Apply one OKX `books` push according to its action
+        :param action: 'snapshot', 'update' or None for feeds without actions
+        :param data: the book entry from the message's `data` list
+        :return: BookTick for the update, or None while waiting for a snapshot
+        :raises OrderBookOutOfSync: on a sequence gap or checksum mismatch
+        """
+        if action == 'snapshot':
+            self.reset()
+            self.awaiting_snapshot = False
+        elif action == 'update':
+            if self.awaiting_snapshot:
+                return None
+            prev_seq_id = data.get('prevSeqId')
+            if prev_seq_id is not None and self.seq_id is not None and prev_seq_id != self.seq_id:
+                raise OrderBookOutOfSync(f"Sequence gap: expected prevSeqId {self.seq_id}, got {prev_seq_id}")
+
+        processed_data = self.update_orderbook(data)
+        if processed_data is None:
+            raise OrderBookOutOfSync("Failed to apply book message")
+
+        if 'checksum' in data:
+            checksum = self.calculate_checksum()
+            if checksum != int(data['checksum']):
+                raise OrderBookOutOfSync(f"Checksum mismatch: local {checksum}, exchange {data['checksum']}")
+
+        self.seq_id = data.get('seqId', self.seq_id)
+        return processed_data
+
+    def calculate_checksum(self, depth=CHECKSUM_DEPTH):
+        """
+        Signed CRC32 over interleaved `bid_px:bid_sz:ask_px:ask_sz` top levels,
+        as defined by OKX for the `books` channel
+        """
+        bids = self.bids.raw_levels(depth)
+        asks = self.asks.raw_levels(depth)
+        fields = []
+        for i in range(max(len(bids), len(asks))):
+            if i < len(bids):
+                fields.extend(bids[i])
+            if i < len(asks):
+                fields.extend(asks[i])
+
+        checksum = zlib.crc32(':'.join(fields).encode())
+        return checksum - (1 << 32) if checksum >= (1 << 31) else checksum
+
     def update_orderbook(self, data):
+        """
+        Apply the levels of one book entry
+        :param data: parsed entry; numeric bid_px/bid_sz/ask_px/ask_sz arrays are
+                     used when present (see websocket.codec), otherwise added
+        :return: BookTick with the top 10 levels per side, or None on error
+        """
         try:
             start_time = time.perf_counter()
+            decode_levels(data)
+
+            # Update bids and asks; the exchange strings are kept for checksums
+            update, levels = self.bids.update, data.get('bids')
+            for i, (price, size) in enumerate(zip(data['bid_px'].tolist(), data['bid_sz'].tolist())):
+                update(price, size, (levels[i][0], levels[i][1]) if levels else None)
 
-            # Update bids and asks
-            for bid in data.get('bids', []):
-                price, size = float(bid[0]), float(bid[1])
-                if size == 0:
-                    self.bids.pop(price, None)
-                else:
-                    self.bids[price] = size
-
-            for ask in data.get('asks', []):
-                price, size = float(ask[0]), float(ask[1])
-                if size == 0:
-                    self.asks.pop(price, None)
-                else:
-                    self.asks[price] = size
-
-            # Sort orderbook
-            self.bids = dict(sorted(self.bids.items(), reverse=True))
-            self.asks = dict(sorted(self.asks.items()))
+            update, levels = self.asks.update, data.get('asks')
+            for i, (price, size) in enumerate(zip(data['ask_px'].tolist(), data['ask_sz'].tolist())):
+                update(price, size, (levels[i][0], levels[i][1]) if levels else None)
 
             # Calculate processing time
             end_time = time.perf_counter()
             processing_time = end_time - start_time
-            self.processing_times.append(processing_time)
+            self.latency.record('update_orderbook', processing_time)
 
-            # Keep only last 1000 processing times
-            if len(self.processing_times) > 1000:
-                self.processing_times.pop(0)
-
-            return {
-                'timestamp': data.get('timestamp', datetime.utcnow().isoformat()),
-                'bids': [[str(price), str(size)] for price, size in list(self.bids.items())[:10]],
-                'asks': [[str(price), str(size)] for price, size in list(self.asks.items())[:10]],
-                'processing_time': processing_time
-            }
+            return BookTick(
+                data.get('timestamp') or datetime.utcnow().isoformat(),
+                *self.bids.columns(10),
+                *self.asks.columns(10),
+                processing_time
+            )
 
         except Exception as e:
             logger.error(f"Error updating orderbook: {e}")
             return None
 
     def get_average_latency(self):
-        if not self.processing_times:
-            return 0
-        return sum(self.processing_times) / len(self.processing_times)
+        """
+        Mean book update time, weighted towards recent updates
+        """
+        return self.latency.mean('update_orderbook', view='decay')
 
-    def calculate_market_depth(self, side='bids', depth=10):
+    def calculate_market_depth(self, side='bids', depth=MARKET_DEPTH_LEVELS):
         try:
             book = self.bids if side == 'bids' else self.asks
-            total_volume = sum(size for _, size in list(book.items())[:depth])
-            return total_volume
+            return book.total_size(depth)
         except Exception as e:
             logger.error(f"Error calculating market depth: {e}")
             return 0
 
-async def connect_websocket():
-    orderbook = OrderBookManager()
+    def imbalance(self, depth=MARKET_DEPTH_LEVELS):
+        """
+        (bid size - ask size) / (bid size + ask size) over the top levels, in [-1, 1]
+        """
+        bid_size, ask_size = self.bids.total_size(depth), self.asks.total_size(depth)
+        total = bid_size + ask_size
+        return (bid_size - ask_size) / total if total > 0 else 0.0
+
+    def microprice(self):
+        """
+        Touch prices weighted by the opposite side's size, or None if a side is empty
+        """
+        best_bid, best_ask = self.bids.best(), self.asks.best()
+        if best_bid is None or best_ask is None:
+            return None
+        return (best_bid[0] * best_ask[1] + best_ask[0] * best_bid[1]) / (best_bid[1] + best_ask[1])
+
+    def weighted_mid(self, depth=MARKET_DEPTH_LEVELS):
+        """
+        Midpoint of the size-weighted average prices of the top levels on each side
+        """
+        bid_vwap, ask_vwap = self.bids.vwap(depth), self.asks.vwap(depth)
+        if bid_vwap is None or ask_vwap is None:
+            return None
+        return (bid_vwap + ask_vwap) / 2
+
+    def annotate_tick(self, tick, depth=MARKET_DEPTH_LEVELS):
+        """
+        Copy the book's running aggregates onto a BookTick; every value is an O(1) read.
+        The book's volatility estimator is fed here so it sees every update, not
+        only the ones an analysis consumer gets round to.
+        """
+        bids, asks = self.bids, self.asks
+        if tick.bid_px and tick.ask_px:
+            self.volatility.update(time.time(), (tick.bid_px[0] + tick.ask_px[0]) / 2, tick.bid_sz[0])
+        tick.volatility = self.volatility.volatility
+        tick.bid_depth = bids.total_size(depth)
+        tick.ask_depth = asks.total_size(depth)
+        tick.bid_notional = bids.total_notional(depth)
+        tick.ask_notional = asks.total_notional(depth)
+        tick.imbalance = self.imbalance(depth)
+        tick.microprice = self.microprice()
+        tick.weighted_mid = self.weighted_mid(depth)
+        tick.latency = self.get_average_latency()
+        return tick
+
+    def estimate_execution(self, side, amount, by='notional'):
+        """
+        Deterministic walk-the-book estimate for a market order against the live levels
+        :param side: 'buy' (walks the asks) or 'sell' (walks the bids)
+        :param amount: order size(s), scalar or array; notional (price * size) or quantity
+        :param by: 'notional' or 'quantity'
+        :return: dict of VWAP fill price, filled quantity/notional and slippage versus mid
+                 (in quote terms and bps), or None if either side of the book is empty
+        """
+        best_bid, best_ask = self.bids.best(), self.asks.best()
+        if best_bid is None or best_ask is None:
+            return None
+
+        mid_price = (best_bid[0] + best_ask[0]) / 2
+        book = self.asks if side == 'buy' else self.bids
+        quantity, notional = book.fill(amount, by)
+        direction = 1.0 if side == 'buy' else -1.0
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vwap = np.where(quantity > 0, notional / quantity, mid_price)
+            slippage = direction * (notional - quantity * mid_price)
+            slippage_bps = np.where(quantity > 0, slippage / (quantity * mid_price) * 1e4, 0.0)
+
+        return {
+            'mid_price': mid_price,
+            'vwap': vwap,
+            'filled_quantity': quantity,
+            'filled_notional': notional,
+            'slippage': slippage,
+            'slippage_bps': slippage_bps,
+            'complete': (notional if by == 'notional' else quantity) >= np.asarray(amount) * (1 - 1e-12)
+        }
+
+    def slippage_curve(self, amounts, by='notional'):
+        """
+        Walk-the-book slippage for several order sizes on both sides
+        :return: array shaped (len(amounts), 2) with buy and sell slippage, zeros if the book is empty
+        """
+        amounts = np.asarray(amounts, dtype=float)
+        buy = self.estimate_execution('buy', amounts, by)
+        sell = self.estimate_execution('sell', amounts, by)
+        if buy is None or sell is None:
+            return np.zeros((len(amounts), 2))
+        return np.stack((buy['slippage'], sell['slippage']), axis=-1)
+
+def instrument_type(inst_id):
+    """
+    Infer the OKX instType from an instrument ID (e.g. BTC-USDT-SWAP -> SWAP)
+    """
+    if inst_id.endswith('-SWAP'):
+        return "SWAP"
+    return "SPOT"
+
+def book_subscription(inst_id=DEFAULT_INSTRUMENT):
+    return {
+        "channel": "books",
+        "instId": inst_id,
+        "instType": instrument_type(inst_id)
+    }
+
+async def resubscribe(websocket, arg):
+    """
+    Re-request a single channel so the exchange sends a fresh snapshot,
+    without dropping the connection or other subscriptions on it
+    """
+    await websocket.send(json.dumps({"op": "unsubscribe", "args": [arg]}))
+    await websocket.send(json.dumps({"op": "subscribe", "args": [arg]}))
+
+def process_book_message(orderbook, inst_id, data, trace=None):
+    """
+    Apply one parsed 'books' push to an order book and annotate the result
+    :param trace: optional dict of stage timestamps for this tick; the exchange
+                  time and book update are added and it is attached to the result
+    :return: BookTick with instId, book aggregates and latency, or None if nothing to emit
+    :raises OrderBookOutOfSync: if the message cannot be applied consistently
+    """
+    orderbook_data = data['data'][0] if isinstance(data['data'], list) else data['data']
+    if not isinstance(orderbook_data, dict) or 'bids' not in orderbook_data or 'asks' not in orderbook_data:
+        logger.warning(f"Invalid orderbook data format: {orderbook_data}")
+        return None
+
+    processed_data = orderbook.apply_message(data.get('action'), orderbook_data)
+    if processed_data:
+        processed_data.inst_id = inst_id
+        orderbook.annotate_tick(processed_data)
+        if trace is not None:
+            stamp(trace, 'book')
+            if 'ts' in orderbook_data:
+                trace['exchange'] = int(orderbook_data['ts']) / 1000
+            processed_data.trace = trace
+    return processed_data
+
+def is_event_message(message):
+    """
+    Cheap check for OKX control messages ({"event": ...}) without decoding data pushes
+    """
+    return '"event"' in message[:32]
+
+async def okx_feed(subscriptions, on_connect=None, recorder=None):
+    """
+    Keep one OKX connection open with the given subscriptions, reconnecting with
+    backoff. Subscription events are handled here; data pushes are not decoded.
+    :param subscriptions: dict of instId -> channel argument
+    :param on_connect: optional callable run on every (re)connect, before subscribing
+    :param recorder: optional FeedRecorder that captures every raw message as received
+    :return: async generator of (websocket, raw message, trace)
+    """
     reconnect_delay = 1
     max_retries = 10  # Increased max retries
     retry_count = 0
@@ -83,18 +298,16 @@ async def connect_websocket():
         try:
             async with websockets.connect(OKX_WEBSOCKET_URL) as websocket:
                 print("\nConnected to OKX WebSocket")
-                logger.info("Connected to OKX WebSocket")
+                logger.info(f"Connected to OKX WebSocket for {len(subscriptions)} instrument(s)")
+                if on_connect is not None:
+                    on_connect()  # A new connection always starts from a fresh snapshot
                 reconnect_delay = 1  # Reset delay on successful connection
                 retry_count = 0  # Reset retry count on successful connection
 
-                # Subscribe to orderbook channel
+                # Subscribe to orderbook channels
                 subscribe_message = {
                     "op": "subscribe",
-                    "args": [{
-                        "channel": "books",
-                        "instId": "BTC-USDT-SWAP",
-                        "instType": "SWAP"
-                    }]
+                    "args": list(subscriptions.values())
                 }
                 print("\nSubscribing to OKX orderbook...")
                 await websocket.send(json.dumps(subscribe_message))
@@ -102,10 +315,13 @@ async def connect_websocket():
                 while True:
                     try:
                         message = await websocket.recv()
-                        data = json.loads(message)
+                        trace = {'received': time.time()}
+                        if recorder is not None:
+                            recorder.record(message, trace['received'])
 
                         # Handle subscription confirmation
-                        if 'event' in data:
+                        if is_event_message(message):
+                            data = json.loads(message)
                             print(f"\rWebSocket event: {data['event']}")
                             logger.info(f"WebSocket event: {data['event']}")
                             if data['event'] == 'error':
@@ -116,33 +332,7 @@ async def connect_websocket():
                                 print("\nSuccessfully subscribed to orderbook stream")
                             continue
 
-                        # Process orderbook data
-                        if 'data' in data and data.get('data'):
-                            try:
-                                orderbook_data = data['data'][0] if isinstance(data['data'], list) else data['data']
-                                if not isinstance(orderbook_data, dict) or 'bids' not in orderbook_data or 'asks' not in orderbook_data:
-                                    logger.warning(f"Invalid orderbook data format: {orderbook_data}")
-                                    continue
-                                processed_data = orderbook.update_orderbook(orderbook_data)
-
-                                if processed_data:
-                                    # Calculate market depth
-                                    market_depth = {
-                                        'bids': orderbook.calculate_market_depth('bids'),
-                                        'asks': orderbook.calculate_market_depth('asks')
-                                    }
-                                    processed_data['market_depth'] = market_depth
-                                    processed_data['latency'] = orderbook.get_average_latency()
-
-                                    # Print updates to console
-                                    print(f"\rBest Bid: {processed_data['bids'][0][0]} | Best Ask: {processed_data['asks'][0][0]} | Depth: {market_depth['bids']:.2f}/{market_depth['asks']:.2f} | Latency: {processed_data['latency']:.5f}s", end='')
-                                    sys.stdout.flush()
-
-                                    yield processed_data
-                            except Exception as e:
-                                logger.error(f"Error processing orderbook data: {e}")
-                                print(f"\rError processing data: {e}", end='')
-                                continue
+                        yield websocket, message, trace
 
                     except json.JSONDecodeError as e:
                         logger.error(f"JSON decode error: {e}")
@@ -166,4 +356,69 @@ async def connect_websocket():
 
     print("\nFailed to establish WebSocket connection after maximum retries")
     logger.error("Failed to establish WebSocket connection after maximum retries")
-    return
+
+async def stream_orderbooks(instruments, orderbooks=None, recorder=None):
+    """
+    Maintain order books for several instruments over a single OKX connection
+    :param instruments: list of instrument IDs to subscribe on this socket
+    :param orderbooks: optional dict of instId -> OrderBookManager to update in place
+    :param recorder: optional FeedRecorder that captures every raw message as received
+    :return: async generator of (instId, processed_data)
+    """
+    if orderbooks is None:
+        orderbooks = {}
+    for inst_id in instruments:
+        orderbooks.setdefault(inst_id, OrderBookManager())
+
+    def reset_books():
+        for inst_id in instruments:
+            orderbooks[inst_id].reset()
+
+    subscriptions = {inst_id: book_subscription(inst_id) for inst_id in instruments}
+    async for websocket, message, trace in okx_feed(subscriptions, reset_books, recorder):
+        try:
+            data = decode_book_message(message)
+        except json.JSONDecodeError as e:
+            logger.error(f"JSON decode error: {e}")
+            continue
+        stamp(trace, 'decoded')
+
+        # Process orderbook data
+        if 'data' in data and data.get('data'):
+            try:
+                inst_id = data.get('arg', {}).get('instId', instruments[0])
+                orderbook = orderbooks.get(inst_id)
+                if orderbook is None:
+                    logger.warning(f"Data for unsubscribed instrument: {inst_id}")
+                    continue
+
+                try:
+                    processed_data = process_book_message(orderbook, inst_id, data, trace)
+                except OrderBookOutOfSync as e:
+                    logger.warning(f"{inst_id} order book out of sync, resubscribing: {e}")
+                    print(f"\r{inst_id} order book out of sync ({e}), resubscribing...", end='')
+                    orderbook.reset()
+                    await resubscribe(websocket, subscriptions[inst_id])
+                    continue
+
+                if processed_data:
+                    # Print updates to console
+                    if not QUIET_MODE:
+                        print(f"\r{inst_id} Best Bid: {processed_data.best_bid} | Best Ask: {processed_data.best_ask} | Depth: {processed_data.bid_depth:.2f}/{processed_data.ask_depth:.2f} | Latency: {processed_data.latency:.5f}s", end='')
+                        sys.stdout.flush()
+
+                    yield inst_id, processed_data
+            except Exception as e:
+                logger.error(f"Error processing orderbook data: {e}")
+                print(f"\rError processing data: {e}", end='')
+                continue
+
+async def connect_websocket(inst_id=DEFAULT_INSTRUMENT, orderbook=None, recorder=None):
+    """
+    Stream processed order book updates for a single instrument
+    :param orderbook: optional OrderBookManager to maintain, so callers can query the live levels
+    :param recorder: optional FeedRecorder that captures the raw feed for later replay
+    """
+    orderbooks = {inst_id: orderbook} if orderbook is not None else None
+    async for _, processed_data in stream_orderbooks([inst_id], orderbooks, recorder):
+        yield processed_data
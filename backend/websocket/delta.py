@@ -0,0 +1,200 @@
+import json
+import math
+import struct
+from datetime import datetime, timezone
+import numpy as np
+
+JSON_PROTOCOL = "json"
+DELTA_PROTOCOL = "tradesim.delta.v1"
+PROTOCOLS = (DELTA_PROTOCOL, JSON_PROTOCOL)  # Server preference order
+
+KEYFRAME = 1
+DELTA = 2
+# kind, schema id, number of values that follow, sequence number
+HEADER = struct.Struct('<BBHI')
+
+def iso_to_epoch(value):
+    """
+    Naive UTC ISO timestamp (as produced by BookTick) to epoch seconds
+    """
+    if not value:
+        return math.nan
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp()
+
+def negotiate(offered):
+    """
+    Pick the WebSocket subprotocol for a client
+    :param offered: subprotocols listed in the client's handshake
+    :return: (protocol used, subprotocol to accept or None)
+    """
+    for protocol in PROTOCOLS:
+        if protocol in offered:
+            return protocol, protocol
+    return JSON_PROTOCOL, None
+
+class Schema:
+    """
+    Layout of the numeric fields in a frame plus the values that never change
+    (instrument, fee tiers, ...). Sent once as a JSON text frame; binary frames
+    then carry only float64 values in field order.
+    """
+
+    def __init__(self, schema_id, fields, static):
+        """
+        :param fields: list of (dotted path, shape, type) with type 'number' or 'timestamp'
+        :param static: dict of dotted path -> JSON value
+        """
+        self.id = schema_id
+        self.fields = fields
+        self.static = static
+        self.size = sum(int(np.prod(shape)) for _, shape, _ in fields)
+        self.text = json.dumps({
+            'type': 'schema',
+            'protocol': DELTA_PROTOCOL,
+            'id': schema_id,
+            'fields': [{'path': path, 'shape': list(shape), 'type': kind} for path, shape, kind in fields],
+            'static': static
+        })
+
+    def matches(self, fields, static):
+        return self.fields == fields and self.static == static
+
+class Frame:
+    """
+    One encoded tick shared by every delta client of an instrument. The delta
+    and keyframe encodings are built on first use and cached.
+    """
+    __slots__ = ('seq', 'schema', 'values', 'changed', '_delta', '_keyframe')
+
+    def __init__(self, seq, schema, values, changed):
+        self.seq = seq
+        self.schema = schema
+        self.values = values
+        self.changed = changed  # Boolean mask of values that differ from the previous frame
+        self._delta = None
+        self._keyframe = None
+
+    def keyframe(self):
+        if self._keyframe is None:
+            self._keyframe = HEADER.pack(KEYFRAME, self.schema.id, len(self.values), self.seq) + self.values.tobytes()
+        return self._keyframe
+
+    def delta(self):
+        """
+        Header, then a little-endian bitmask of changed fields, then their values
+        """
+        if self._delta is None:
+            changed = self.changed
+            self._delta = (HEADER.pack(DELTA, self.schema.id, int(changed.sum()), self.seq)
+                           + np.packbits(changed, bitorder='little').tobytes()
+                           + self.values[changed].tobytes())
+        return self._delta
+
+class DeltaEncoder:
+    """
+    Flattens analysis messages into a fixed float64 layout and tracks which
+    values changed since the previous tick of the same instrument
+    """
+
+    def __init__(self, converters=None):
+        """
+        :param converters: dotted path -> callable mapping a non-numeric value that
+                           changes every tick (e.g. a timestamp) to a float
+        """
+        self.converters = converters if converters is not None else {'market_data.timestamp': iso_to_epoch}
+        self.schema = None
+        self.previous = None
+        self.seq = 0
+
+    def flatten(self, message):
+        """
+        :return: (fields, values array, static values)
+        """
+        fields, values, static = [], [], {}
+        self._walk(message, '', fields, values, static)
+        return fields, np.array(values, dtype=np.float64), static
+
+    def _walk(self, obj, prefix, fields, values, static):
+        for key, value in obj.items():
+            path = prefix + key
+            if isinstance(value, dict):
+                self._walk(value, path + '.', fields, values, static)
+            elif path in self.converters:
+                fields.append((path, (), 'timestamp'))
+                values.append(self.converters[path](value))
+            elif value is None or isinstance(value, (float, int, np.floating, np.integer)) and not isinstance(value, bool):
+                fields.append((path, (), 'number'))
+                values.append(math.nan if value is None else value)
+            elif isinstance(value, np.ndarray) and value.dtype.kind in 'fiu':
+                # Arrays are flattened row-major; the schema keeps the shape
+                fields.append((path, value.shape, 'number'))
+                values.extend(value.ravel().tolist())
+            else:
+                static[path] = value
+
+    def encode(self, message):
+        """
+        :return: Frame for this tick
+        """
+        fields, values, static = self.flatten(message)
+        if self.schema is None or not self.schema.matches(fields, static):
+            schema_id = 0 if self.schema is None else (self.schema.id + 1) % 256
+            self.schema = Schema(schema_id, fields, static)
+            changed = np.ones(len(values), dtype=bool)
+        else:
+            previous = self.previous
+            changed = (values != previous) & ~(np.isnan(values) & np.isnan(previous))
+        self.previous = values
+        self.seq = (self.seq + 1) & 0xFFFFFFFF
+        return Frame(self.seq, self.schema, values, changed)
+
+class DeltaStream:
+    """
+    Per-client view of a frame sequence: sends the schema when it changes and a
+    keyframe whenever the client missed the previous frame (e.g. frames dropped
+    from its queue), otherwise only the delta
+    """
+
+    def __init__(self):
+        self.schema = None
+        self.seq = None
+        self.keyframes = 0
+        self.deltas = 0
+
+    def frames(self, frame):
+        """
+        :return: list of str (schema) and bytes (binary frames) to send, in order
+        """
+        out = []
+        resync = self.seq is None or frame.seq != (self.seq + 1) & 0xFFFFFFFF
+        if frame.schema is not self.schema:
+            out.append(frame.schema.text)
+            self.schema = frame.schema
+            resync = True
+        if resync:
+            out.append(frame.keyframe())
+            self.keyframes += 1
+        else:
+            out.append(frame.delta())
+            self.deltas += 1
+        self.seq = frame.seq
+        return out
+
+def decode_frame(schema, data, state=None):
+    """
+    Reference decoder (mirrors frontend/src/deltaDecoder.js)
+    :param schema: parsed schema dict
+    :param data: binary frame
+    :param state: float64 values after the previous frame, required for deltas
+    :return: (seq, values)
+    """
+    kind, _, count, seq = HEADER.unpack_from(data)
+    size = sum(int(np.prod(field['shape'])) for field in schema['fields'])
+    if kind == KEYFRAME:
+        return seq, np.frombuffer(data, dtype='<f8', count=count, offset=HEADER.size).copy()
+    mask_bytes = (size + 7) // 8
+    mask = np.unpackbits(np.frombuffer(data, dtype=np.uint8, count=mask_bytes, offset=HEADER.size),
+                         count=size, bitorder='little').astype(bool)
+    values = state.copy()
+    values[mask] = np.frombuffer(data, dtype='<f8', count=count, offset=HEADER.size + mask_bytes)
+    return seq, values
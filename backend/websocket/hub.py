@@ -0,0 +1,88 @@
+import asyncio
+from utils.logger import logger
+from config.settings import INSTRUMENTS, MARKET_DATA_CONNECTIONS, SUBSCRIBER_QUEUE_SIZE
+from websocket.data_stream import OrderBookManager, stream_orderbooks
+
+class MarketDataHub:
+    """
+    Fan-in of many instruments over a small pool of upstream OKX sockets.
+
+    One OrderBookManager is kept per instrument and every processed update is
+    published to the bounded queues of that instrument's subscribers. A full
+    queue drops its oldest update, so a slow consumer never blocks socket reads.
+    """
+
+    def __init__(self, instruments=None, connections=MARKET_DATA_CONNECTIONS, source=stream_orderbooks):
+        """
+        :param instruments: instrument IDs to watch (spot and swap can be mixed)
+        :param connections: maximum number of upstream sockets
+        :param source: async generator factory (instruments, orderbooks) -> (instId, data)
+        """
+        self.instruments = list(instruments or INSTRUMENTS)
+        self.connections = max(1, min(connections, len(self.instruments)))
+        self.source = source
+        self.orderbooks = {inst_id: OrderBookManager() for inst_id in self.instruments}
+        self.latest = {}
+        self.subscribers = {inst_id: set() for inst_id in self.instruments}
+        self.tasks = []
+
+    def partitions(self):
+        """
+        Spread instruments round-robin across the connection pool
+        """
+        return [self.instruments[i::self.connections] for i in range(self.connections)]
+
+    def start(self):
+        if self.tasks:
+            return
+        for instruments in self.partitions():
+            self.tasks.append(asyncio.ensure_future(self._run_connection(instruments)))
+        logger.info(f"Market data hub started: {len(self.instruments)} instruments on {len(self.tasks)} connection(s)")
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        logger.info("Market data hub stopped")
+
+    async def _run_connection(self, instruments):
+        try:
+            async for inst_id, data in self.source(instruments, self.orderbooks):
+                self.publish(inst_id, data)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Market data connection for {instruments} failed: {e}")
+
+    def publish(self, inst_id, data):
+        self.latest[inst_id] = data
+        for queue in self.subscribers.get(inst_id, ()):
+            if queue.full():
+                queue.get_nowait()  # Drop the oldest update for slow consumers
+            queue.put_nowait(data)
+
+    def subscribe(self, inst_id, maxsize=SUBSCRIBER_QUEUE_SIZE):
+        """
+        Register a consumer for one instrument
+        :return: asyncio.Queue receiving that instrument's processed updates
+        """
+        if inst_id not in self.subscribers:
+            raise KeyError(f"Instrument not configured in market data hub: {inst_id}")
+        queue = asyncio.Queue(maxsize=maxsize)
+        self.subscribers[inst_id].add(queue)
+        return queue
+
+    def unsubscribe(self, inst_id, queue):
+        self.subscribers.get(inst_id, set()).discard(queue)
+
+    async def stream(self, inst_id, maxsize=SUBSCRIBER_QUEUE_SIZE):
+        """
+        Async generator of processed updates for one instrument
+        """
+        queue = self.subscribe(inst_id, maxsize)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self.unsubscribe(inst_id, queue)
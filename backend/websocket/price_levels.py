@@ -0,0 +1,272 @@
+from bisect import bisect_left
+import numpy as np
+from config.settings import BOOK_AGGREGATE_DEPTHS, AGGREGATE_RESYNC_INTERVAL
+
+
+class PriceLevelBook:
+    """
+    One side of an order book kept as a sorted price array plus a size map.
+
+    Keys are stored in ascending order with the best level at the end of the
+    array (asks use negated prices), so touch-of-book changes - by far the
+    most frequent - only move a handful of elements.
+
+    Cumulative size and notional prefix sums run in the same array order.
+    Updates only mark the first stale index, and the next fill query
+    recomputes the sums from there on; touch updates therefore cost O(1)
+    to refresh and every fill query is a binary search.
+
+    Size and notional over the best N levels are kept for each N in `depths`,
+    stored per band of ranks between consecutive depths (e.g. 0-4, 5-9,
+    10-24). Resizing a level adjusts its band's running sums in O(1);
+    inserts and deletes shift ranks, so like the prefix sums they only mark
+    the first stale band, and the next read re-sums the bands from there
+    once per message. Changes deeper than the largest N cost nothing.
+    """
+
+    def __init__(self, side='bids', depths=BOOK_AGGREGATE_DEPTHS, resync=AGGREGATE_RESYNC_INTERVAL):
+        """
+        :param side: 'bids' (best = highest price) or 'asks' (best = lowest price)
+        :param depths: top-N level counts with running size/notional sums
+        :param resync: updates between exact recomputations of the running sums,
+                       bounding floating-point drift
+        """
+        self.side = side
+        self._sign = 1.0 if side == 'bids' else -1.0
+        self._keys = []   # sorted ascending, best level last
+        self._sizes = {}  # price -> size
+        self._raw = {}    # price -> (price_str, size_str) as received
+        self._level_sizes = []  # sizes aligned with _keys
+        self._prices = np.zeros(0)
+        self._cum_size = np.zeros(0)
+        self._cum_notional = np.zeros(0)
+        self._stale_from = 0  # prefix sums are valid below this array index
+        self.depths = tuple(sorted(set(depths)))
+        self._max_depth = self.depths[-1] if self.depths else 0
+        self._depth_index = {depth: k for k, depth in enumerate(self.depths)}
+        self._band_of = [sum(rank >= depth for depth in self.depths) for rank in range(self._max_depth)]
+        self._band_size = [0.0] * len(self.depths)
+        self._band_notional = [0.0] * len(self.depths)
+        self._bands_stale_from = 0  # band sums are valid below this band index
+        self.resync = resync
+        self._updates = 0
+
+    def __len__(self):
+        return len(self._sizes)
+
+    def __contains__(self, price):
+        return price in self._sizes
+
+    def clear(self):
+        self._keys.clear()
+        self._sizes.clear()
+        self._raw.clear()
+        self._level_sizes.clear()
+        self._stale_from = 0
+        self._band_size = [0.0] * len(self.depths)
+        self._band_notional = [0.0] * len(self.depths)
+        self._bands_stale_from = 0
+        self._updates = 0
+
+    def update(self, price, size, raw=None):
+        """
+        Insert, replace or (when size is 0) delete a price level in O(log n)
+        :param raw: optional (price_str, size_str) exactly as sent by the exchange,
+                    kept for checksum verification
+        """
+        key = self._sign * price
+        if size == 0:
+            if self._sizes.pop(price, None) is not None:
+                self._raw.pop(price, None)
+                i = bisect_left(self._keys, key)
+                rank = len(self._keys) - 1 - i
+                if rank < self._max_depth and self._band_of[rank] < self._bands_stale_from:
+                    self._bands_stale_from = self._band_of[rank]
+                del self._keys[i]
+                del self._level_sizes[i]
+                if i < self._stale_from:
+                    self._stale_from = i
+                self._count_update()
+            return
+
+        i = bisect_left(self._keys, key)
+        if price in self._sizes:
+            rank = len(self._keys) - 1 - i
+            if rank < self._max_depth:
+                band = self._band_of[rank]
+                if band < self._bands_stale_from:
+                    delta = size - self._level_sizes[i]
+                    self._band_size[band] += delta
+                    self._band_notional[band] += price * delta
+            self._level_sizes[i] = size
+        else:
+            self._keys.insert(i, key)
+            self._level_sizes.insert(i, size)
+            rank = len(self._keys) - 1 - i
+            if rank < self._max_depth and self._band_of[rank] < self._bands_stale_from:
+                self._bands_stale_from = self._band_of[rank]
+        if i < self._stale_from:
+            self._stale_from = i
+        self._sizes[price] = size
+        if raw is not None:
+            self._raw[price] = raw
+        else:
+            self._raw.pop(price, None)  # Formatted from the floats instead of a stale string
+        self._count_update()
+
+    def _count_update(self):
+        self._updates += 1
+        if self._updates >= self.resync:
+            self._bands_stale_from = 0  # Re-sum everything to bound floating-point drift
+            self._updates = 0
+
+    def _refresh_bands(self):
+        band = self._bands_stale_from
+        if band >= len(self.depths):
+            return
+        start = self.depths[band - 1] if band > 0 else 0
+        levels = self.top(self._max_depth)
+        for k in range(band, len(self.depths)):
+            depth = self.depths[k]
+            size = notional = 0.0
+            for price, level_size in levels[start:depth]:
+                size += level_size
+                notional += price * level_size
+            self._band_size[k] = size
+            self._band_notional[k] = notional
+            start = depth
+        self._bands_stale_from = len(self.depths)
+
+    def get(self, price, default=0.0):
+        return self._sizes.get(price, default)
+
+    def best(self):
+        """
+        Return (price, size) of the best level, or None if the side is empty
+        """
+        if not self._keys:
+            return None
+        price = self._sign * self._keys[-1]
+        return price, self._sizes[price]
+
+    def prices(self, depth=None):
+        """
+        Return the best `depth` prices, best first, in O(k)
+        """
+        if depth is None:
+            keys = self._keys
+        elif depth > 0:
+            keys = self._keys[-depth:]
+        else:
+            keys = []
+        sign = self._sign
+        return [sign * key for key in reversed(keys)]
+
+    def columns(self, depth=10):
+        """
+        Return the best `depth` levels as separate price and size lists, best first,
+        without building a tuple per level
+        """
+        if depth <= 0:
+            return [], []
+        sizes = self._level_sizes[-depth:]
+        sizes.reverse()
+        if self._sign > 0:
+            prices = self._keys[-depth:]
+            prices.reverse()
+        else:
+            prices = [-key for key in reversed(self._keys[-depth:])]
+        return prices, sizes
+
+    def top(self, depth=10):
+        """
+        Return the best `depth` levels as (price, size) pairs, best first
+        """
+        sizes = self._sizes
+        return [(price, sizes[price]) for price in self.prices(depth)]
+
+    def raw_levels(self, depth=25):
+        """
+        Return the best `depth` levels as the original (price_str, size_str) pairs
+        """
+        raw, sizes = self._raw, self._sizes
+        return [raw.get(price) or (str(price), str(sizes[price])) for price in self.prices(depth)]
+
+    def total_size(self, depth=10):
+        """
+        Sum of sizes over the best `depth` levels; O(1) for tracked depths once refreshed
+        """
+        k = self._depth_index.get(depth)
+        if k is not None:
+            self._refresh_bands()
+            return sum(self._band_size[:k + 1])
+        sizes = self._sizes
+        return sum(sizes[price] for price in self.prices(depth))
+
+    def total_notional(self, depth=10):
+        """
+        Sum of price * size over the best `depth` levels; O(1) for tracked depths once refreshed
+        """
+        k = self._depth_index.get(depth)
+        if k is not None:
+            self._refresh_bands()
+            return sum(self._band_notional[:k + 1])
+        return sum(price * size for price, size in self.top(depth))
+
+    def vwap(self, depth=10):
+        """
+        Size-weighted average price of the best `depth` levels, or None if the side is empty
+        """
+        size = self.total_size(depth)
+        if size <= 0:
+            return None
+        return self.total_notional(depth) / size
+
+    def _refresh_prefix_sums(self):
+        n = len(self._keys)
+        start = self._stale_from
+        if start >= n and len(self._cum_size) == n:
+            return
+
+        prices = self._sign * np.array(self._keys[start:], dtype=float)
+        sizes = np.array(self._level_sizes[start:], dtype=float)
+        base_size = self._cum_size[start - 1] if start > 0 else 0.0
+        base_notional = self._cum_notional[start - 1] if start > 0 else 0.0
+
+        self._prices = np.concatenate((self._prices[:start], prices))
+        self._cum_size = np.concatenate((self._cum_size[:start], base_size + np.cumsum(sizes)))
+        self._cum_notional = np.concatenate((self._cum_notional[:start], base_notional + np.cumsum(prices * sizes)))
+        self._stale_from = n
+
+    def fill(self, amounts, by='quantity'):
+        """
+        Walk this side from the best level to fill market orders
+        :param amounts: order size(s), scalar or array, in size units or notional
+        :param by: 'quantity' to fill a size, 'notional' to fill a price * size amount
+        :return: (filled_quantity, filled_notional) arrays; fills are capped at the
+                 total resting liquidity
+        """
+        amounts = np.asarray(amounts, dtype=float)
+        self._refresh_prefix_sums()
+        n = len(self._keys)
+        if n == 0:
+            return np.zeros_like(amounts), np.zeros_like(amounts)
+
+        cum_size, cum_notional = self._cum_size, self._cum_notional
+        cumulative = cum_size if by == 'quantity' else cum_notional
+        target = np.clip(amounts, 0.0, cumulative[-1])
+
+        # Levels j..n-1 are touched: j is the lowest index whose depth from the best still covers the target
+        j = np.minimum(np.searchsorted(cumulative, cumulative[-1] - target, side='right'), n - 1)
+        full_size = cum_size[-1] - cum_size[j]
+        full_notional = cum_notional[-1] - cum_notional[j]
+        price = self._prices[j]
+
+        if by == 'quantity':
+            partial_size = np.maximum(target - full_size, 0.0)
+            partial_notional = partial_size * price
+        else:
+            partial_notional = np.maximum(target - full_notional, 0.0)
+            partial_size = partial_notional / price
+
+        return full_size + partial_size, full_notional + partial_notional
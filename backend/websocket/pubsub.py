@@ -0,0 +1,185 @@
+import asyncio
+import json
+import os
+import struct
+import sys
+import tempfile
+from utils.logger import logger
+from websocket.codec import dumps, loads
+from models.latency import stamp
+from config.settings import PUBSUB_PATH, PUBSUB_PORT, PUBSUB_BUFFER_LIMIT, PUBSUB_RECONNECT_DELAY
+from websocket.tick import AnalysedTick
+
+PUBSUB_ENV = "TRADE_SIMULATOR_PUBSUB"  # Set by serve.py in serving workers to the producer's socket path
+LENGTH = struct.Struct('!I')
+USE_TCP = sys.platform == 'win32'  # No asyncio Unix sockets on Windows; loopback TCP instead
+
+def private_socket_path():
+    """
+    Socket path in a new directory only this user can enter (mode 0700), under
+    XDG_RUNTIME_DIR when set, so no other local user can bind it first
+    """
+    directory = tempfile.mkdtemp(prefix="trade_simulator-", dir=os.environ.get('XDG_RUNTIME_DIR'))
+    return os.path.join(directory, "pubsub.sock")
+
+def check_private(path):
+    """
+    :raises PermissionError: if other users could create or replace the socket at `path`
+    """
+    if USE_TCP:
+        return
+    info = os.stat(os.path.dirname(os.path.abspath(path)))
+    if info.st_uid != os.getuid() or info.st_mode & 0o022:
+        raise PermissionError(f"Pub/sub socket directory for {path} must be owned by this user and "
+                              f"not writable by others; use private_socket_path()")
+
+class MarketDataPublisher:
+    """
+    Producer side of the local pub/sub: serving workers connect over a Unix
+    socket, name the instruments they want and receive length-prefixed JSON
+    [instId, message, trace] frames. Each message is serialized once for all
+    subscribers. A subscriber whose socket buffer exceeds `buffer_limit`
+    misses messages until it catches up rather than slowing the producer.
+    """
+
+    def __init__(self, path=PUBSUB_PATH, buffer_limit=PUBSUB_BUFFER_LIMIT):
+        """
+        :param path: Unix socket path in a private directory, see private_socket_path
+                     (loopback port PUBSUB_PORT on Windows)
+        :param buffer_limit: bytes queued per subscriber before messages are dropped
+        """
+        self.path = path
+        self.buffer_limit = buffer_limit
+        self.server = None
+        self.subscribers = {}  # StreamWriter -> set of instIds
+        self.published = 0
+        self.sent = 0
+        self.dropped = 0
+
+    async def start(self):
+        if USE_TCP:
+            self.server = await asyncio.start_server(self._handle, '127.0.0.1', PUBSUB_PORT)
+        else:
+            check_private(self.path)
+            if os.path.exists(self.path):
+                os.unlink(self.path)  # Left behind by a producer that did not shut down cleanly
+            self.server = await asyncio.start_unix_server(self._handle, path=self.path)
+        logger.info(f"Market data publisher listening on {self.path}")
+
+    async def _handle(self, reader, writer):
+        try:
+            instruments = set(json.loads(await reader.readline()))
+        except (ValueError, ConnectionError) as e:
+            logger.warning(f"Rejected pub/sub subscriber: {e}")
+            writer.close()
+            return
+        self.subscribers[writer] = instruments
+        logger.info(f"Pub/sub subscriber connected for {len(instruments)} instrument(s)")
+        try:
+            await reader.read()  # Subscribers send nothing more; EOF means they left
+        except ConnectionError:
+            pass
+        finally:
+            self.subscribers.pop(writer, None)
+            writer.close()
+            logger.info("Pub/sub subscriber disconnected")
+
+    def publish(self, inst_id, message, trace=None):
+        frame = None
+        for writer, instruments in self.subscribers.items():
+            if inst_id not in instruments:
+                continue
+            if writer.transport.get_write_buffer_size() > self.buffer_limit:
+                self.dropped += 1
+                continue
+            if frame is None:
+                payload = dumps([inst_id, message, trace]).encode()
+                frame = LENGTH.pack(len(payload)) + payload
+            writer.write(frame)
+            self.sent += 1
+        self.published += 1
+
+    async def stop(self):
+        if self.server is None:
+            return
+        self.server.close()
+        for writer in list(self.subscribers):
+            writer.close()
+        await self.server.wait_closed()
+        self.server = None
+        if not USE_TCP and os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def stats(self):
+        return {
+            'subscribers': len(self.subscribers),
+            'published': self.published,
+            'sent': self.sent,
+            'dropped': self.dropped
+        }
+
+class MarketDataSubscriber:
+    """
+    Serving worker side of the local pub/sub. `source` plugs into
+    MarketDataHub in place of the OKX feed. Frames are decoded as data only,
+    so whatever listens on the socket cannot run code in the worker.
+    """
+
+    def __init__(self, path=PUBSUB_PATH, reconnect_delay=PUBSUB_RECONNECT_DELAY):
+        self.path = path
+        self.reconnect_delay = reconnect_delay
+        self.received = 0
+
+    async def _connect(self):
+        if USE_TCP:
+            return await asyncio.open_connection('127.0.0.1', PUBSUB_PORT)
+        check_private(self.path)
+        return await asyncio.open_unix_connection(self.path)
+
+    async def source(self, instruments, orderbooks=None):
+        """
+        MarketDataHub source: (instId, AnalysedTick) published by the producer,
+        reconnecting whenever it is unavailable. The hub's orderbooks are not used.
+        """
+        while True:
+            try:
+                reader, writer = await self._connect()
+            except OSError as e:
+                logger.warning(f"Market data producer unavailable at {self.path}: {e}")
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+
+            try:
+                writer.write((json.dumps(list(instruments)) + '\n').encode())
+                await writer.drain()
+                logger.info(f"Subscribed to market data producer for {instruments}")
+                while True:
+                    size = LENGTH.unpack(await reader.readexactly(LENGTH.size))[0]
+                    inst_id, message, trace = loads(await reader.readexactly(size))
+                    self.received += 1
+                    yield inst_id, AnalysedTick(inst_id, message, trace)
+            except (asyncio.IncompleteReadError, ConnectionError, ValueError) as e:
+                logger.warning(f"Market data producer connection lost: {e}")
+            finally:
+                writer.close()
+            await asyncio.sleep(self.reconnect_delay)
+
+async def publish_analysis(hub, analyze, publisher, instruments=None):
+    """
+    Producer loop: analyse the newest update of each instrument once and publish it
+    :param analyze: callable(data) -> message dict, or None to skip the tick
+    """
+    async def run(inst_id):
+        # A single-slot queue skips updates that arrived while analysis was busy
+        async for data in hub.stream(inst_id, maxsize=1):
+            try:
+                trace = data.trace
+                if trace is not None and 'dequeued' not in trace:
+                    stamp(trace, 'dequeued')
+                message = analyze(data)
+                if message is not None:
+                    publisher.publish(inst_id, message, trace)
+            except Exception as e:
+                logger.error(f"Error publishing analysis for {inst_id}: {e}")
+
+    await asyncio.gather(*(run(inst_id) for inst_id in instruments or hub.instruments))
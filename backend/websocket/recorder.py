@@ -0,0 +1,246 @@
+import asyncio
+import bisect
+import os
+import struct
+import time
+import zlib
+from utils.logger import logger
+from config.settings import DEFAULT_INSTRUMENT, FEED_CHUNK_MESSAGES, FEED_CHUNK_SECONDS
+from websocket.codec import decode_book_message
+from websocket.data_stream import OrderBookManager, OrderBookOutOfSync, process_book_message
+from models.latency import stamp
+
+# File layout: MAGIC, then chunks of CHUNK_HEADER + zlib(records), where each
+# record is RECORD_HEADER + raw message bytes. The sidecar .idx file holds one
+# INDEX_ENTRY per chunk so readers can seek by time without decompressing.
+MAGIC = b"OKXFEED1"
+CHUNK_MARKER = b"CHNK"
+CHUNK_HEADER = struct.Struct('<4sIIdd')  # marker, compressed length, message count, first ts, last ts
+RECORD_HEADER = struct.Struct('<dI')  # receive timestamp, message length
+INDEX_ENTRY = struct.Struct('<QIdd')  # chunk offset, message count, first ts, last ts
+
+class FeedRecorder:
+    """
+    Append-only writer for raw feed messages and their receive timestamps.
+    Messages are buffered and written as compressed chunks of at most
+    `chunk_messages` messages or `chunk_seconds` of feed time.
+    """
+
+    def __init__(self, path, chunk_messages=FEED_CHUNK_MESSAGES, chunk_seconds=FEED_CHUNK_SECONDS, level=6):
+        self.path = path
+        self.chunk_messages = chunk_messages
+        self.chunk_seconds = chunk_seconds
+        self.level = level
+        self._buffer = []
+        self._count = 0
+        self._first_ts = None
+        self._last_ts = None
+        self.messages_written = 0
+
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, 'ab')
+        self._index = open(path + '.idx', 'ab')
+        if new_file:
+            self._file.write(MAGIC)
+            self._file.flush()
+        logger.info(f"Recording feed to {path}")
+
+    def record(self, message, timestamp=None):
+        """
+        Buffer one raw message
+        :param message: message text (or bytes) exactly as received
+        :param timestamp: receive time in epoch seconds, defaults to now
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        if isinstance(message, str):
+            message = message.encode()
+        self._buffer.append(RECORD_HEADER.pack(timestamp, len(message)))
+        self._buffer.append(message)
+        self._count += 1
+        if self._first_ts is None:
+            self._first_ts = timestamp
+        self._last_ts = timestamp
+
+        if self._count >= self.chunk_messages or timestamp - self._first_ts >= self.chunk_seconds:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the buffered messages as one chunk and index it
+        """
+        if not self._count:
+            return
+        payload = zlib.compress(b"".join(self._buffer), self.level)
+        offset = self._file.tell()
+        self._file.write(CHUNK_HEADER.pack(CHUNK_MARKER, len(payload), self._count, self._first_ts, self._last_ts))
+        self._file.write(payload)
+        self._file.flush()
+        self._index.write(INDEX_ENTRY.pack(offset, self._count, self._first_ts, self._last_ts))
+        self._index.flush()
+
+        self.messages_written += self._count
+        self._buffer = []
+        self._count = 0
+        self._first_ts = None
+        self._last_ts = None
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self._file.close()
+            self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class FeedReader:
+    """
+    Random access reader for files written by FeedRecorder
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.index = self._load_index()
+
+    def _load_index(self):
+        """
+        Read the sidecar index, rebuilding it from chunk headers if it is
+        missing or behind the data file (e.g. after a crash)
+        """
+        entries = []
+        index_path = self.path + '.idx'
+        if os.path.exists(index_path):
+            with open(index_path, 'rb') as f:
+                data = f.read()
+            usable = len(data) - len(data) % INDEX_ENTRY.size
+            entries = list(INDEX_ENTRY.iter_unpack(data[:usable]))
+
+        with open(self.path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Not a recorded feed file: {self.path}")
+            file_size = os.fstat(f.fileno()).st_size
+            offset = len(MAGIC)
+            if entries:
+                f.seek(entries[-1][0])
+                header = f.read(CHUNK_HEADER.size)
+                offset = entries[-1][0] + CHUNK_HEADER.size + CHUNK_HEADER.unpack(header)[1]
+
+            # Scan any chunks written after the last index entry
+            while offset + CHUNK_HEADER.size <= file_size:
+                f.seek(offset)
+                marker, length, count, first_ts, last_ts = CHUNK_HEADER.unpack(f.read(CHUNK_HEADER.size))
+                if marker != CHUNK_MARKER or offset + CHUNK_HEADER.size + length > file_size:
+                    logger.warning(f"Truncated chunk at offset {offset} in {self.path}")
+                    break
+                entries.append((offset, count, first_ts, last_ts))
+                offset += CHUNK_HEADER.size + length
+        return entries
+
+    @property
+    def message_count(self):
+        return sum(entry[1] for entry in self.index)
+
+    @property
+    def time_range(self):
+        if not self.index:
+            return None
+        return self.index[0][2], self.index[-1][3]
+
+    def read(self, start=None, end=None):
+        """
+        Iterate recorded messages in order
+        :param start: optional first receive timestamp to include
+        :param end: optional last receive timestamp to include
+        :return: generator of (timestamp, message_bytes)
+        """
+        first_chunk = 0
+        if start is not None:
+            first_chunk = bisect.bisect_left([entry[3] for entry in self.index], start)
+
+        with open(self.path, 'rb') as f:
+            for offset, count, first_ts, last_ts in self.index[first_chunk:]:
+                if end is not None and first_ts > end:
+                    return
+                f.seek(offset)
+                length = CHUNK_HEADER.unpack(f.read(CHUNK_HEADER.size))[1]
+                payload = zlib.decompress(f.read(length))
+                position = 0
+                for _ in range(count):
+                    timestamp, size = RECORD_HEADER.unpack_from(payload, position)
+                    position += RECORD_HEADER.size
+                    if end is not None and timestamp > end:
+                        return
+                    if start is None or timestamp >= start:
+                        yield timestamp, payload[position:position + size]
+                    position += size
+
+async def replay_messages(path, speed=None, start=None, end=None):
+    """
+    Yield recorded (timestamp, message) pairs, optionally paced like the live feed
+    :param speed: None or 0 for as fast as possible, 1.0 for real time, N for N x real time
+    """
+    loop = asyncio.get_running_loop()
+    base_ts = base_time = None
+    for i, (timestamp, message) in enumerate(FeedReader(path).read(start, end)):
+        if speed:
+            if base_ts is None:
+                base_ts, base_time = timestamp, loop.time()
+            delay = base_time + (timestamp - base_ts) / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        elif i % 1000 == 0:
+            await asyncio.sleep(0)  # Let other tasks run during fast replays
+        yield timestamp, message
+
+async def replay_orderbooks(path, instruments=None, orderbooks=None, speed=None, start=None, end=None):
+    """
+    Drop-in replacement for stream_orderbooks that rebuilds the books from a recording
+    :param instruments: instrument IDs to replay, or None for everything recorded
+    :return: async generator of (instId, BookTick), with the recorded
+             receive time in BookTick.received_at
+    """
+    if orderbooks is None:
+        orderbooks = {}
+    for inst_id in instruments or []:
+        orderbooks.setdefault(inst_id, OrderBookManager())
+
+    async for timestamp, message in replay_messages(path, speed, start, end):
+        try:
+            trace = {'received': time.time()}
+            data = decode_book_message(message)
+            stamp(trace, 'decoded')
+            if 'event' in data or not data.get('data'):
+                continue
+
+            inst_id = data.get('arg', {}).get('instId', DEFAULT_INSTRUMENT)
+            if instruments is not None and inst_id not in instruments:
+                continue
+            orderbook = orderbooks.setdefault(inst_id, OrderBookManager())
+            try:
+                processed_data = process_book_message(orderbook, inst_id, data, trace)
+            except OrderBookOutOfSync as e:
+                # The recording holds the snapshot the live stream resubscribed for
+                logger.warning(f"{inst_id} order book out of sync in replay, waiting for snapshot: {e}")
+                orderbook.reset()
+                continue
+
+            if processed_data:
+                trace.pop('exchange', None)  # Recorded exchange times are not comparable with replay time
+                processed_data.received_at = timestamp
+                yield inst_id, processed_data
+        except Exception as e:
+            logger.error(f"Error replaying message: {e}")
+            continue
+
+async def replay_websocket(path, inst_id=DEFAULT_INSTRUMENT, orderbook=None, speed=None):
+    """
+    Drop-in replacement for connect_websocket that replays a recording
+    """
+    orderbooks = {inst_id: orderbook} if orderbook is not None else None
+    async for _, processed_data in replay_orderbooks(path, [inst_id], orderbooks, speed):
+        yield processed_data
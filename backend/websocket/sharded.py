@@ -0,0 +1,337 @@
+import asyncio
+import importlib
+import multiprocessing
+import pickle
+import struct
+import time
+from utils.logger import logger
+from utils.shm_ring import SharedRingBuffer, check_store_ordering
+from models.latency import stamp
+from config.settings import (ANALYSIS_WORKERS, WORKER_RING_SIZE, WORKER_POLL_INTERVAL, WORKER_ANALYZER,
+                             WORKER_BATCH_SIZE)
+from websocket.codec import decode_book_message, is_snapshot_message, peek_inst_id
+from websocket.tick import AnalysedTick
+from websocket.data_stream import (OrderBookManager, OrderBookOutOfSync, book_subscription, okx_feed,
+                                  process_book_message, resubscribe)
+
+# Record kinds. Inputs: raw book push (received time + message) or book reset.
+# Outputs: pickled (kind, instId, message, trace) of an analysis or a resync request.
+BOOK = b'B'
+RESET = b'X'
+MESSAGE = 'M'
+RESYNC = 'R'
+RECEIVED = struct.Struct('<d')
+
+def load_analyzer(path):
+    """
+    :param path: 'module:function' of a factory(orderbooks) -> callable(tick) -> message or None.
+                 An optional `close()` attribute of the callable runs when the worker stops,
+                 e.g. to save model state learned in the worker.
+    """
+    module, name = path.split(':')
+    return getattr(importlib.import_module(module), name)
+
+def run_worker(instruments, input_name, output_name, analyzer, stop, poll_interval, batch_size=WORKER_BATCH_SIZE):
+    """
+    Worker process: maintain the books of one shard and analyse their newest state.
+    Every push is applied to its book, as the sequence and checksum checks need
+    them all, but only the latest tick per instrument is analysed, once the inbox
+    is empty or after `batch_size` pushes. Like hub.stream(maxsize=1) inline, a
+    burst is conflated instead of filling the input ring and forcing a resync.
+    """
+    inbox = SharedRingBuffer(input_name, create=False)
+    outbox = SharedRingBuffer(output_name, create=False)
+    orderbooks = {inst_id: OrderBookManager() for inst_id in instruments}
+    analyze = load_analyzer(analyzer)(orderbooks)
+    logger.info(f"Analysis worker started for {instruments}")
+
+    def send(record, retry=False):
+        # Analyses may be dropped when the event loop falls behind; resync requests may not
+        while not outbox.put(pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)):
+            if not retry or stop.is_set():
+                return
+            time.sleep(poll_interval)
+
+    pending = {}  # instId -> newest processed tick not analysed yet
+
+    def flush():
+        for inst_id, processed_data in pending.items():
+            try:
+                trace = processed_data.trace
+                stamp(trace, 'dequeued')
+                message = analyze(processed_data)
+                if message is not None:
+                    send((MESSAGE, inst_id, message, trace))
+            except Exception as e:
+                logger.error(f"Error analysing {inst_id}: {e}")
+        pending.clear()
+
+    try:
+        applied = 0
+        while True:
+            record = inbox.get()
+            if record is None or applied >= batch_size:
+                flush()
+                applied = 0
+            if record is None:
+                if stop.is_set():
+                    break
+                time.sleep(poll_interval)
+                continue
+
+            if record[:1] == RESET:
+                inst_id = record[1:].decode()
+                if inst_id in orderbooks:
+                    orderbooks[inst_id].reset()
+                    pending.pop(inst_id, None)
+                continue
+
+            try:
+                trace = {'received': RECEIVED.unpack_from(record, 1)[0]}
+                data = decode_book_message(record[1 + RECEIVED.size:])
+                stamp(trace, 'decoded')
+                if not data.get('data'):
+                    continue
+                inst_id = data.get('arg', {}).get('instId')
+                orderbook = orderbooks.get(inst_id)
+                if orderbook is None:
+                    logger.warning(f"Data for instrument outside this shard: {inst_id}")
+                    continue
+
+                try:
+                    processed_data = process_book_message(orderbook, inst_id, data, trace)
+                except OrderBookOutOfSync as e:
+                    logger.warning(f"{inst_id} order book out of sync, requesting resubscribe: {e}")
+                    orderbook.reset()
+                    pending.pop(inst_id, None)
+                    send((RESYNC, inst_id, None, None), retry=True)
+                    continue
+                applied += 1
+                if processed_data is not None:
+                    pending[inst_id] = processed_data
+            except Exception as e:
+                logger.error(f"Error in analysis worker for {instruments}: {e}")
+    finally:
+        close = getattr(analyze, 'close', None)
+        if close is not None:
+            try:
+                close()
+            except Exception as e:
+                logger.error(f"Error closing analyzer for {instruments}: {e}")
+        inbox.close()
+        outbox.close()
+
+class ShardedPipeline:
+    """
+    Moves book maintenance and analytics off the event loop. Instruments are
+    sharded round-robin over worker processes; the loop only reads sockets,
+    routes each raw push to its shard's shared-memory ring and collects the
+    analysis messages the workers write back.
+
+    Workers conflate: a burst of pushes is applied to the books but only the
+    newest tick of each instrument is analysed, so the input ring drains at the
+    speed of book maintenance rather than analysis.
+
+    Backpressure: a full input ring drops the push and marks the instrument
+    stalled. Once the shard has drained to half capacity its book is reset and
+    the feed resubscribes for a fresh snapshot, so a slow shard never blocks
+    socket reads or other shards. Workers drop analyses when the output ring is
+    full, as the broadcaster would for a slow client.
+    """
+
+    def __init__(self, instruments, workers=ANALYSIS_WORKERS, analyzer=WORKER_ANALYZER,
+                 ring_size=WORKER_RING_SIZE, poll_interval=WORKER_POLL_INTERVAL, batch_size=WORKER_BATCH_SIZE):
+        """
+        :param instruments: instrument IDs handled by the pipeline
+        :param workers: number of worker processes (at most one per instrument)
+        :param analyzer: 'module:function' factory run in each worker, see load_analyzer
+        :param ring_size: bytes per ring, per direction and worker
+        :param poll_interval: seconds an idle side sleeps before polling its ring again
+        :param batch_size: pushes a worker applies before analysing, see run_worker
+        :raises RuntimeError: on CPUs without x86 store ordering, see check_store_ordering
+        """
+        check_store_ordering()
+        self.instruments = list(instruments)
+        self.workers = max(1, min(workers, len(self.instruments)))
+        self.analyzer = analyzer
+        self.ring_size = ring_size
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.shards = [self.instruments[i::self.workers] for i in range(self.workers)]
+        self.shard_of = {inst_id: i for i, shard in enumerate(self.shards) for inst_id in shard}
+        self.inboxes = []
+        self.outboxes = []
+        self.processes = []
+        self.stop_event = None
+        self.stalled = set()  # Instruments dropping input until their shard drains
+        self.resync = set()   # Instruments whose feed should resubscribe for a fresh snapshot
+        self.awaiting = set() # Reset instruments whose deltas are dropped until a snapshot arrives
+        self.resyncs = 0
+        self.discarded = 0    # Pushes dropped while their instrument was stalled
+        self.routes = {}      # instId -> asyncio.Queue of the source consuming it
+        self._drain_task = None
+
+    def start(self):
+        if self.processes:
+            return
+        # Spawned rather than forked: the parent runs an event loop and model threads
+        context = multiprocessing.get_context('spawn')
+        self.stop_event = context.Event()
+        for shard in self.shards:
+            inbox = SharedRingBuffer(capacity=self.ring_size)
+            outbox = SharedRingBuffer(capacity=self.ring_size)
+            process = context.Process(target=run_worker, daemon=True,
+                                      args=(shard, inbox.name, outbox.name, self.analyzer,
+                                            self.stop_event, self.poll_interval, self.batch_size))
+            process.start()
+            self.inboxes.append(inbox)
+            self.outboxes.append(outbox)
+            self.processes.append(process)
+        logger.info(f"Sharded pipeline started: {len(self.instruments)} instruments on {self.workers} worker(s)")
+
+    def stop(self, timeout=5.0):
+        if self._drain_task is not None:
+            self._drain_task.cancel()
+            self._drain_task = None
+        if self.stop_event is not None:
+            self.stop_event.set()
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        for ring in self.inboxes + self.outboxes:
+            ring.close()
+        self.processes, self.inboxes, self.outboxes = [], [], []
+        logger.info("Sharded pipeline stopped")
+
+    def submit(self, inst_id, message, received=None):
+        """
+        Route one raw book push to its shard
+        :param message: the push as received (text)
+        :return: False if it was dropped for backpressure
+        """
+        shard = self.shard_of.get(inst_id)
+        if shard is None:
+            return False
+        inbox = self.inboxes[shard]
+        if inst_id in self.awaiting:
+            # The worker would ignore deltas anyway; keep the ring free for the snapshot
+            if not is_snapshot_message(message):
+                self.discarded += 1
+                return False
+            self.awaiting.discard(inst_id)
+        if inst_id in self.stalled:
+            if inbox.used() > inbox.capacity // 2 or not inbox.put(RESET + inst_id.encode()):
+                self.discarded += 1
+                return False
+            # The shard caught up: restart this book from a fresh snapshot
+            self.stalled.discard(inst_id)
+            self.request_resync(inst_id)
+            self.discarded += 1
+            return False
+        received = time.time() if received is None else received
+        if not inbox.put(BOOK + RECEIVED.pack(received) + message.encode()):
+            self.stalled.add(inst_id)
+            logger.warning(f"Shard {shard} input ring full, {inst_id} will resync once it drains")
+            return False
+        return True
+
+    def request_resync(self, inst_id):
+        self.resync.add(inst_id)
+        self.awaiting.add(inst_id)
+        self.resyncs += 1
+
+    def reset(self, instruments):
+        """
+        Reset worker books, e.g. after the feed reconnects
+        """
+        for inst_id in instruments:
+            shard = self.shard_of.get(inst_id)
+            if shard is None:
+                continue
+            self.awaiting.add(inst_id)
+            if not self.inboxes[shard].put(RESET + inst_id.encode()):
+                self.stalled.add(inst_id)
+
+    def poll(self, limit=1000):
+        """
+        Collect up to `limit` worker outputs per shard
+        :return: list of (instId, AnalysedTick)
+        """
+        results = []
+        for outbox in self.outboxes:
+            for _ in range(limit):
+                record = outbox.get()
+                if record is None:
+                    break
+                kind, inst_id, message, trace = pickle.loads(record)
+                if kind == RESYNC:
+                    self.request_resync(inst_id)
+                else:
+                    results.append((inst_id, AnalysedTick(inst_id, message, trace)))
+        return results
+
+    async def _drain(self):
+        while True:
+            results = self.poll()
+            for inst_id, tick in results:
+                queue = self.routes.get(inst_id)
+                if queue is not None:
+                    queue.put_nowait((inst_id, tick))
+            await asyncio.sleep(0 if results else self.poll_interval)
+
+    async def _feed(self, instruments, queue, recorder=None):
+        subscriptions = {inst_id: book_subscription(inst_id) for inst_id in instruments}
+        try:
+            async for websocket, message, trace in okx_feed(subscriptions, lambda: self.reset(instruments), recorder):
+                try:
+                    inst_id = peek_inst_id(message)
+                except ValueError as e:
+                    logger.error(f"Unroutable message: {e}")
+                    continue
+                if inst_id is not None:
+                    self.submit(inst_id, message, trace['received'])
+                for inst_id in self.resync.intersection(instruments):
+                    self.resync.discard(inst_id)
+                    await resubscribe(websocket, subscriptions[inst_id])
+        finally:
+            queue.put_nowait(None)
+
+    async def source(self, instruments, orderbooks=None, recorder=None):
+        """
+        MarketDataHub source: read one OKX socket for `instruments` on this loop
+        and yield (instId, AnalysedTick) as the workers finish them. The hub's
+        orderbooks are not used; the books live in the workers.
+        """
+        self.start()
+        queue = asyncio.Queue()
+        for inst_id in instruments:
+            self.routes[inst_id] = queue
+        if self._drain_task is None:
+            self._drain_task = asyncio.ensure_future(self._drain())
+        feed = asyncio.ensure_future(self._feed(instruments, queue, recorder))
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                yield item
+        finally:
+            feed.cancel()
+            for inst_id in instruments:
+                self.routes.pop(inst_id, None)
+
+    def metrics(self):
+        """
+        Backpressure and health counters per shard
+        """
+        return {
+            'workers': self.workers,
+            'alive': sum(process.is_alive() for process in self.processes),
+            'stalled': sorted(self.stalled),
+            'awaiting_snapshot': sorted(self.awaiting),
+            'resyncs': self.resyncs,
+            'discarded': self.discarded,
+            'shards': [{'instruments': shard, 'input': inbox.stats(), 'output': outbox.stats()}
+                       for shard, inbox, outbox in zip(self.shards, self.inboxes, self.outboxes)]
+        }
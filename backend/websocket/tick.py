@@ -0,0 +1,97 @@
+class BookTick:
+    """
+    One processed order book update. The top levels are kept as separate
+    price and size float lists per side, best first, so consumers never parse
+    or format strings and no per-level objects are created. Slots keep each
+    tick a single fixed-size object without an attribute dict.
+    """
+    __slots__ = ('timestamp', 'bid_px', 'bid_sz', 'ask_px', 'ask_sz', 'processing_time', 'inst_id',
+                 'bid_depth', 'ask_depth', 'bid_notional', 'ask_notional', 'imbalance', 'microprice',
+                 'weighted_mid', 'latency', 'volatility', 'trace', 'received_at')
+
+    def __init__(self, timestamp, bid_px, bid_sz, ask_px, ask_sz, processing_time=0.0):
+        """
+        :param timestamp: ISO timestamp of the update
+        :param bid_px: top bid prices, best first; bid_sz holds the matching sizes
+        :param ask_px: top ask prices, best first; ask_sz holds the matching sizes
+        :param processing_time: seconds spent applying the update to the book
+        """
+        self.timestamp = timestamp
+        self.bid_px = bid_px
+        self.bid_sz = bid_sz
+        self.ask_px = ask_px
+        self.ask_sz = ask_sz
+        self.processing_time = processing_time
+        self.inst_id = None
+        self.bid_depth = 0.0  # Total size of the top levels per side
+        self.ask_depth = 0.0
+        self.bid_notional = 0.0  # Total price * size of the top levels per side
+        self.ask_notional = 0.0
+        self.imbalance = 0.0  # (bid depth - ask depth) / (bid depth + ask depth)
+        self.microprice = None
+        self.weighted_mid = None
+        self.latency = 0.0  # Recent mean book update time
+        self.volatility = None  # Rolling volatility of mid returns, updated on every book update
+        self.trace = None  # Stage timestamps, see models.latency.TRACE_STAGES
+        self.received_at = None  # Recorded receive time when replaying
+
+    @property
+    def bids(self):
+        """
+        Top bid levels as (price, size) pairs, best first
+        """
+        return list(zip(self.bid_px, self.bid_sz))
+
+    @property
+    def asks(self):
+        return list(zip(self.ask_px, self.ask_sz))
+
+    @property
+    def best_bid(self):
+        return self.bid_px[0] if self.bid_px else None
+
+    @property
+    def best_ask(self):
+        return self.ask_px[0] if self.ask_px else None
+
+    @property
+    def mid_price(self):
+        if not self.bid_px or not self.ask_px:
+            return None
+        return (self.bid_px[0] + self.ask_px[0]) / 2
+
+    @property
+    def spread(self):
+        if not self.bid_px or not self.ask_px:
+            return None
+        return self.ask_px[0] - self.bid_px[0]
+
+    @property
+    def market_depth(self):
+        return {'bids': self.bid_depth, 'asks': self.ask_depth}
+
+    def to_dict(self):
+        return {
+            'instId': self.inst_id,
+            'timestamp': self.timestamp,
+            'bids': [list(level) for level in self.bids],
+            'asks': [list(level) for level in self.asks],
+            'market_depth': self.market_depth,
+            'imbalance': self.imbalance,
+            'microprice': self.microprice,
+            'weighted_mid': self.weighted_mid,
+            'latency': self.latency,
+            'processing_time': self.processing_time
+        }
+
+class AnalysedTick:
+    """
+    Finished analysis message for one update, produced in another process
+    (ShardedPipeline worker or pub/sub producer), with its stage trace
+    """
+    __slots__ = ('inst_id', 'message', 'trace')
+
+    def __init__(self, inst_id, message, trace):
+        self.inst_id = inst_id
+        self.message = message
+        self.trace = trace
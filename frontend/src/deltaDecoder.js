@@ -0,0 +1,129 @@
+// Decoder for the backend's compact analysis protocol (backend/websocket/delta.py).
+//
+// A client opts in by offering the DELTA_PROTOCOL subprotocol. The server then
+// sends a JSON schema text frame, followed by binary frames:
+//   header (little-endian): uint8 kind, uint8 schema id, uint16 count, uint32 seq
+//   keyframe (kind 1): count float64 values, all fields in schema order
+//   delta (kind 2): changed-field bitmask (ceil(n / 8) bytes, LSB first),
+//                   then count float64 values for the set bits
+// Servers that do not support the subprotocol send plain JSON text frames.
+
+export const DELTA_PROTOCOL = 'tradesim.delta.v1';
+export const JSON_PROTOCOL = 'json';
+
+const KEYFRAME = 1;
+const DELTA = 2;
+const HEADER_SIZE = 8;
+
+const setPath = (target, path, value) => {
+  const keys = path.split('.');
+  let node = target;
+  for (let i = 0; i < keys.length - 1; i += 1) {
+    node[keys[i]] = node[keys[i]] || {};
+    node = node[keys[i]];
+  }
+  node[keys[keys.length - 1]] = value;
+};
+
+const toValue = (value) => (Number.isNaN(value) ? null : value);
+
+// Rebuild a nested array of the given shape from a flat slice of values
+const reshape = (values, offset, shape) => {
+  if (shape.length === 0) {
+    return toValue(values[offset]);
+  }
+  const [length, ...rest] = shape;
+  const stride = rest.reduce((product, size) => product * size, 1);
+  return Array.from({ length }, (_, i) => reshape(values, offset + i * stride, rest));
+};
+
+export function createDeltaDecoder() {
+  let schema = null;
+  let values = null;
+  let seq = null;
+
+  const buildMessage = () => {
+    const message = {};
+    Object.entries(schema.static).forEach(([path, value]) => setPath(message, path, value));
+    let offset = 0;
+    schema.fields.forEach(({ path, shape, type }) => {
+      let value = reshape(values, offset, shape);
+      if (type === 'timestamp' && value !== null) {
+        // Backend timestamps are naive UTC ISO strings
+        value = new Date(value * 1000).toISOString().replace('Z', '');
+      }
+      setPath(message, path, value);
+      offset += shape.reduce((product, size) => product * size, 1);
+    });
+    return message;
+  };
+
+  // Returns the decoded analysis message, or null for frames that carry no tick
+  const decode = (data) => {
+    if (typeof data === 'string') {
+      const parsed = JSON.parse(data);
+      if (parsed.type === 'schema' && parsed.protocol === DELTA_PROTOCOL) {
+        schema = {
+          ...parsed,
+          size: parsed.fields.reduce(
+            (total, { shape }) => total + shape.reduce((product, size) => product * size, 1), 0
+          ),
+        };
+        values = null;
+        seq = null;
+        return null;
+      }
+      return parsed;
+    }
+
+    const view = new DataView(data);
+    const kind = view.getUint8(0);
+    const schemaId = view.getUint8(1);
+    const count = view.getUint16(2, true);
+    const frameSeq = view.getUint32(4, true);
+    if (!schema || schemaId !== schema.id) {
+      return null;
+    }
+
+    if (kind === KEYFRAME) {
+      values = new Float64Array(count);
+      for (let i = 0; i < count; i += 1) {
+        values[i] = view.getFloat64(HEADER_SIZE + i * 8, true);
+      }
+    } else if (kind === DELTA) {
+      // The server only sends a delta directly after the frame it is based on
+      if (values === null || frameSeq !== ((seq + 1) >>> 0)) {
+        return null;
+      }
+      const maskSize = Math.ceil(schema.size / 8);
+      let offset = HEADER_SIZE + maskSize;
+      for (let i = 0; i < schema.size; i += 1) {
+        if (view.getUint8(HEADER_SIZE + (i >> 3)) & (1 << (i & 7))) {
+          values[i] = view.getFloat64(offset, true);
+          offset += 8;
+        }
+      }
+    } else {
+      return null;
+    }
+    seq = frameSeq;
+    return buildMessage();
+  };
+
+  return { decode };
+}
+
+// Open an analysis socket preferring the delta protocol; onMessage receives
+// decoded messages in the same shape as the JSON protocol
+export function connectAnalysis(url, onMessage) {
+  const socket = new WebSocket(url, [DELTA_PROTOCOL, JSON_PROTOCOL]);
+  socket.binaryType = 'arraybuffer';
+  const decoder = createDeltaDecoder();
+  socket.onmessage = (event) => {
+    const message = decoder.decode(event.data);
+    if (message !== null) {
+      onMessage(message);
+    }
+  };
+  return socket;
+}